@@ -0,0 +1,29 @@
+"""add events.weight
+
+Revision ID: e4a7b2c91f05
+Revises: 9c3e1f7a2d44
+Create Date: 2026-10-19 10:27:51.604412
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a7b2c91f05'
+down_revision: Union[str, Sequence[str], None] = '9c3e1f7a2d44'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # existing rows were stored unsampled
+    op.add_column('events', sa.Column('weight', sa.Float(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('events', 'weight')
@@ -1,28 +1,26 @@
 from __future__ import annotations
 
-from typing import Optional
+from typing import Literal, Optional
 from fastapi import APIRouter, Depends, Cookie, HTTPException, Response, Request
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from app.core.db import get_db
 from app.services.cart_service import (
     get_or_create_active_cart,
+    find_active_cart,
+    empty_cart_summary,
     cart_summary,
     add_item,
     set_item_quantity,
     remove_item,
     clear_cart,
+    apply_batch,
 )
 
-from app.db.models import User, UserSession
-
 from app.services.cart_service import checkout_cart
-
-import hashlib
-
-from datetime import datetime, timezone
+from app.services.session_service import AuthUser, get_current_user
 
 router = APIRouter(prefix="/cart", tags=["cart"])
 
@@ -38,56 +36,86 @@ class AddItemBody(BaseModel):
 class UpdateQtyBody(BaseModel):
     quantity: int
 
+class CartOp(BaseModel):
+    op: Literal["add", "set_quantity", "remove"]
+    product_id: str | None = None  # add
+    item_id: str | None = None     # set_quantity / remove
+    quantity: int | None = None    # add (default 1) / set_quantity (required)
+
+    @model_validator(mode="after")
+    def check_fields(self) -> "CartOp":
+        if self.op == "add":
+            if not self.product_id:
+                raise ValueError("add requires product_id")
+            if self.quantity is None:
+                self.quantity = 1
+        elif not self.item_id:
+            raise ValueError(f"{self.op} requires item_id")
+        elif self.op == "set_quantity" and self.quantity is None:
+            raise ValueError("set_quantity requires quantity")
+        return self
+
+class BatchBody(BaseModel):
+    ops: list[CartOp] = Field(..., min_length=1, max_length=100)
+
+
+def _set_cart_cookie(req: Request, response: Response, cart_id: str):
+    proto = (req.headers.get("x-forwarded-proto") or req.url.scheme).lower()
+    is_https = proto == "https"
 
-SESSION_COOKIE = "sid"
+    response.set_cookie(
+        key=CART_COOKIE,
+        value=cart_id,
+        max_age=COOKIE_MAX_AGE,
+        httponly=True,
+        samesite="none" if is_https else "lax",
+        secure=is_https,
+        path ="/",
+    )
+
+def _clear_cart_cookie(response: Response):
+    response.delete_cookie(key=CART_COOKIE, path="/")
+
+
+# shared with app.api.cart_async so both routers answer alike
+
+def _http_error(e: ValueError) -> HTTPException:
+    msg = str(e)
+    return HTTPException(status_code=404 if "not found" in msg else 400, detail=msg)
+
+
+def _checkout_response(order: dict) -> dict:
+    return {
+        "order_id": order["id"],
+        "order_total_quantity": order["total_quantity"],
+        "order_subtotal_cents": order["subtotal_cents"],
+        "cart": empty_cart_summary(order["user_id"]),
+    }
 
-def _token_hash(token: str) -> str:
-    return hashlib.sha256(token.encode("utf-8")).hexdigest()
 
-def get_optional_user(req: Request, db: Session) -> User | None:
-    token = req.cookies.get(SESSION_COOKIE)
-    if not token:
-        return None
-    th = _token_hash(token)
-    sess = db.query(UserSession).filter(UserSession.token_hash == th).first()
-    if not sess:
-        return None
-    exp = sess.expires_at
-    if exp.tzinfo is None:
-        exp = exp.replace(tzinfo=timezone.utc)
-    if exp < datetime.now(timezone.utc):
-        return None
-    return db.query(User).filter(User.id == sess.user_id).first()
+# Reads (and no-op mutations) never create a cart: without one they answer with an
+# empty virtual cart. Rows are only inserted by add/batch, the first real mutation.
 
 @router.get("")
 def get_cart(
     req: Request,
     response: Response,
     db: Session = Depends(get_db),
+    user: AuthUser | None = Depends(get_current_user),
     cart_id: Optional[str] = Cookie(default=None, alias=CART_COOKIE),
 ):
-    user = get_optional_user(req, db)
-
-    cart, created = get_or_create_active_cart(
+    cart = find_active_cart(
         db,
         user_id=(user.id if user else None),
         cart_id=cart_id,
     )
+    if not cart:
+        if cart_id:
+            _clear_cart_cookie(response)  # stale cookie: stop looking it up
+        return empty_cart_summary(user.id if user else None)
 
     # Always set cookie to whatever cart you're actually using
-    proto = (req.headers.get("x-forwarded-proto") or req.url.scheme).lower()
-    is_https = proto == "https"
-
-    response.set_cookie(
-        key=CART_COOKIE,
-        value=cart.id,
-        max_age=COOKIE_MAX_AGE,
-        httponly=True,
-        samesite="none" if is_https else "lax",
-        secure=is_https,
-        path ="/",
-    )
-
+    _set_cart_cookie(req, response, cart.id)
     return cart_summary(db, cart)
 
 @router.post("/items")
@@ -96,33 +124,20 @@ def add_cart_item(
     body: AddItemBody,
     response: Response,
     db: Session = Depends(get_db),
+    user: AuthUser | None = Depends(get_current_user),
     cart_id: Optional[str] = Cookie(default=None, alias=CART_COOKIE),
 ):
-    user = get_optional_user(req, db)
     cart, created = get_or_create_active_cart(
         db,
         user_id=(user.id if user else None),
         cart_id=cart_id,
     )
-    proto = (req.headers.get("x-forwarded-proto") or req.url.scheme).lower()
-    is_https = proto == "https"
-
-    response.set_cookie(
-        key=CART_COOKIE,
-        value=cart.id,
-        max_age=COOKIE_MAX_AGE,
-        httponly=True,
-        samesite="none" if is_https else "lax",
-        secure=is_https,
-        path ="/",
-    )
-
+    _set_cart_cookie(req, response, cart.id)
 
     try:
         cart = add_item(db, cart.id, body.product_id, body.quantity)
     except ValueError as e:
-        msg = str(e)
-        raise HTTPException(status_code=404 if "not found" in msg else 400, detail=msg)
+        raise _http_error(e)
     except IntegrityError:
         # catches FK / constraint issues as a 400 instead of 500
         raise HTTPException(status_code=400, detail="Invalid cart/product reference")
@@ -130,6 +145,41 @@ def add_cart_item(
     return cart_summary(db, cart)
 
 
+@router.post("/batch")
+def batch_update_cart(
+    req: Request,
+    body: BatchBody,
+    response: Response,
+    db: Session = Depends(get_db),
+    user: AuthUser | None = Depends(get_current_user),
+    cart_id: Optional[str] = Cookie(default=None, alias=CART_COOKIE),
+):
+    """Apply several add / set_quantity / remove ops in order, in one transaction."""
+    ops = [op.model_dump() for op in body.ops]
+    if any(op["op"] == "add" for op in ops):
+        cart, created = get_or_create_active_cart(
+            db,
+            user_id=(user.id if user else None),
+            cart_id=cart_id,
+        )
+    else:
+        cart = find_active_cart(db, user_id=(user.id if user else None), cart_id=cart_id)
+        if not cart:
+            raise HTTPException(status_code=404, detail="cart item not found")
+    _set_cart_cookie(req, response, cart.id)
+
+    try:
+        cart = apply_batch(db, cart, ops)
+    except ValueError as e:
+        db.rollback()
+        raise _http_error(e)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Invalid cart/product reference")
+
+    return cart_summary(db, cart)
+
+
 @router.patch("/items/{item_id}")
 def update_item_quantity(
     req: Request,
@@ -137,34 +187,21 @@ def update_item_quantity(
     body: UpdateQtyBody,
     response: Response,
     db: Session = Depends(get_db),
+    user: AuthUser | None = Depends(get_current_user),
     cart_id: Optional[str] = Cookie(default=None, alias=CART_COOKIE),
 ):
-    user = get_optional_user(req, db)
-    cart, created = get_or_create_active_cart(
+    cart = find_active_cart(
         db,
         user_id=(user.id if user else None),
         cart_id=cart_id,
-    )    
-    if created:
-        proto = (req.headers.get("x-forwarded-proto") or req.url.scheme).lower()
-        is_https = proto == "https"
-
-        response.set_cookie(
-            key=CART_COOKIE,
-            value=cart.id,
-            max_age=COOKIE_MAX_AGE,
-            httponly=True,
-            samesite="none" if is_https else "lax",
-            secure=is_https,
-            path ="/",
-        )
-
+    )
+    if not cart:
+        raise HTTPException(status_code=404, detail="cart item not found")
 
     try:
         cart = set_item_quantity(db, cart.id, item_id, body.quantity)
     except ValueError as e:
-        msg = str(e)
-        raise HTTPException(status_code=404 if "not found" in msg else 400, detail=msg)
+        raise _http_error(e)
 
     return cart_summary(db, cart)
 
@@ -175,29 +212,21 @@ def delete_item(
     item_id: str,
     response: Response,
     db: Session = Depends(get_db),
+    user: AuthUser | None = Depends(get_current_user),
     cart_id: Optional[str] = Cookie(default=None, alias=CART_COOKIE),
 ):
-    user = get_optional_user(req, db)
-    cart, created = get_or_create_active_cart(
+    cart = find_active_cart(
         db,
         user_id=(user.id if user else None),
         cart_id=cart_id,
     )
-    if created:
-        response.set_cookie(
-            key=CART_COOKIE,
-            value=cart.id,
-            max_age=COOKIE_MAX_AGE,
-            httponly=True,
-            samesite="lax",
-            secure=False,
-        )
+    if not cart:
+        raise HTTPException(status_code=404, detail="cart item not found")
 
     try:
         cart = remove_item(db, cart.id, item_id)
     except ValueError as e:
-        msg = str(e)
-        raise HTTPException(status_code=404 if "not found" in msg else 400, detail=msg)
+        raise _http_error(e)
 
     return cart_summary(db, cart)
 
@@ -207,23 +236,16 @@ def clear_current_cart(
     req: Request,
     response: Response,
     db: Session = Depends(get_db),
+    user: AuthUser | None = Depends(get_current_user),
     cart_id: Optional[str] = Cookie(default=None, alias=CART_COOKIE),
 ):
-    user = get_optional_user(req, db)
-    cart, created = get_or_create_active_cart(
+    cart = find_active_cart(
         db,
         user_id=(user.id if user else None),
         cart_id=cart_id,
     )
-    if created:
-        response.set_cookie(
-            key=CART_COOKIE,
-            value=cart.id,
-            max_age=COOKIE_MAX_AGE,
-            httponly=True,
-            samesite="lax",
-            secure=False,
-        )
+    if not cart:
+        return empty_cart_summary(user.id if user else None)
 
     cart = clear_cart(db, cart.id)
     return cart_summary(db, cart)
@@ -233,39 +255,23 @@ def checkout_current_cart(
     req: Request,
     response: Response,
     db: Session = Depends(get_db),
+    user: AuthUser | None = Depends(get_current_user),
     cart_id: Optional[str] = Cookie(default=None, alias=CART_COOKIE),
 ):
-    user = get_optional_user(req, db)
-    cart, created = get_or_create_active_cart(
+    cart = find_active_cart(
         db,
         user_id=(user.id if user else None),
         cart_id=cart_id,
     )
-    # If we created a cart and it's empty, checkout should fail cleanly
+    if not cart:
+        raise HTTPException(status_code=400, detail="cart is empty")
+
     try:
-        order_cart, new_cart = checkout_cart(db, cart)
+        order = checkout_cart(db, cart)
     except ValueError as e:
-        msg = str(e)
-        raise HTTPException(status_code=400, detail=msg)
+        raise HTTPException(status_code=400, detail=str(e))
 
-    # Switch cookie to the fresh active cart
-    proto = (req.headers.get("x-forwarded-proto") or req.url.scheme).lower()
-    is_https = proto == "https"
-
-    response.set_cookie(
-        key=CART_COOKIE,
-        value=cart.id,
-        max_age=COOKIE_MAX_AGE,
-        httponly=True,
-        samesite="none" if is_https else "lax",
-        secure=is_https,
-        path ="/",
-    )
+    # The next add creates a fresh cart; until then the cart is virtual
+    _clear_cart_cookie(response)
 
-    order = cart_summary(db, order_cart)
-    return {
-        "order_id": order_cart.id,
-        "order_total_quantity": order["total_quantity"],
-        "order_subtotal_cents": order["subtotal_cents"],
-        "cart": cart_summary(db, new_cart),
-    }
+    return _checkout_response(order)
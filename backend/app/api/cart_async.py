@@ -0,0 +1,179 @@
+"""Async twin of app.api.cart, mounted instead of it when DB_ASYNC=1. Same paths and payloads."""
+from __future__ import annotations
+
+from typing import Optional
+
+from fastapi import APIRouter, Cookie, Depends, HTTPException, Request, Response
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.cart import (
+    CART_COOKIE,
+    AddItemBody,
+    BatchBody,
+    UpdateQtyBody,
+    _checkout_response,
+    _clear_cart_cookie,
+    _http_error,
+    _set_cart_cookie,
+)
+from app.core.db import get_async_db
+from app.services import cart_service_async as svc
+from app.services.cart_service import empty_cart_summary
+from app.services.session_service import AuthUser, get_current_user_async
+
+router = APIRouter(prefix="/cart", tags=["cart"])
+
+
+@router.get("")
+async def get_cart(
+    req: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    user: AuthUser | None = Depends(get_current_user_async),
+    cart_id: Optional[str] = Cookie(default=None, alias=CART_COOKIE),
+):
+    cart = await svc.find_active_cart(db, user_id=(user.id if user else None), cart_id=cart_id)
+    if not cart:
+        if cart_id:
+            _clear_cart_cookie(response)
+        return empty_cart_summary(user.id if user else None)
+
+    _set_cart_cookie(req, response, cart.id)
+    return await svc.cart_summary(db, cart)
+
+
+@router.post("/items")
+async def add_cart_item(
+    req: Request,
+    body: AddItemBody,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    user: AuthUser | None = Depends(get_current_user_async),
+    cart_id: Optional[str] = Cookie(default=None, alias=CART_COOKIE),
+):
+    cart, created = await svc.get_or_create_active_cart(db, user_id=(user.id if user else None), cart_id=cart_id)
+    _set_cart_cookie(req, response, cart.id)
+
+    try:
+        cart = await svc.add_item(db, cart.id, body.product_id, body.quantity)
+    except ValueError as e:
+        raise _http_error(e)
+    except IntegrityError:
+        raise HTTPException(status_code=400, detail="Invalid cart/product reference")
+
+    return await svc.cart_summary(db, cart)
+
+
+@router.post("/batch")
+async def batch_update_cart(
+    req: Request,
+    body: BatchBody,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    user: AuthUser | None = Depends(get_current_user_async),
+    cart_id: Optional[str] = Cookie(default=None, alias=CART_COOKIE),
+):
+    """Apply several add / set_quantity / remove ops in order, in one transaction."""
+    ops = [op.model_dump() for op in body.ops]
+    user_id = user.id if user else None
+    if any(op["op"] == "add" for op in ops):
+        cart, created = await svc.get_or_create_active_cart(db, user_id=user_id, cart_id=cart_id)
+    else:
+        cart = await svc.find_active_cart(db, user_id=user_id, cart_id=cart_id)
+        if not cart:
+            raise HTTPException(status_code=404, detail="cart item not found")
+    _set_cart_cookie(req, response, cart.id)
+
+    try:
+        cart = await svc.apply_batch(db, cart, ops)
+    except ValueError as e:
+        await db.rollback()
+        raise _http_error(e)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Invalid cart/product reference")
+
+    return await svc.cart_summary(db, cart)
+
+
+@router.patch("/items/{item_id}")
+async def update_item_quantity(
+    req: Request,
+    item_id: str,
+    body: UpdateQtyBody,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    user: AuthUser | None = Depends(get_current_user_async),
+    cart_id: Optional[str] = Cookie(default=None, alias=CART_COOKIE),
+):
+    cart = await svc.find_active_cart(db, user_id=(user.id if user else None), cart_id=cart_id)
+    if not cart:
+        raise HTTPException(status_code=404, detail="cart item not found")
+
+    try:
+        cart = await svc.set_item_quantity(db, cart.id, item_id, body.quantity)
+    except ValueError as e:
+        raise _http_error(e)
+
+    return await svc.cart_summary(db, cart)
+
+
+@router.delete("/items/{item_id}")
+async def delete_item(
+    req: Request,
+    item_id: str,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    user: AuthUser | None = Depends(get_current_user_async),
+    cart_id: Optional[str] = Cookie(default=None, alias=CART_COOKIE),
+):
+    cart = await svc.find_active_cart(db, user_id=(user.id if user else None), cart_id=cart_id)
+    if not cart:
+        raise HTTPException(status_code=404, detail="cart item not found")
+
+    try:
+        cart = await svc.remove_item(db, cart.id, item_id)
+    except ValueError as e:
+        raise _http_error(e)
+
+    return await svc.cart_summary(db, cart)
+
+
+@router.post("/clear")
+async def clear_current_cart(
+    req: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    user: AuthUser | None = Depends(get_current_user_async),
+    cart_id: Optional[str] = Cookie(default=None, alias=CART_COOKIE),
+):
+    cart = await svc.find_active_cart(db, user_id=(user.id if user else None), cart_id=cart_id)
+    if not cart:
+        return empty_cart_summary(user.id if user else None)
+
+    cart = await svc.clear_cart(db, cart.id)
+    return await svc.cart_summary(db, cart)
+
+
+@router.post("/checkout")
+async def checkout_current_cart(
+    req: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    user: AuthUser | None = Depends(get_current_user_async),
+    cart_id: Optional[str] = Cookie(default=None, alias=CART_COOKIE),
+):
+    cart = await svc.find_active_cart(db, user_id=(user.id if user else None), cart_id=cart_id)
+    if not cart:
+        raise HTTPException(status_code=400, detail="cart is empty")
+
+    try:
+        order = await svc.checkout_cart(db, cart)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # The next add creates a fresh cart; until then the cart is virtual
+    _clear_cart_cookie(response)
+
+    return _checkout_response(order)
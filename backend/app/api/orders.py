@@ -1,77 +1,75 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+import base64
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session as DbSession
-from sqlalchemy import desc, func
+from sqlalchemy import select, tuple_
 from app.core.db import get_db
-from app.db.models import User, UserSession, Cart, CartItem, Product
-from datetime import datetime, timezone
-import hashlib
+from app.db.models import Order
+from app.services.session_service import AuthUser, require_user
 
 router = APIRouter(prefix="/orders", tags=["orders"])
-SESSION_COOKIE = "sid"
-
-def _token_hash(token: str) -> str:
-    return hashlib.sha256(token.encode("utf-8")).hexdigest()
 
-def require_user(req: Request, db: DbSession) -> User:
-    token = req.cookies.get(SESSION_COOKIE)
-    if not token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
+ORDERS_PAGE_DEFAULT = 50
+ORDERS_PAGE_MAX = 200
 
-    th = _token_hash(token)
-    sess = db.query(UserSession).filter(UserSession.token_hash == th).first()
-    if not sess:
-        raise HTTPException(status_code=401, detail="Not authenticated")
 
-    exp = sess.expires_at
-    if exp.tzinfo is None:
-        exp = exp.replace(tzinfo=timezone.utc)
+def _encode_cursor(ordered_at: datetime, order_id: str) -> str:
+    raw = f"{ordered_at.isoformat()}|{order_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
 
-    if exp < datetime.now(timezone.utc):
-        # optional cleanup
-        db.delete(sess)
-        db.commit()
-        raise HTTPException(status_code=401, detail="Session expired")
 
-    user = db.query(User).filter(User.id == sess.user_id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        at, order_id = raw.split("|", 1)
+        return datetime.fromisoformat(at), order_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid cursor")
 
-    return user
-
-@router.get("")
-def list_orders(req: Request, db: DbSession = Depends(get_db)):
-    user = require_user(req, db)
 
-    # subtotal_cents = sum(quantity * coalesce(unit_price_cents, product.price_cents, 0))
-    rows = (
-        db.query(
-            Cart.id.label("order_id"),
-            Cart.updated_at.label("ordered_at"),
-            func.coalesce(func.sum(CartItem.quantity), 0).label("quantity_purchased"),
-            func.coalesce(
-                func.sum(
-                    CartItem.quantity
-                    * func.coalesce(CartItem.unit_price_cents, Product.price_cents, 0)
-                ),
-                0,
-            ).label("subtotal_cents"),
-        )
-        .join(CartItem, CartItem.cart_id == Cart.id)
-        .join(Product, Product.id == CartItem.product_id)
-        .filter(Cart.user_id == user.id, Cart.status == "ordered")
-        .group_by(Cart.id, Cart.updated_at)
-        .order_by(desc(Cart.updated_at))
-        .all()
+def _orders_stmt(user_id: str, limit: int, cursor: str | None):
+    """
+    One page of the user's orders, newest first. Keyset on (ordered_at, id)
+    served by ix_orders_user_ordered_at: no OFFSET, no aggregation. Fetches
+    one extra row to know whether there's a next page.
+    """
+    stmt = (
+        select(Order.id, Order.ordered_at, Order.total_quantity, Order.subtotal_cents)
+        .where(Order.user_id == user_id)
+        .order_by(Order.ordered_at.desc(), Order.id.desc())
+        .limit(limit + 1)
     )
+    if cursor:
+        stmt = stmt.where(tuple_(Order.ordered_at, Order.id) < tuple_(*_decode_cursor(cursor)))
+    return stmt
 
+
+def _orders_out(rows, limit: int) -> dict:
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = _encode_cursor(last.ordered_at, last.id)
     return {
         "orders": [
             {
-                "order_id": r.order_id,
+                "order_id": r.id,
                 "ordered_at": r.ordered_at,  # ISO string automatically via FastAPI
-                "quantity_purchased": int(r.quantity_purchased or 0),
-                "subtotal_cents": int(r.subtotal_cents or 0),
+                "quantity_purchased": r.total_quantity,
+                "subtotal_cents": r.subtotal_cents,
             }
-            for r in rows
-        ]
+            for r in page
+        ],
+        "next_cursor": next_cursor,
     }
+
+
+@router.get("")
+def list_orders(
+    limit: int = Query(ORDERS_PAGE_DEFAULT, ge=1, le=ORDERS_PAGE_MAX),
+    cursor: str | None = None,
+    db: DbSession = Depends(get_db),
+    user: AuthUser = Depends(require_user),
+):
+    return _orders_out(db.execute(_orders_stmt(user.id, limit, cursor)).all(), limit)
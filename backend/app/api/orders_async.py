@@ -0,0 +1,19 @@
+"""Async twin of app.api.orders, mounted instead of it when DB_ASYNC=1."""
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.orders import ORDERS_PAGE_DEFAULT, ORDERS_PAGE_MAX, _orders_out, _orders_stmt
+from app.core.db import get_async_db
+from app.services.session_service import AuthUser, require_user_async
+
+router = APIRouter(prefix="/orders", tags=["orders"])
+
+
+@router.get("")
+async def list_orders(
+    limit: int = Query(ORDERS_PAGE_DEFAULT, ge=1, le=ORDERS_PAGE_MAX),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    user: AuthUser = Depends(require_user_async),
+):
+    return _orders_out((await db.execute(_orders_stmt(user.id, limit, cursor))).all(), limit)
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
+
+from app import catalog
+from app.services.copurchase import COPURCHASE
+
+router = APIRouter(prefix="/products", tags=["recommendations"])
+
+MAX_BASKET = 100
+
+
+class BasketBody(BaseModel):
+    product_ids: list[str] = Field(min_length=1, max_length=MAX_BASKET)
+    limit: int = Field(default=8, ge=1, le=50)
+
+
+def _with_products(ranked: list[tuple[str, float]], key: str) -> list[dict]:
+    items = []
+    for pid, v in ranked:
+        p = catalog.get_product(pid)
+        if p is not None:
+            items.append({**p, key: v})
+    return items
+
+
+@router.get("/{product_id}/bought-together")
+def bought_together(product_id: str, limit: int = Query(8, ge=1, le=50)):
+    """Products most often in the same order as this one (precomputed top-N)."""
+    if catalog.INDEX and catalog.get_product(product_id) is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    # over-fetch a little: partners that left the catalog are skipped
+    ranked = COPURCHASE.bought_together(product_id, limit + 4)
+    return {"product_id": product_id, "items": _with_products(ranked, "co_purchases")[:limit]}
+
+
+@router.post("/bought-together")
+def basket_bought_together(body: BasketBody):
+    """Ranks candidates for a whole basket (e.g. the cart) by co-purchases with all of its items."""
+    ranked = COPURCHASE.score(body.product_ids, body.limit + 4)
+    return {"items": _with_products(ranked, "score")[: body.limit]}
@@ -1,14 +1,202 @@
-from fastapi import APIRouter
-from pydantic import BaseModel
-from datetime import datetime
+import json
+from datetime import datetime, timezone
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from app import catalog
+from app.core.config import settings
+from app.services.event_ingest import EVENTS
+from app.services.event_reducer import ANONYMOUS, REDUCER
+from app.services.popularity import POPULARITY, TRENDING_TYPES
+from app.services.session_service import AuthUser, get_current_user, get_current_user_async
 
 router = APIRouter()
 
+# events are attributed to the signed-in user when there is one
+_current_user = get_current_user_async if settings.db_async else get_current_user
+
+RETRY_AFTER_S = 1
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+MAX_REJECTED_REPORTED = 20
+_EPOCH = datetime(1970, 1, 1)
+
+
 class EventIn(BaseModel):
-    type: str  # view|add_to_cart|purchase|remove
+    type: Literal["view", "add_to_cart", "purchase", "remove"]
     productId: str
     ts: datetime | None = None
 
-@router.post("/events")
-def create_event(evt: EventIn):
-    return {"received": True, **evt.model_dump()}
+
+_EVENT_LIST = TypeAdapter(list[EventIn])
+
+
+def _utc_naive(ts: datetime | None) -> datetime:
+    if ts is None:
+        return datetime.utcnow()
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def _event_row(evt: EventIn, user_id: str, session_id: str) -> dict | None:
+    """Row for the events table, or None if the product isn't in the catalog."""
+    if catalog.INDEX and catalog.get_product(evt.productId) is None:
+        return None
+    return {
+        "user_id": user_id,
+        "session_id": session_id,
+        "product_id": evt.productId,
+        "event_type": evt.type,
+        "ts": _utc_naive(evt.ts),
+    }
+
+
+def _too_large(what: str) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"too many {what}")
+
+
+async def _read_json_body(req: Request) -> bytes:
+    body = bytearray()
+    async for chunk in req.stream():
+        body += chunk
+        if len(body) > settings.events_max_body_bytes:
+            raise _too_large("bytes")
+    return bytes(body)
+
+
+async def _read_ndjson_lines(req: Request) -> list[bytes]:
+    """Splits the stream as it arrives; holds at most the capped records plus one partial line."""
+    lines: list[bytes] = []
+    partial = b""
+    size = 0
+    async for chunk in req.stream():
+        size += len(chunk)
+        if size > settings.events_max_body_bytes:
+            raise _too_large("bytes")
+        *complete, partial = (partial + chunk).split(b"\n")
+        lines.extend(line for line in (c.strip() for c in complete) if line)
+        if len(lines) > settings.events_max_batch:
+            raise _too_large("events")
+    if partial.strip():
+        lines.append(partial.strip())
+    return lines
+
+
+def _validate_each(items: list, validate) -> tuple[list[tuple[int, EventIn]], list[dict]]:
+    ok, rejected = [], []
+    for i, item in enumerate(items):
+        try:
+            ok.append((i, validate(item)))
+        except ValidationError as e:
+            rejected.append({"index": i, "error": e.errors()[0]["msg"]})
+    return ok, rejected
+
+
+def _validate_array(body: bytes) -> tuple[list[tuple[int, EventIn]], list[dict]]:
+    # fast path: the whole array validated in one pydantic-core call
+    try:
+        return list(enumerate(_EVENT_LIST.validate_json(body))), []
+    except ValidationError:
+        pass
+    # slow path, only to find out which records are bad
+    try:
+        items = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid JSON")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=422, detail="expected an event object or an array of events")
+    return _validate_each(items, EventIn.model_validate)
+
+
+def _validate_lines(lines: list[bytes]) -> tuple[list[tuple[int, EventIn]], list[dict]]:
+    try:
+        return list(enumerate(_EVENT_LIST.validate_json(b"[" + b",".join(lines) + b"]"))), []
+    except ValidationError:
+        return _validate_each(lines, EventIn.model_validate_json)
+
+
+@router.post("/events", status_code=202)
+async def create_events(
+    req: Request,
+    response: Response,
+    user: AuthUser | None = Depends(_current_user),
+):
+    """
+    Accepts one event object, a JSON array of events, or an NDJSON stream
+    (Content-Type: application/x-ndjson). Valid events are handed to the
+    background writer in one batch and stored within a flush interval;
+    invalid ones are reported by index and skipped. A single object gets the
+    original single-event response (200, the event echoed back) instead of
+    the batch counts.
+    """
+    session_id = req.headers.get("x-session-id") or ANONYMOUS
+    user_id = user.id if user else ANONYMOUS
+    content_type = req.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    single = False
+    if content_type in NDJSON_TYPES:
+        ok, rejected = _validate_lines(await _read_ndjson_lines(req))
+        received = len(ok) + len(rejected)
+    else:
+        body = await _read_json_body(req)
+        single = body.lstrip()[:1] == b"{"
+        if single:
+            try:
+                ok, rejected = [(0, EventIn.model_validate_json(body))], []
+            except ValidationError as e:
+                raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_input=False))
+        else:
+            ok, rejected = _validate_array(body)
+        received = len(ok) + len(rejected)
+        if received > settings.events_max_batch:
+            raise _too_large("events")
+
+    rows = []
+    for i, evt in ok:
+        row = _event_row(evt, user_id, session_id)
+        if row is None:
+            rejected.append({"index": i, "error": "unknown product"})
+        else:
+            rows.append(row)
+
+    if single and rejected:
+        raise HTTPException(status_code=422, detail="unknown product")
+
+    # repeats and sampled-out events stop here; the rest carry their sampling weight
+    valid = len(rows)
+    rows = REDUCER.reduce(rows)
+
+    # trending counts demand even when storage has to shed it
+    POPULARITY.record_many(
+        [
+            (r["product_id"], r["event_type"], (r["ts"] - _EPOCH).total_seconds(), r["weight"])
+            for r in rows
+            if r["event_type"] in TRENDING_TYPES
+        ]
+    )
+
+    if rows and EVENTS.is_full():
+        EVENTS.offer(rows)  # counted as dropped
+        # the client is told to retry; the retry must not look like a repeat
+        REDUCER.forget(rows)
+        raise HTTPException(
+            status_code=503,
+            detail="event buffer full",
+            headers={"Retry-After": str(RETRY_AFTER_S)},
+        )
+
+    accepted, dropped = EVENTS.offer(rows) if rows else (0, 0)
+    if single:
+        response.status_code = 200
+        return {"received": True, **ok[0][1].model_dump()}
+    rejected.sort(key=lambda r: r["index"])
+    return {
+        "received": received,
+        "accepted": accepted,
+        "reduced": valid - len(rows),
+        "dropped": dropped,
+        "rejected": len(rejected),
+        "errors": rejected[:MAX_REJECTED_REPORTED],
+    }
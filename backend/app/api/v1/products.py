@@ -1,14 +1,152 @@
-from fastapi import APIRouter
+"""
+Full-catalog export for downstream consumers (feed generators, the indexing pipeline).
+
+GET /v1/products streams one product per line (NDJSON), gzip-compressed when the
+client accepts gzip (Accept-Encoding, q-values honoured). Rows come from the
+in-memory catalog, or with source=db (and before the catalog is loaded) from
+keyset-paged queries, DB_PAGE_ROWS at a time, so memory stays bounded either way.
+Each page is read in its own short session: one cursor held open for the whole
+streamed response would keep a read transaction open as long as the slowest
+client takes, which on SQLite stops the WAL from being checkpointed.
+
+since_version=N limits the export to rows changed after catalog version N, plus
+{"id", "version", "deleted": true} for products deleted since; X-Catalog-Version
+is the value to pass next time.
+"""
+import json
+import zlib
+from typing import Iterator, Literal
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from app import catalog
+from app.core.db import SessionLocal
+from app.db.models import Product
 
 router = APIRouter()
 
+NDJSON = "application/x-ndjson"
+CHUNK_BYTES = 64 * 1024
+DB_PAGE_ROWS = 2000
+GZIP_LEVEL = 6
+
+
+def _paged_products(*where) -> Iterator[Product]:
+    """Products matching `where` in id order, one keyset page (and session) at a time."""
+    after = None
+    while True:
+        stmt = select(Product).where(*where).order_by(Product.id).limit(DB_PAGE_ROWS)
+        if after is not None:
+            stmt = stmt.where(Product.id > after)
+        with SessionLocal() as db:
+            page = db.execute(stmt).scalars().all()
+        yield from page
+        if len(page) < DB_PAGE_ROWS:
+            return
+        after = page[-1].id
+
+
+def _tombstones(since_version: int) -> Iterator[dict]:
+    for row in _paged_products(Product.deleted_at.is_not(None), Product.version > since_version):
+        yield catalog.tombstone(row.id, row.version)
+
+
+def _memory_rows(since_version: int | None) -> Iterator[dict]:
+    # PRODUCTS is replaced, never mutated, on reload: this pass sees one consistent list
+    for p in catalog.PRODUCTS:
+        if since_version is None or p["version"] > since_version:
+            yield p
+    if since_version is not None:
+        yield from _tombstones(since_version)
+
+
+def _db_rows(since_version: int | None) -> Iterator[dict]:
+    if since_version is None:
+        rows = _paged_products(Product.deleted_at.is_(None))
+    else:
+        rows = _paged_products(Product.version > since_version)
+    for row in rows:
+        if row.deleted_at is not None:
+            d = catalog.tombstone(row.id, row.version)
+        else:
+            d = catalog.product_dict(row)
+        if d is not None:
+            yield d
+
+
+def _ndjson_chunks(rows: Iterator[dict]) -> Iterator[bytes]:
+    buf = bytearray()
+    for d in rows:
+        buf += json.dumps(d, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        buf += b"\n"
+        if len(buf) >= CHUNK_BYTES:
+            yield bytes(buf)
+            buf.clear()
+    if buf:
+        yield bytes(buf)
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """
+    Whether an Accept-Encoding value allows gzip: listed (or matched by "*" when
+    not listed) with q > 0. "gzip;q=0" is an explicit refusal.
+    """
+    q_by_coding: dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        q_by_coding[coding] = q
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in q_by_coding:
+            return q_by_coding[coding] > 0
+    return False
+
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    for chunk in chunks:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
+
+
 @router.get("/products")
-def list_products(query: str | None = None, page: int = 1, limit: int = 24):
-    # Placeholder until DB is wired
-    return {
-        "items": [],
-        "page": page,
-        "limit": limit,
-        "query": query,
-        "total": 0,
+def export_products(
+    req: Request,
+    since_version: int | None = Query(None, ge=0),
+    source: Literal["memory", "db"] = "memory",
+):
+    use_db = source == "db" or not catalog.INDEX
+    if use_db:
+        # read before the rows: a seed committing mid-export (even between
+        # pages) can only make the client fetch a few rows twice next time, never miss one
+        with SessionLocal() as db:
+            version = catalog.current_version(db)
+        body = _ndjson_chunks(_db_rows(since_version))
+    else:
+        version = catalog.VERSION
+        body = _ndjson_chunks(_memory_rows(since_version))
+
+    headers = {
+        "X-Catalog-Version": str(version),
+        "Cache-Control": "no-store",
+        "Vary": "Accept-Encoding",
     }
+    if _accepts_gzip(req.headers.get("accept-encoding", "")):
+        body = _gzip(body)
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(body, media_type=NDJSON, headers=headers)
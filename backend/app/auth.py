@@ -1,31 +1,51 @@
 # app/auth.py
 from fastapi import APIRouter, HTTPException, Response, Request, Depends
 from pydantic import BaseModel, EmailStr
+from sqlalchemy import select
 from sqlalchemy.orm import Session as DbSession
 from datetime import datetime, timedelta, timezone
-import secrets, hashlib
+import secrets
+from uuid import uuid4
 
+from app.core.config import settings
 from app.core.db import get_db
+from app.core.write_queue import run_write
 from app.db.models import User, UserSession
 
 from app.services.cart_service import attach_guest_cart_to_user 
+from app.services.session_service import (
+    SESSION_COOKIE,
+    AuthUser,
+    forget_session,
+    get_current_user,
+    issue_signed_token,
+    remember_session,
+    token_hash as _token_hash,
+)
 
 CART_COOKIE = "cart_id" 
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-SESSION_COOKIE = "sid"
 SESSION_TTL_DAYS = 30
 
 def _new_token() -> str:
     return secrets.token_urlsafe(32)
 
-def _token_hash(token: str) -> str:
-    return hashlib.sha256(token.encode("utf-8")).hexdigest()
-
 def _expires_at() -> datetime:
     return datetime.now(timezone.utc) + timedelta(days=SESSION_TTL_DAYS)
 
+def _start_session(user: User) -> tuple[str, datetime, UserSession]:
+    """Returns (cookie token, expires_at, unsaved UserSession row); the caller persists the row."""
+    expires_at = _expires_at()
+    session_id = uuid4().hex
+    if settings.session_token_mode == "signed":
+        token = issue_signed_token(user, session_id, expires_at)
+    else:
+        token = _new_token()
+    row = UserSession(id=session_id, user_id=user.id, token_hash=_token_hash(token), expires_at=expires_at)
+    return token, expires_at, row
+
 def _set_session_cookie(resp: Response, token: str):
     resp.set_cookie(
         key=SESSION_COOKIE,
@@ -44,28 +64,23 @@ def _placeholder_password_hash() -> str:
     # satisfies NOT NULL constraint; not used for auth in this MVP
     return secrets.token_hex(32)
 
-def _get_user_from_request(req: Request, db: DbSession) -> User | None:
-    token = req.cookies.get(SESSION_COOKIE)
-    if not token:
-        return None
+# shared with app.auth_async so both routers look users up and answer alike
 
-    th = _token_hash(token)
-    sess = db.query(UserSession).filter(UserSession.token_hash == th).first()
-    if not sess:
-        return None
+def _normalize_email(email: str) -> str:
+    return email.lower().strip()
 
-    now = datetime.now(timezone.utc)
-    exp = sess.expires_at
-    # SQLite may return naive datetimes; treat as UTC
-    if exp.tzinfo is None:
-        exp = exp.replace(tzinfo=timezone.utc)
+def _user_by_email_stmt(email: str):
+    return select(User).where(User.email == email)
 
-    if exp < now:
-        db.delete(sess)
-        db.commit()
-        return None
+def _new_user(payload: "RegisterIn", email: str) -> User:
+    return User(
+        email=email,
+        name=(payload.name.strip() if payload.name else None),
+        password_hash=_placeholder_password_hash(),
+    )
 
-    return db.query(User).filter(User.id == sess.user_id).first()
+def _user_out(user: User | AuthUser) -> dict:
+    return {"id": user.id, "email": user.email, "name": user.name}
 
 # ----- Schemas (passwordless) -----
 class RegisterIn(BaseModel):
@@ -82,17 +97,13 @@ class UserOut(BaseModel):
 
 @router.post("/register", response_model=UserOut)
 def register(payload: RegisterIn, req: Request, resp: Response, db: DbSession = Depends(get_db)):
-    email = payload.email.lower().strip()
+    email = _normalize_email(payload.email)
 
-    exists = db.query(User).filter(User.email == email).first()
+    exists = db.execute(_user_by_email_stmt(email)).scalars().first()
     if exists:
         raise HTTPException(status_code=409, detail="Email already registered")
 
-    user = User(
-        email=email,
-        name=(payload.name.strip() if payload.name else None),
-        password_hash=_placeholder_password_hash(),
-    )
+    user = _new_user(payload, email)
     db.add(user)
     db.flush()  # user.id available
 
@@ -101,20 +112,21 @@ def register(payload: RegisterIn, req: Request, resp: Response, db: DbSession =
     if guest_cart_id:
         attach_guest_cart_to_user(db, guest_cart_id, user.id)
 
-    token = _new_token()
-    sess = UserSession(user_id=user.id, token_hash=_token_hash(token), expires_at=_expires_at())
+    # the new user row isn't committed yet, so the session goes in the same transaction
+    token, expires_at, sess = _start_session(user)
     db.add(sess)
     db.commit()
+    remember_session(token, user, expires_at)
 
     _set_session_cookie(resp, token)
-    return {"id": user.id, "email": user.email, "name": user.name}
+    return _user_out(user)
 
 
 @router.post("/login", response_model=UserOut)
 def login(payload: LoginIn, req: Request, resp: Response, db: DbSession = Depends(get_db)):
-    email = payload.email.lower().strip()
+    email = _normalize_email(payload.email)
 
-    user = db.query(User).filter(User.email == email).first()
+    user = db.execute(_user_by_email_stmt(email)).scalars().first()
     if not user:
         raise HTTPException(status_code=401, detail="No account for this email")
 
@@ -123,31 +135,25 @@ def login(payload: LoginIn, req: Request, resp: Response, db: DbSession = Depend
     if guest_cart_id:
         attach_guest_cart_to_user(db, guest_cart_id, user.id)
 
-    token = _new_token()
-    sess = UserSession(user_id=user.id, token_hash=_token_hash(token), expires_at=_expires_at())
-    db.add(sess)
-    db.commit()
+    token, expires_at, sess = _start_session(user)
+    run_write(db, lambda w: w.add(sess))
+    remember_session(token, user, expires_at)
 
     _set_session_cookie(resp, token)
-    return {"id": user.id, "email": user.email, "name": user.name}
+    return _user_out(user)
 
 
 @router.post("/logout")
 def logout(req: Request, resp: Response, db: DbSession = Depends(get_db)):
     token = req.cookies.get(SESSION_COOKIE)
     if token:
-        th = _token_hash(token)
-        sess = db.query(UserSession).filter(UserSession.token_hash == th).first()
-        if sess:
-            db.delete(sess)
-            db.commit()
+        forget_session(token, db)
 
     _clear_session_cookie(resp)
     return {"ok": True}
 
 @router.get("/me", response_model=UserOut)
-def me(req: Request, db: DbSession = Depends(get_db)):
-    user = _get_user_from_request(req, db)
+def me(user: AuthUser | None = Depends(get_current_user)):
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    return {"id": user.id, "email": user.email, "name": user.name}
+    return _user_out(user)
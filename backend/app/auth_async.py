@@ -0,0 +1,92 @@
+# app/auth_async.py
+"""Async twin of app.auth, mounted instead of it when DB_ASYNC=1."""
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth import (
+    CART_COOKIE,
+    LoginIn,
+    RegisterIn,
+    UserOut,
+    _clear_session_cookie,
+    _new_user,
+    _normalize_email,
+    _set_session_cookie,
+    _start_session,
+    _user_by_email_stmt,
+    _user_out,
+)
+from app.core.db import get_async_db
+from app.services.cart_service_async import attach_guest_cart_to_user
+from app.services.session_service import (
+    SESSION_COOKIE,
+    AuthUser,
+    forget_session_async,
+    get_current_user_async,
+    remember_session,
+)
+
+router = APIRouter(prefix="/auth", tags=["auth"])
+
+
+@router.post("/register", response_model=UserOut)
+async def register(payload: RegisterIn, req: Request, resp: Response, db: AsyncSession = Depends(get_async_db)):
+    email = _normalize_email(payload.email)
+
+    exists = (await db.execute(_user_by_email_stmt(email))).scalars().first()
+    if exists:
+        raise HTTPException(status_code=409, detail="Email already registered")
+
+    user = _new_user(payload, email)
+    db.add(user)
+    await db.flush()  # user.id available
+
+    guest_cart_id = req.cookies.get(CART_COOKIE)
+    if guest_cart_id:
+        await attach_guest_cart_to_user(db, guest_cart_id, user.id)
+
+    token, expires_at, sess = _start_session(user)
+    db.add(sess)
+    await db.commit()
+    remember_session(token, user, expires_at)
+
+    _set_session_cookie(resp, token)
+    return _user_out(user)
+
+
+@router.post("/login", response_model=UserOut)
+async def login(payload: LoginIn, req: Request, resp: Response, db: AsyncSession = Depends(get_async_db)):
+    email = _normalize_email(payload.email)
+
+    user = (await db.execute(_user_by_email_stmt(email))).scalars().first()
+    if not user:
+        raise HTTPException(status_code=401, detail="No account for this email")
+
+    guest_cart_id = req.cookies.get(CART_COOKIE)
+    if guest_cart_id:
+        await attach_guest_cart_to_user(db, guest_cart_id, user.id)
+
+    token, expires_at, sess = _start_session(user)
+    db.add(sess)
+    await db.commit()
+    remember_session(token, user, expires_at)
+
+    _set_session_cookie(resp, token)
+    return _user_out(user)
+
+
+@router.post("/logout")
+async def logout(req: Request, resp: Response, db: AsyncSession = Depends(get_async_db)):
+    token = req.cookies.get(SESSION_COOKIE)
+    if token:
+        await forget_session_async(token, db)
+
+    _clear_session_cookie(resp)
+    return {"ok": True}
+
+
+@router.get("/me", response_model=UserOut)
+async def me(user: AuthUser | None = Depends(get_current_user_async)):
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return _user_out(user)
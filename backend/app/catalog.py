@@ -0,0 +1,146 @@
+"""
+In-process product catalog shared across routers and services.
+
+app.main builds PRODUCTS/INDEX at startup and publishes them here, so services
+(cart pricing, summaries) can read product fields without querying `products`.
+"""
+from __future__ import annotations
+
+import os
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db.models import CatalogVersion, Product
+
+IMAGE_BASE_URL = (os.getenv("IMAGE_BASE_URL") or "").rstrip("/")
+
+PRODUCTS: list[dict] = []
+INDEX: dict[str, dict] = {}
+# catalog version PRODUCTS reflects (see current_version)
+VERSION = 0
+
+def publish(products: list[dict], index: dict[str, dict], version: int = 0) -> None:
+    global PRODUCTS, INDEX, VERSION
+    PRODUCTS = products
+    INDEX = index
+    # last: whoever reads VERSION and then PRODUCTS never gets rows older than VERSION
+    VERSION = version
+
+def get_product(product_id: str) -> dict | None:
+    return INDEX.get(str(product_id))
+
+def current_version(db: Session) -> int:
+    """Newest catalog version written by scripts.seed_products (0 before the first incremental seed)."""
+    return db.execute(select(func.coalesce(func.max(CatalogVersion.version), 0))).scalar_one()
+
+def tombstone(product_id: str, version: int) -> dict:
+    """Export/refresh record for a product deleted in `version`."""
+    return {"id": product_id, "version": version, "deleted": True}
+
+def apply_changes(products: list[dict], changed: list[Product]) -> list[dict]:
+    """
+    New PRODUCTS list with `changed` rows (inserted, updated or soft-deleted
+    since the last load) applied; existing products keep their positions.
+    Returns a new list: readers of the old one are unaffected.
+    """
+    updates: dict[str, dict | None] = {}
+    for row in changed:
+        if row.deleted_at is not None:
+            updates[str(row.id).strip()] = None
+        else:
+            d = product_dict(row)
+            if d is not None:
+                updates[d["id"]] = d
+
+    out = []
+    for p in products:
+        if p["id"] in updates:
+            d = updates.pop(p["id"])
+            if d is not None:
+                out.append(d)
+        else:
+            out.append(p)
+    # whatever is left wasn't loaded before: new products (or deletes of unknown ones)
+    out.extend(d for d in updates.values() if d is not None)
+    return out
+
+def build_image_key(article_id: str) -> str:
+    aid = str(article_id).strip().zfill(10)
+    # Matches your R2 layout: images_data/011/0110065002.jpg
+    return f"images_data/{aid[:3]}/{aid}.jpg"
+
+def product_dict(p: Product) -> dict | None:
+    """API shape of a products row (what PRODUCTS holds); None for rows without an id."""
+    pid = str(p.id).strip()
+    if not pid:
+        return None
+
+    # Prefer the "convenience" name, fall back to raw CSV name
+    name = (p.name or p.prod_name or "Untitled").strip()
+
+    # Price: prefer float `price`, else derive from `price_cents`
+    price = p.price
+    if price is None and p.price_cents is not None:
+        price = float(p.price_cents) / 100.0
+    price = float(price or 0.0)
+
+    # Integer cents for cart pricing: prefer price_cents, else derive from price
+    price_cents = p.price_cents
+    if price_cents is None and p.price is not None:
+        price_cents = int(round(float(p.price) * 100))
+
+    # Use canonical CSV columns for filtering (what your endpoints use)
+    product_group_name = (p.product_group_name or p.category or "").strip()
+    index_group_name = (p.index_group_name or "").strip()
+    colour_group_name = (p.colour_group_name or p.color or "").strip()
+
+    description = (p.description or p.detail_desc or "").strip()
+
+    # Mode derived from index_group_name (same logic you had)
+    mode = None
+    if index_group_name == "Menswear":
+        mode = "men"
+    elif index_group_name in ("Ladieswear", "Divided"):
+        mode = "women"
+
+    # Image: prefer stored image_key; else compute from id (article_id)
+    image_key = (p.image_key or "").strip()
+    if not image_key:
+        image_key = build_image_key(pid)
+
+    # Return a usable URL (AWS in prod; local /images in dev)
+    if IMAGE_BASE_URL:
+        image_url = f"{IMAGE_BASE_URL}/{image_key.lstrip('/')}"
+    else:
+        # local fallback
+        aid = pid.zfill(10)
+        image_url = f"/images/{aid[:3]}/{aid}.jpg"
+
+    return {
+        "id": pid,
+        "name": name,
+        "price": price,
+        "price_cents": price_cents,
+        "image_key": image_key,
+        "image_url": image_url,
+
+        # fields your endpoints/search expect:
+        "product_group_name": product_group_name,
+        "index_group_name": index_group_name,
+        "colour_group_name": colour_group_name,
+        "color_name": colour_group_name,
+
+        "description": description,
+        "mode": mode,
+
+        # optional extras (handy later)
+        "perceived_colour_master_name": (p.perceived_colour_master_name or "").strip(),
+        "product_type_name": (p.product_type_name or "").strip(),
+        "department_name": (p.department_name or "").strip(),
+        "section_name": (p.section_name or "").strip(),
+        "has_image": bool(p.has_image),
+
+        # catalog version of the row's last change (GET /v1/products?since_version=)
+        "version": p.version,
+    }
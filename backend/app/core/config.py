@@ -1,5 +1,7 @@
 # app/core/config.py
-from pydantic import Field, field_validator
+from typing import Literal
+
+from pydantic import Field, field_validator, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -13,6 +15,89 @@ class Settings(BaseSettings):
     database_url: str = Field(..., alias="DATABASE_URL")
     image_base_url: str | None = Field(default=None, alias="IMAGE_BASE_URL")
 
+    # Semantic search query encoder. SEMANTIC_ONNX_FILE picks a variant shipped in the
+    # model repo, e.g. onnx/model_qint8_avx512_vnni.onnx (int8) or onnx/model_O3.onnx;
+    # unset = fp32 onnx/model.onnx. Thread counts of 0 keep the onnxruntime defaults.
+    semantic_model_name: str = Field(default="sentence-transformers/all-MiniLM-L6-v2", alias="SEMANTIC_MODEL_NAME")
+    semantic_onnx_file: str | None = Field(default=None, alias="SEMANTIC_ONNX_FILE")
+    semantic_intra_op_threads: int = Field(default=0, ge=0, alias="SEMANTIC_INTRA_OP_THREADS")
+    semantic_inter_op_threads: int = Field(default=0, ge=0, alias="SEMANTIC_INTER_OP_THREADS")
+
+    # Admission control for semantic inference (its own executor, not Starlette's threadpool)
+    semantic_max_concurrency: int = Field(default=2, ge=1, alias="SEMANTIC_MAX_CONCURRENCY")
+    # counts jobs not yet picked up by a worker, so 0 would reject everything
+    semantic_max_queue: int = Field(default=16, ge=1, alias="SEMANTIC_MAX_QUEUE")
+    semantic_queue_timeout_ms: int = Field(default=250, ge=1, alias="SEMANTIC_QUEUE_TIMEOUT_MS")
+
+    # In-process sid -> user cache. The TTL bounds how stale a logout on another worker can be.
+    session_cache_max_entries: int = Field(default=10000, ge=0, alias="SESSION_CACHE_MAX_ENTRIES")
+    session_cache_ttl_s: float = Field(default=60.0, gt=0, alias="SESSION_CACHE_TTL_S")
+
+    # "db": opaque sid looked up in user_sessions. "signed": HMAC-signed sid verified
+    # without the DB; user_sessions rows are kept for audit/revocation only.
+    session_token_mode: Literal["db", "signed"] = Field(default="db", alias="SESSION_TOKEN_MODE")
+    session_signing_key: str | None = Field(default=None, alias="SESSION_SIGNING_KEY")
+    session_revocation_refresh_s: float = Field(default=30.0, gt=0, alias="SESSION_REVOCATION_REFRESH_S")
+
+    # Background sweeper: abandon stale guest carts, purge them after a grace period,
+    # delete expired sessions. Each step touches at most batch_size * max_batches rows per run.
+    maintenance_enabled: bool = Field(default=True, alias="MAINTENANCE_ENABLED")
+    maintenance_interval_s: float = Field(default=600.0, gt=0, alias="MAINTENANCE_INTERVAL_S")
+    maintenance_batch_size: int = Field(default=500, ge=1, alias="MAINTENANCE_BATCH_SIZE")
+    maintenance_max_batches: int = Field(default=20, ge=1, alias="MAINTENANCE_MAX_BATCHES")
+    cart_empty_ttl_hours: float = Field(default=24.0, gt=0, alias="CART_EMPTY_TTL_HOURS")
+    cart_idle_ttl_days: float = Field(default=30.0, gt=0, alias="CART_IDLE_TTL_DAYS")
+    cart_purge_grace_days: float = Field(default=7.0, ge=0, alias="CART_PURGE_GRACE_DAYS")
+
+    # Group commit for cart/session writes (intended for SQLite): one writer thread
+    # commits everything queued (plus up to WRITE_QUEUE_WINDOW_MS of stragglers) at once.
+    write_queue_enabled: bool = Field(default=False, alias="WRITE_QUEUE_ENABLED")
+    write_queue_window_ms: float = Field(default=0.0, ge=0, alias="WRITE_QUEUE_WINDOW_MS")
+    write_queue_max_batch: int = Field(default=64, ge=1, alias="WRITE_QUEUE_MAX_BATCH")
+    write_queue_timeout_s: float = Field(default=10.0, gt=0, alias="WRITE_QUEUE_TIMEOUT_S")
+
+    # Serve cart/auth/orders with AsyncSession (psycopg async / aiosqlite) instead of sync
+    # sessions on the threadpool. The write queue above only applies to the sync path.
+    db_async: bool = Field(default=False, alias="DB_ASYNC")
+
+    # Buffered event ingestion: rows are bulk-inserted every EVENTS_BATCH_SIZE rows or
+    # EVENTS_FLUSH_INTERVAL_MS. Above EVENTS_SHED_HIGH_WATER * EVENTS_MAX_QUEUE views are dropped.
+    events_max_queue: int = Field(default=20000, ge=1, alias="EVENTS_MAX_QUEUE")
+    events_batch_size: int = Field(default=500, ge=1, alias="EVENTS_BATCH_SIZE")
+    events_flush_interval_ms: int = Field(default=1000, ge=1, alias="EVENTS_FLUSH_INTERVAL_MS")
+    events_shed_high_water: float = Field(default=0.8, gt=0, le=1, alias="EVENTS_SHED_HIGH_WATER")
+    # Bulk POST /v1/events (JSON array or NDJSON): caps per request
+    events_max_batch: int = Field(default=1000, ge=1, alias="EVENTS_MAX_BATCH")
+    events_max_body_bytes: int = Field(default=1_048_576, ge=1024, alias="EVENTS_MAX_BODY_BYTES")
+    # Ingestion reducer: repeats of (session, user, product, type) for EVENTS_DEDUP_TYPES within
+    # EVENTS_DEDUP_WINDOW_S are dropped (0 disables); EVENTS_SAMPLE_RATES keeps e.g.
+    # {"view": 0.25} of a type and stores the rest with weight 1/rate.
+    events_dedup_window_s: float = Field(default=1800, ge=0, alias="EVENTS_DEDUP_WINDOW_S")
+    events_dedup_types: list[str] = Field(default=["view"], alias="EVENTS_DEDUP_TYPES")
+    events_dedup_max_keys: int = Field(default=200_000, ge=1, alias="EVENTS_DEDUP_MAX_KEYS")
+    events_sample_rates: dict[str, float] = Field(default_factory=dict, alias="EVENTS_SAMPLE_RATES")
+    # Where flushed events go: the events table, hourly append-only gzip segments on disk
+    # (EVENTS_STORE_DIR, default data/events), or both. Sealed hours are compacted
+    # into one segment plus a columnar .npz export every EVENTS_STORE_COMPACT_INTERVAL_S.
+    events_sink: Literal["db", "segments", "both"] = Field(default="db", alias="EVENTS_SINK")
+    events_store_dir: str | None = Field(default=None, alias="EVENTS_STORE_DIR")
+    events_store_segment_bytes: int = Field(default=64 * 1024 * 1024, ge=1024, alias="EVENTS_STORE_SEGMENT_BYTES")
+    events_store_compact_interval_s: int = Field(default=600, ge=1, alias="EVENTS_STORE_COMPACT_INTERVAL_S")
+    # Trending: exponentially decayed view/add_to_cart/purchase counters kept in memory,
+    # snapshotted to product_popularity every POPULARITY_SNAPSHOT_INTERVAL_S.
+    popularity_half_life_hours: float = Field(default=48.0, gt=0, alias="POPULARITY_HALF_LIFE_HOURS")
+    popularity_top_k: int = Field(default=100, ge=1, alias="POPULARITY_TOP_K")
+    popularity_snapshot_interval_s: int = Field(default=300, ge=1, alias="POPULARITY_SNAPSHOT_INTERVAL_S")
+    # /products/homepage?weighted=1: alias tables over the add_to_cart/purchase counters above,
+    # rebuilt off the request path at most this often (and only if the counters moved).
+    homepage_weights_refresh_s: int = Field(default=60, ge=1, alias="HOMEPAGE_WEIGHTS_REFRESH_S")
+    # Bought-together: co-purchase partners kept per product; orders with more distinct
+    # products than COPURCHASE_MAX_ORDER_ITEMS don't count.
+    copurchase_top_n: int = Field(default=20, ge=1, alias="COPURCHASE_TOP_N")
+    copurchase_max_order_items: int = Field(default=50, ge=2, alias="COPURCHASE_MAX_ORDER_ITEMS")
+    # Poll catalog_versions this often and apply rows changed by incremental seeds
+    # (scripts.seed_products) without a restart. 0 disables.
+    catalog_refresh_interval_s: int = Field(default=30, ge=0, alias="CATALOG_REFRESH_INTERVAL_S")
 
     @field_validator("database_url", mode="before")
     @classmethod
@@ -28,5 +113,19 @@ class Settings(BaseSettings):
 
         return url
 
+    @field_validator("events_sample_rates")
+    @classmethod
+    def check_sample_rates(cls, v: dict[str, float]) -> dict[str, float]:
+        for event_type, rate in v.items():
+            if not 0 < rate <= 1:
+                raise ValueError(f"EVENTS_SAMPLE_RATES[{event_type!r}] must be in (0, 1]")
+        return v
+
+    @model_validator(mode="after")
+    def require_signing_key(self) -> "Settings":
+        if self.session_token_mode == "signed" and not self.session_signing_key:
+            raise ValueError("SESSION_TOKEN_MODE=signed requires SESSION_SIGNING_KEY")
+        return self
+
 
 settings = Settings()
@@ -1,10 +1,16 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
 from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from sqlalchemy.engine import Engine
-import sqlite3
 
 from app.core.config import settings
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
 connect_args = {}
 if settings.database_url.startswith("sqlite"):
     connect_args = {"check_same_thread": False}
@@ -15,10 +21,16 @@ engine = create_engine(
     connect_args=connect_args,
 )
 
+def _is_sqlite_driver(dbapi_connection) -> bool:
+    # sqlite3 on the sync engine, SQLAlchemy's aiosqlite adapter on the async one;
+    # checked by module so neither driver has to be importable
+    module = type(dbapi_connection).__module__
+    return module == "sqlite3" or module.endswith(".aiosqlite")
+
 @event.listens_for(Engine, "connect")
 def _set_sqlite_pragmas(dbapi_connection, _):
     # Only apply to SQLite connections
-    if isinstance(dbapi_connection, sqlite3.Connection):
+    if _is_sqlite_driver(dbapi_connection):
         cursor = dbapi_connection.cursor()
         cursor.execute("PRAGMA foreign_keys=ON;")
         cursor.execute("PRAGMA journal_mode=WAL;")
@@ -36,3 +48,28 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def async_database_url(url: str) -> str:
+    # psycopg 3 serves both sync and async under the same dialect name
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+
+# Only built with DB_ASYNC=1 so the sync deployment doesn't need aiosqlite/greenlet.
+async_engine: AsyncEngine | None = None
+AsyncSessionLocal: async_sessionmaker[AsyncSession] | None = None
+
+if settings.db_async:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(async_database_url(settings.database_url), pool_pre_ping=True)
+    # no expire_on_commit: attribute access after commit would need implicit (sync) IO
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("get_async_db needs DB_ASYNC=1: no async engine was created")
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Callable, TypeVar
+
+from sqlalchemy.orm import Session, sessionmaker
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class GroupCommitQueue:
+    """
+    Single-writer executor with group commit (meant for SQLite, which allows
+    one writer at a time anyway).
+
+    Callers submit a write job `fn(session) -> result` that must not commit.
+    The writer thread takes every job waiting in the queue (optionally
+    lingering `window_ms` for more), runs each inside its own SAVEPOINT and
+    commits them all in one transaction. A job that raises is rolled back to
+    its savepoint and only its caller sees the error; if the final commit
+    fails, every caller in the batch gets that error.
+
+    A caller whose timeout passes before its job starts gets TimeoutError and
+    the job is dropped, never run. Once the job has started the caller waits
+    for its outcome, so a write it was told failed can't land later.
+    """
+
+    def __init__(self, session_factory: sessionmaker, window_ms: float = 0.0, max_batch: int = 64):
+        self.session_factory = session_factory
+        self.window_s = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._q: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="group-commit", daemon=True)
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.jobs = 0
+        self.max_batch_seen = 0
+        self.timed_out = 0
+        self._thread.start()
+
+    def submit(self, fn: Callable[[Session], T], timeout: float | None = None) -> T:
+        fut: Future = Future()
+        self._q.put((fn, fut))
+        try:
+            return fut.result(timeout)
+        except FutureTimeout:
+            if not fut.cancel():
+                # already running: it will commit or fail shortly, report which
+                return fut.result()
+            with self._lock:
+                self.timed_out += 1
+            raise
+
+    def stop(self) -> None:
+        self._q.put(None)
+        self._thread.join(timeout=5)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": self._q.qsize(),
+                "batches": self.batches,
+                "jobs": self.jobs,
+                "avg_batch": round(self.jobs / self.batches, 2) if self.batches else 0.0,
+                "max_batch": self.max_batch_seen,
+                "timed_out": self.timed_out,
+            }
+
+    def _collect(self, first) -> tuple[list, bool]:
+        jobs = [first]
+        deadline = time.monotonic() + self.window_s
+        while len(jobs) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                job = self._q.get(timeout=remaining) if remaining > 0 else self._q.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                return jobs, True
+            jobs.append(job)
+        return jobs, False
+
+    def _loop(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._q.get()
+            if first is None:
+                break
+            jobs, stopping = self._collect(first)
+            try:
+                self._run_batch(jobs)
+            except Exception as e:  # never let the writer thread die
+                log.exception("group commit batch failed")
+                for _, fut in jobs:
+                    if not fut.done():
+                        fut.set_exception(e)
+
+    def _run_batch(self, jobs: list) -> None:
+        jobs = [(fn, fut) for fn, fut in jobs if not fut.cancelled()]
+        if not jobs:
+            return
+        ran = 0
+        done: list[tuple[Future, object]] = []
+        with self.session_factory() as db:
+            if db.get_bind().dialect.name == "sqlite":
+                # explicit write transaction so SAVEPOINTs nest inside it (pysqlite
+                # otherwise treats the first SAVEPOINT as the outer transaction)
+                db.connection().exec_driver_sql("BEGIN IMMEDIATE")
+
+            for fn, fut in jobs:
+                # marked running only on its own turn: a caller that times out
+                # while earlier jobs of the batch run can still cancel it
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                ran += 1
+                sp = db.begin_nested()
+                try:
+                    out = fn(db)
+                    sp.commit()
+                except BaseException as e:
+                    sp.rollback()
+                    fut.set_exception(e)
+                else:
+                    done.append((fut, out))
+
+            try:
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                for fut, _ in done:
+                    fut.set_exception(e)
+                return
+
+        with self._lock:
+            self.batches += 1
+            self.jobs += ran
+            self.max_batch_seen = max(self.max_batch_seen, ran)
+        for fut, out in done:
+            fut.set_result(out)
+
+
+WRITE_QUEUE: GroupCommitQueue | None = None
+WRITE_TIMEOUT_S: float | None = None
+
+
+def start_write_queue(session_factory: sessionmaker, window_ms: float, max_batch: int, timeout_s: float | None = None) -> GroupCommitQueue:
+    global WRITE_QUEUE, WRITE_TIMEOUT_S
+    stop_write_queue()
+    WRITE_QUEUE = GroupCommitQueue(session_factory, window_ms=window_ms, max_batch=max_batch)
+    WRITE_TIMEOUT_S = timeout_s
+    return WRITE_QUEUE
+
+
+def stop_write_queue() -> None:
+    global WRITE_QUEUE
+    if WRITE_QUEUE is not None:
+        WRITE_QUEUE.stop()
+        WRITE_QUEUE = None
+
+
+def run_write(db: Session, fn: Callable[[Session], T]) -> T:
+    """
+    Run a write job and commit it: through the group-commit queue when it's
+    running, otherwise directly on the request's session. `fn` must only use
+    the session it is given and must not commit.
+    """
+    if WRITE_QUEUE is None:
+        try:
+            out = fn(db)
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+        return out
+
+    out = WRITE_QUEUE.submit(fn, timeout=WRITE_TIMEOUT_S)
+    # the write landed through another session; drop anything this one cached
+    db.expire_all()
+    return out
@@ -66,6 +66,26 @@ class Product(Base):
     price_cents: Mapped[int | None] = mapped_column(Integer, nullable=True)
     currency: Mapped[str | None] = mapped_column(String, nullable=True)
 
+    # catalog version in which this row was last inserted/changed by the seeder
+    version: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False, index=True)
+    # hash of the seeded CSV fields; the incremental seeder only writes rows whose hash moved
+    content_hash: Mapped[str | None] = mapped_column(String, nullable=True)
+    # set when the article left the CSV; rows stay for order/event history, the API drops them
+    deleted_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+class CatalogVersion(Base):
+    """One row per seeding run that changed the catalog; products.version points here."""
+    __tablename__ = "catalog_versions"
+
+    version: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    source: Mapped[str | None] = mapped_column(String, nullable=True)
+
+    inserted: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    changed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    deleted: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
 class Event(Base):
     __tablename__ = "events"
 
@@ -76,6 +96,8 @@ class Event(Base):
     product_id: Mapped[str] = mapped_column(String, ForeignKey("products.id"), nullable=False)
     event_type: Mapped[str] = mapped_column(String, nullable=False)  # view|add_to_cart|purchase|remove
     ts: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    # 1/sampling rate at ingestion: each stored row stands for this many events
+    weight: Mapped[float] = mapped_column(Float, default=1.0, server_default="1", nullable=False)
 
 
 class User(Base):
@@ -111,6 +133,8 @@ class UserSession(Base):
 
     token_hash: Mapped[str] = mapped_column(String, nullable=False, unique=True, index=True)
     expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    # set on logout of a signed-token session (row kept for audit / revocation list)
+    revoked_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, index=True)
 
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
 
@@ -172,3 +196,57 @@ class CartItem(Base):
         UniqueConstraint("cart_id", "product_id", name="ux_cart_items_cart_product"),
     )
 
+
+class Order(Base):
+    """Written once at checkout with its totals; never recomputed from cart rows."""
+    __tablename__ = "orders"
+
+    # same id as the cart it was placed from
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+
+    # null for guest checkouts
+    user_id: Mapped[str | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+
+    ordered_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    total_quantity: Mapped[int] = mapped_column(Integer, nullable=False)
+    subtotal_cents: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    lines: Mapped[list["OrderLine"]] = relationship(
+        "OrderLine", back_populates="order", cascade="all, delete-orphan"
+    )
+
+    __table_args__ = (
+        # keyset pagination of a user's orders, newest first
+        Index("ix_orders_user_ordered_at", "user_id", "ordered_at", "id"),
+    )
+
+
+class OrderLine(Base):
+    """Immutable snapshot of a cart line; no FK to products so catalog changes can't touch it."""
+    __tablename__ = "order_lines"
+
+    # same id as the cart_items row it was copied from
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    order_id: Mapped[str] = mapped_column(ForeignKey("orders.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    product_id: Mapped[str] = mapped_column(String, nullable=False)
+    product_name: Mapped[str | None] = mapped_column(String, nullable=True)
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False)
+    unit_price_cents: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    line_total_cents: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    order: Mapped["Order"] = relationship("Order", back_populates="lines")
+
+
+class ProductPopularity(Base):
+    """Periodic snapshot of the in-memory trending counters, scores decayed to updated_at."""
+    __tablename__ = "product_popularity"
+
+    # no FK to products: counters outlive catalog reloads and are simply ignored if the product is gone
+    product_id: Mapped[str] = mapped_column(String, primary_key=True)
+
+    view_score: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    add_to_cart_score: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    purchase_score: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
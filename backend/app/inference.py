@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class Overloaded(Exception):
+    """Raised when work is rejected (queue full) or shed (queue deadline passed)."""
+
+
+class InferenceExecutor:
+    """
+    Bounded executor for CPU-heavy model inference.
+
+    Runs on its own threads so a burst of semantic queries can't drain
+    Starlette's shared threadpool. At most `max_concurrency` jobs run at once;
+    at most `max_queue` wait behind them. A job that hasn't started within
+    `queue_timeout_s` is cancelled and its caller gets Overloaded right away.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout_s: float, name: str = "inference"):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout_s = queue_timeout_s
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._shed = 0
+
+    def _wrap(self, fn: Callable[..., Any], args: tuple) -> Callable[[], Any]:
+        def job():
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+            try:
+                out = fn(*args)
+            except BaseException:
+                with self._lock:
+                    self._failed += 1
+                raise
+            else:
+                with self._lock:
+                    self._completed += 1
+                return out
+            finally:
+                with self._lock:
+                    self._running -= 1
+        return job
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._rejected += 1
+                raise Overloaded("inference queue full")
+            self._queued += 1
+
+        fut = self._pool.submit(self._wrap(fn, args))
+        afut = asyncio.wrap_future(fut)
+        done, _ = await asyncio.wait({afut}, timeout=self.queue_timeout_s)
+        if not done and fut.cancel():
+            # still waiting for a worker: it never ran, so undo its queue slot
+            with self._lock:
+                self._queued -= 1
+                self._shed += 1
+            raise Overloaded("inference queue deadline exceeded")
+        return await afut
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "queue_timeout_ms": int(self.queue_timeout_s * 1000),
+                "queue_depth": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected_queue_full": self._rejected,
+                "shed_deadline": self._shed,
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import re
+from collections import Counter
+
+import numpy as np
+
+# Same fields scripts/build_semantic_index.py feeds to the embedder (build_search_text),
+# keyed by the names load_products() uses. Short, descriptive fields count double.
+FIELD_WEIGHTS: dict[str, int] = {
+    "name": 2,
+    "product_group_name": 1,
+    "product_type_name": 2,
+    "department_name": 1,
+    "section_name": 1,
+    "colour_group_name": 2,
+    "perceived_colour_master_name": 1,
+    "description": 1,
+}
+
+K1 = 1.2
+B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+class BM25Index:
+    """
+    In-process BM25 inverted index over the catalog.
+
+    Built once per catalog load. Each term owns an int32 array of catalog
+    positions and a float32 array of precomputed BM25 term weights, so a query
+    is a handful of numpy scatter-adds plus one argpartition.
+    """
+
+    def __init__(self, n_docs: int, postings: dict[str, tuple[np.ndarray, np.ndarray]]):
+        self.n_docs = n_docs
+        self._postings = postings
+
+    @classmethod
+    def build(cls, products: list[dict]) -> "BM25Index":
+        n = len(products)
+        doc_tfs: list[Counter] = []
+        doc_len = np.zeros(n, dtype=np.float32)
+
+        for i, p in enumerate(products):
+            tf: Counter = Counter()
+            for field, weight in FIELD_WEIGHTS.items():
+                for tok in tokenize(str(p.get(field) or "")):
+                    tf[tok] += weight
+            doc_tfs.append(tf)
+            doc_len[i] = sum(tf.values())
+
+        avgdl = float(doc_len.mean()) if n else 0.0
+
+        docs_by_term: dict[str, list[int]] = {}
+        tfs_by_term: dict[str, list[int]] = {}
+        for i, tf in enumerate(doc_tfs):
+            for tok, c in tf.items():
+                docs_by_term.setdefault(tok, []).append(i)
+                tfs_by_term.setdefault(tok, []).append(c)
+
+        postings: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        for tok, docs in docs_by_term.items():
+            d = np.asarray(docs, dtype=np.int32)
+            tf = np.asarray(tfs_by_term[tok], dtype=np.float32)
+            idf = np.log(1.0 + (n - len(d) + 0.5) / (len(d) + 0.5))
+            norm = K1 * (1.0 - B + B * doc_len[d] / (avgdl or 1.0))
+            w = (idf * tf * (K1 + 1.0) / (tf + norm)).astype(np.float32)
+            postings[tok] = (d, w)
+
+        return cls(n, postings)
+
+    def search(self, q: str, top_k: int = 200) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (catalog_positions, scores), best first.
+        Only documents matching at least one query term are returned.
+        """
+        terms = [t for t in dict.fromkeys(tokenize(q)) if t in self._postings]
+        if not terms or top_k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        if len(terms) == 1:
+            docs, scores = self._postings[terms[0]]
+            docs = docs.astype(np.int64)
+        else:
+            acc = np.zeros(self.n_docs, dtype=np.float32)
+            for t in terms:
+                d, w = self._postings[t]
+                acc[d] += w  # positions are unique within a posting list
+            docs = np.flatnonzero(acc)
+            scores = acc[docs]
+
+        if len(docs) > top_k:
+            part = np.argpartition(-scores, top_k - 1)[:top_k]
+            docs, scores = docs[part], scores[part]
+
+        order = np.argsort(-scores, kind="stable")
+        return docs[order], scores[order]
+
+
+def rrf_fuse(rankings: list[list[int]], k: int = 60) -> list[int]:
+    """
+    Reciprocal-rank fusion of several best-first lists of catalog positions.
+    score(d) = sum over lists of 1 / (k + rank), rank starting at 1.
+    """
+    scores: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, pos in enumerate(ranking, start=1):
+            scores[pos] = scores.get(pos, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.__getitem__, reverse=True)
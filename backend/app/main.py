@@ -4,25 +4,51 @@ from fastapi.staticfiles import StaticFiles
 
 from app.api.v1.products import router as products_router
 from app.api.v1.events import router as events_router
+from app.api.recommendations import router as recommendations_router
 
 from pathlib import Path
 
 import random
+import asyncio
+import logging
 
 from collections import Counter
+from dataclasses import dataclass, field
 
 
 
 from app.db.models import Product
 from sqlalchemy import select
-from app.core.db import SessionLocal
+from app.core.db import SessionLocal, async_engine
+
+from app.lexical import BM25Index, rrf_fuse
+from app.suggest import SuggestIndex, load_vocab
+from app.sampling import AliasTable
+from app.inference import InferenceExecutor, Overloaded
+from app.core.config import settings
+from app import catalog
+from app.catalog import build_image_key
+from app.services import maintenance
+from app.core import write_queue
+from app.services.event_ingest import EVENTS
+from app.services.event_reducer import REDUCER
+from app.services import copurchase, event_store, popularity
+from app.services.popularity import EVENT_WEIGHTS, POPULARITY, TRACKED
 
 
 SEMANTIC_ENABLED = False
 SEMANTIC_ERR = None
 
 try:
-    from app.search import semantic_search_ids, parse_query_intent, apply_fuzzy_boosts
+    from app.search import (
+        CatalogBinding,
+        SearchAssets,
+        apply_fuzzy_boosts,
+        index_catalog_version,
+        load_index_assets,
+        parse_query_intent,
+        semantic_search_positions,
+    )
     SEMANTIC_ENABLED = True
 except Exception as e:
     SEMANTIC_ERR = str(e)
@@ -30,11 +56,14 @@ except Exception as e:
 
 import secrets
 
-from app.api.cart import router as cart_router
-
-from app.auth import router as auth_router
-
-from app.api.orders import router as orders_router
+if settings.db_async:
+    from app.api.cart_async import router as cart_router
+    from app.auth_async import router as auth_router
+    from app.api.orders_async import router as orders_router
+else:
+    from app.api.cart import router as cart_router
+    from app.auth import router as auth_router
+    from app.api.orders import router as orders_router
 import os
 
 app = FastAPI(title="HM Shop Backend", version="0.1.0")
@@ -59,7 +88,7 @@ HERE = Path(__file__).resolve().parent
 
 PROJECT_ROOT = HERE if (HERE / "data").exists() else HERE.parent
 
-IMAGE_BASE_URL = (os.getenv("IMAGE_BASE_URL") or "").rstrip("/")
+IMAGE_BASE_URL = catalog.IMAGE_BASE_URL
 
 IMG_ROOT = PROJECT_ROOT / "data" / "images"
 
@@ -72,17 +101,9 @@ app.include_router(products_router, prefix="/v1")
 app.include_router(events_router, prefix="/v1")
 
 app.include_router(orders_router)
+app.include_router(recommendations_router)
 
 
-PRODUCTS: list[dict] = []
-INDEX: dict[str, dict] = {}
-
-
-
-def build_image_key(article_id: str) -> str:
-    aid = str(article_id).strip().zfill(10)
-    # Matches your R2 layout: images_data/011/0110065002.jpg
-    return f"images_data/{aid[:3]}/{aid}.jpg"
 
 def build_image_url(article_id: str) -> str:
     key = build_image_key(article_id)
@@ -119,99 +140,153 @@ def _maybe_full_image_url(image_val: str, product_id: str) -> str:
     # If DB has nothing, compute from article_id/id
     return build_image_url(product_id)
 
-def load_products():
-    global PRODUCTS, INDEX
-
+def load_products() -> tuple[list[dict], int]:
     items: list[dict] = []
 
     with SessionLocal() as db:
-        stmt = select(Product)
+        # read before the rows: a seed committing in between leaves us with a
+        # version older than some rows, and refresh_catalog re-applies them,
+        # instead of a version whose rows we never saw
+        version = catalog.current_version(db)
+        stmt = select(Product).where(Product.deleted_at.is_(None))
         for p in db.execute(stmt).scalars().yield_per(2000):
-            pid = str(p.id).strip()
-            if not pid:
-                continue
+            d = catalog.product_dict(p)
+            if d is not None:
+                items.append(d)
 
-            # Prefer the "convenience" name, fall back to raw CSV name
-            name = (p.name or p.prod_name or "Untitled").strip()
-
-            # Price: prefer float `price`, else derive from `price_cents`
-            price = p.price
-            if price is None and p.price_cents is not None:
-                price = float(p.price_cents) / 100.0
-            price = float(price or 0.0)
-
-            # Use canonical CSV columns for filtering (what your endpoints use)
-            product_group_name = (p.product_group_name or p.category or "").strip()
-            index_group_name = (p.index_group_name or "").strip()
-            colour_group_name = (p.colour_group_name or p.color or "").strip()
-
-            description = (p.description or p.detail_desc or "").strip()
-
-            # Mode derived from index_group_name (same logic you had)
-            mode = None
-            if index_group_name == "Menswear":
-                mode = "men"
-            elif index_group_name in ("Ladieswear", "Divided"):
-                mode = "women"
-
-            # Image: prefer stored image_key; else compute from id (article_id)
-            image_key = (p.image_key or "").strip()
-            if not image_key:
-                image_key = build_image_key(pid)
-
-            # Return a usable URL (AWS in prod; local /images in dev)
-            if IMAGE_BASE_URL:
-                image_url = f"{IMAGE_BASE_URL}/{image_key.lstrip('/')}"
-            else:
-                # local fallback
-                aid = pid.zfill(10)
-                image_url = f"/images/{aid[:3]}/{aid}.jpg"
-
-            items.append(
-                {
-                    "id": pid,
-                    "name": name,
-                    "price": price,
-                    "image_url": image_url,
-
-                    # fields your endpoints/search expect:
-                    "product_group_name": product_group_name,
-                    "index_group_name": index_group_name,
-                    "colour_group_name": colour_group_name,
-                    "color_name": colour_group_name,
-
-                    "description": description,
-                    "mode": mode,
-
-                    # optional extras (handy later)
-                    "perceived_colour_master_name": (p.perceived_colour_master_name or "").strip(),
-                    "product_type_name": (p.product_type_name or "").strip(),
-                    "has_image": bool(p.has_image),
-                }
-            )
-
-    PRODUCTS = items
-    INDEX = {p["id"]: p for p in PRODUCTS}
+    return items, version
 
 #recommend similar products using color
 def norm(s: str) -> str:
     return (s or "").strip().lower()
 
-GROUP_INDEX: dict[str, list[dict]] = {}
-GROUP_COLOR_INDEX: dict[tuple[str, str], list[dict]] = {}
-
-def build_indices():
-    global GROUP_INDEX, GROUP_COLOR_INDEX
-    GROUP_INDEX = {}
-    GROUP_COLOR_INDEX = {}
 
-    for p in PRODUCTS:
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """
+    One catalog load and everything derived from it. Handlers read CATALOG
+    once and use only that object, so a refresh (a single reference swap)
+    can't pair BM25/suggest/FAISS positions or pools from one load with the
+    products of another.
+    """
+    version: int
+    products: list[dict]
+    index: dict[str, dict]
+    group_index: dict[str, list[dict]]
+    group_color_index: dict[tuple[str, str], list[dict]]
+    lexical: BM25Index
+    suggest: SuggestIndex
+    # the FAISS build this snapshot searches, bound to `products`; None when
+    # semantic search can't load
+    semantic: "CatalogBinding | None"
+    # (group, mode) -> homepage candidates; filled on first request
+    homepage_pools: dict[tuple[str, str | None], list[dict]] = field(default_factory=dict)
+    # (group, mode) -> (pool, alias table over it) for weighted sampling
+    homepage_tables: dict[tuple[str, str | None], tuple[list[dict], AliasTable]] = field(default_factory=dict)
+
+
+def build_snapshot(products: list[dict], version: int, assets: "SearchAssets | None" = None) -> CatalogSnapshot:
+    group_index: dict[str, list[dict]] = {}
+    group_color_index: dict[tuple[str, str], list[dict]] = {}
+    for p in products:
         g = norm(p.get("product_group_name", ""))
         c = norm(p.get("colour_group_name", ""))
         if g:
-            GROUP_INDEX.setdefault(g, []).append(p)
+            group_index.setdefault(g, []).append(p)
         if g and c:
-            GROUP_COLOR_INDEX.setdefault((g, c), []).append(p)
+            group_color_index.setdefault((g, c), []).append(p)
+
+    return CatalogSnapshot(
+        version=version,
+        products=products,
+        index={p["id"]: p for p in products},
+        group_index=group_index,
+        group_color_index=group_color_index,
+        lexical=BM25Index.build(products),
+        suggest=SuggestIndex.build(products, load_vocab()),
+        semantic=CatalogBinding(assets, [p["id"] for p in products]) if assets is not None else None,
+    )
+
+
+SEMANTIC_LOAD_ERR: str | None = None
+
+
+def semantic_assets(current: "SearchAssets | None") -> "SearchAssets | None":
+    """
+    The index build the next snapshot should search: `current`, unless
+    scripts.build_semantic_index has since recorded a different catalog
+    version in vocab.json.
+    """
+    global SEMANTIC_LOAD_ERR
+    if not SEMANTIC_ENABLED:
+        return None
+    if current is not None and index_catalog_version() == current.catalog_version:
+        return current
+    try:
+        assets = load_index_assets()
+    except Exception as e:
+        SEMANTIC_LOAD_ERR = str(e)
+        return current
+    SEMANTIC_LOAD_ERR = None
+    return assets
+
+
+CATALOG: CatalogSnapshot = build_snapshot([], 0)
+
+
+def publish_catalog(snap: CatalogSnapshot) -> None:
+    global CATALOG
+    CATALOG = snap
+    catalog.publish(snap.products, snap.index, snap.version)
+
+
+def refresh_catalog() -> int:
+    """
+    Applies products rows written by incremental seeds since the loaded
+    version, rebinds to a rebuilt semantic index if there is one, and
+    publishes the new snapshot. Returns the number of rows applied.
+    """
+    snap = CATALOG
+    current = snap.semantic.assets if snap.semantic is not None else None
+    assets = semantic_assets(current)
+    with SessionLocal() as db:
+        version = catalog.current_version(db)
+        if version <= snap.version:
+            if assets is not current:
+                publish_catalog(build_snapshot(snap.products, snap.version, assets))
+            return 0
+        stmt = select(Product).where(
+            Product.version > snap.version, Product.version <= version
+        )
+        changed = db.execute(stmt).scalars().all()
+        products = catalog.apply_changes(snap.products, changed)
+
+    publish_catalog(build_snapshot(products, version, assets))
+    POPULARITY.rebuild_groups()
+    return len(changed)
+
+
+async def _catalog_refresh_loop() -> None:
+    log = logging.getLogger(__name__)
+    while True:
+        await asyncio.sleep(settings.catalog_refresh_interval_s)
+        try:
+            n = await asyncio.to_thread(refresh_catalog)
+            if n:
+                log.info("catalog refreshed to version %d (%d rows)", CATALOG.version, n)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.exception("catalog refresh failed")
+
+
+SEMANTIC_EXECUTOR = InferenceExecutor(
+    max_concurrency=settings.semantic_max_concurrency,
+    max_queue=settings.semantic_max_queue,
+    queue_timeout_s=settings.semantic_queue_timeout_ms / 1000.0,
+    name="semantic",
+)
+SEMANTIC_RETRY_AFTER_S = 1
 
 
 LOAD_ERR: str | None = None
@@ -220,19 +295,72 @@ LOAD_ERR: str | None = None
 def _startup():
     global LOAD_ERR
     try:
-        load_products()
-        build_indices()
+        products, version = load_products()
     except Exception as e:
         LOAD_ERR = str(e)
-        PRODUCTS.clear()
-        INDEX.clear()
-        build_indices()
+        products, version = [], 0
+    publish_catalog(build_snapshot(products, version, semantic_assets(None)))
+    # after publish: counters are grouped by the catalog's product_group_name
+    popularity.load_popularity()
+    copurchase.load_copurchase()
+    if settings.write_queue_enabled:
+        write_queue.start_write_queue(
+            SessionLocal,
+            window_ms=settings.write_queue_window_ms,
+            max_batch=settings.write_queue_max_batch,
+            timeout_s=settings.write_queue_timeout_s,
+        )
+
+MAINTENANCE_TASK: asyncio.Task | None = None
+POPULARITY_TASK: asyncio.Task | None = None
+HOMEPAGE_WEIGHTS_TASK: asyncio.Task | None = None
+COMPACTION_TASK: asyncio.Task | None = None
+CATALOG_REFRESH_TASK: asyncio.Task | None = None
+
+@app.on_event("startup")
+async def _start_maintenance():
+    global MAINTENANCE_TASK, POPULARITY_TASK, HOMEPAGE_WEIGHTS_TASK, COMPACTION_TASK, CATALOG_REFRESH_TASK
+    if settings.maintenance_enabled:
+        MAINTENANCE_TASK = asyncio.create_task(maintenance.maintenance_loop())
+    EVENTS.start()
+    POPULARITY_TASK = asyncio.create_task(popularity.popularity_loop())
+    HOMEPAGE_WEIGHTS_TASK = asyncio.create_task(_homepage_weights_loop())
+    if event_store.EVENT_STORE is not None:
+        COMPACTION_TASK = asyncio.create_task(event_store.compaction_loop())
+    if settings.catalog_refresh_interval_s > 0:
+        CATALOG_REFRESH_TASK = asyncio.create_task(_catalog_refresh_loop())
+
+@app.on_event("shutdown")
+def _shutdown():
+    SEMANTIC_EXECUTOR.shutdown()
+    if MAINTENANCE_TASK is not None:
+        MAINTENANCE_TASK.cancel()
+    if POPULARITY_TASK is not None:
+        POPULARITY_TASK.cancel()
+    if HOMEPAGE_WEIGHTS_TASK is not None:
+        HOMEPAGE_WEIGHTS_TASK.cancel()
+    if COMPACTION_TASK is not None:
+        COMPACTION_TASK.cancel()
+    if CATALOG_REFRESH_TASK is not None:
+        CATALOG_REFRESH_TASK.cancel()
+    popularity.save_popularity()
+    write_queue.stop_write_queue()
+
+@app.on_event("shutdown")
+async def _drain_events():
+    # flush buffered events before the engines go away
+    await EVENTS.stop()
+
+@app.on_event("shutdown")
+async def _dispose_async_engine():
+    if async_engine is not None:
+        await async_engine.dispose()
 
 
 
 @app.get("/health")
 def health():
-    return {"ok": True, "products": len(PRODUCTS), "load_err": LOAD_ERR}
+    return {"ok": True, "products": len(CATALOG.products), "load_err": LOAD_ERR}
 
 # NOTE: These are currently NON-versioned (/products).
 @app.get("/products")
@@ -243,7 +371,7 @@ def list_products(
     index_group_name: list[str] = Query(default=[]),  
     product_group_name: list[str] = Query(default=[]),
 ):
-    items = PRODUCTS
+    items = CATALOG.products
 
     # Filter by index group(s) first (Menswear / Ladieswear / Divided)
     if index_group_name:
@@ -271,27 +399,33 @@ def list_products(
         "offset": offset,
     }
 
-@app.get("/products/homepage")
-def homepage_products(
+@app.get("/suggest")
+def suggest(
     response: Response,
-    limit: int = Query(12, ge=1, le=100),
-    group: str = "Garment Upper body", 
-    mode: str | None = None,   
-    seed: int | None = None,
+    q: str = "",
+    limit: int = Query(8, ge=1, le=20),
 ):
-    response.headers["Cache-Control"] = "no-store"
+    # Prefix answers only change on catalog reload; let the browser reuse them briefly
+    response.headers["Cache-Control"] = "public, max-age=60"
+    return {"q": q, "items": CATALOG.suggest.lookup(q, limit)}
 
-    target = group.strip().lower()
-    m = mode.strip().lower() if mode else None
+HOMEPAGE_WEIGHTS_VERSION = -1
+# weighted homepage: every product keeps this much weight so unsold items still rotate in
+HOMEPAGE_BASE_WEIGHT = 1.0
+_HOMEPAGE_SIGNALS = [(TRACKED.index(t), EVENT_WEIGHTS[t]) for t in ("add_to_cart", "purchase")]
+
+
+def _homepage_pool(snap: CatalogSnapshot, target: str, m: str | None) -> list[dict]:
+    key = (target, m)
+    pool = snap.homepage_pools.get(key)
+    if pool is not None:
+        return pool
 
     pool = []
-    for p in PRODUCTS:
-        if str(p.get("product_group_name", "")).strip().lower() != target:
-            continue
+    for p in snap.group_index.get(target, []):
         if not str(p.get("image_url", "")).strip():
             continue
 
-
         g = str(p.get("index_group_name", "")).strip()
         if m == "men":
             if g and g != "Menswear":
@@ -302,76 +436,231 @@ def homepage_products(
 
         pool.append(p)
 
+    # only real groups are cached, so arbitrary ?group= values can't grow the dict
+    if target in snap.group_index:
+        snap.homepage_pools[key] = pool
+    return pool
+
+
+def _homepage_table(pool: list[dict], counts: dict[str, tuple[float, ...]]) -> AliasTable:
+    weights = []
+    for p in pool:
+        c = counts.get(p["id"])
+        w = HOMEPAGE_BASE_WEIGHT
+        if c is not None:
+            w += sum(c[i] * weight for i, weight in _HOMEPAGE_SIGNALS)
+        weights.append(w)
+    return AliasTable(weights)
+
+
+def rebuild_homepage_tables() -> int:
+    """Rebuilds the alias table of every cached pool if the popularity counters moved."""
+    global HOMEPAGE_WEIGHTS_VERSION
+    version = POPULARITY.recorded
+    if version == HOMEPAGE_WEIGHTS_VERSION:
+        return 0
+    snap = CATALOG
+    counts = POPULARITY.type_counts()
+    n = 0
+    for key, pool in list(snap.homepage_pools.items()):
+        if pool:
+            snap.homepage_tables[key] = (pool, _homepage_table(pool, counts))
+            n += 1
+    HOMEPAGE_WEIGHTS_VERSION = version
+    return n
+
+
+async def _homepage_weights_loop() -> None:
+    while True:
+        await asyncio.sleep(settings.homepage_weights_refresh_s)
+        try:
+            await asyncio.to_thread(rebuild_homepage_tables)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logging.getLogger(__name__).exception("homepage weights rebuild failed")
+
+
+@app.get("/products/homepage")
+def homepage_products(
+    response: Response,
+    limit: int = Query(12, ge=1, le=100),
+    group: str = "Garment Upper body", 
+    mode: str | None = None,   
+    seed: int | None = None,
+    weighted: bool = False,
+):
+    """
+    Random picks from one product group. weighted=1 favours products that are
+    being added to carts and bought (alias-table draws, O(limit) per request).
+    """
+    response.headers["Cache-Control"] = "no-store"
+
+    target = group.strip().lower()
+    m = mode.strip().lower() if mode else None
+    if m not in ("men", "women"):
+        m = None
+
+    snap = CATALOG
+    pool = _homepage_pool(snap, target, m)
     if not pool:
         return {"items": [], "total": 0, "limit": limit, "group": group, "mode": mode}
 
     k = min(limit, len(pool))
 
     rng = random.Random(seed) if seed is not None else random.Random(secrets.randbits(64))
-    items = rng.sample(pool, k=k) if len(pool) >= k else pool
+    if weighted:
+        entry = snap.homepage_tables.get((target, m))
+        if entry is None or entry[0] is not pool:
+            # first weighted request for this pool; the refresher keeps it current afterwards
+            entry = (pool, _homepage_table(pool, POPULARITY.type_counts()))
+            snap.homepage_tables[(target, m)] = entry
+        items = [pool[i] for i in entry[1].sample_distinct(rng, k)]
+    else:
+        items = rng.sample(pool, k=k)
 
     return {"items": items, "total": len(pool), "limit": limit, "group": group, "mode": mode}
 
 
+@app.get("/products/trending")
+def trending_products(
+    response: Response,
+    limit: int = Query(12, ge=1, le=100),
+    group: str | None = None,
+):
+    """
+    Most viewed / added / bought products over the last few half-lives, optionally
+    within one product_group_name. Served from the top-k set kept per group.
+    """
+    response.headers["Cache-Control"] = "public, max-age=30"
 
-@app.get("/products/semantic")
-def semantic_products(
+    index = CATALOG.index
+    items = []
+    for pid, score in POPULARITY.trending(group, min(limit, settings.popularity_top_k)):
+        p = index.get(pid)
+        if p is not None:
+            items.append({**p, "trending_score": round(score, 3)})
+    return {"items": items, "limit": limit, "group": group}
+
+
+
+SEMANTIC_TOP_K = 300
+# When BM25 already has plenty of matches (head queries), ask FAISS for fewer
+HYBRID_VECTOR_TOP_K = 100
+LEXICAL_TOP_K = 300
+
+
+def _passes_filters(p: dict, allowed_index: set[str], allowed_groups: set[str]) -> bool:
+    if allowed_index and str(p.get("index_group_name", "")).strip().lower() not in allowed_index:
+        return False
+    if allowed_groups and str(p.get("product_group_name", "")).strip().lower() not in allowed_groups:
+        return False
+    return True
+
+
+def _lexical_ranked(snap: CatalogSnapshot, q: str, allowed_index: set[str], allowed_groups: set[str]) -> list[int]:
+    positions, _ = snap.lexical.search(q, top_k=LEXICAL_TOP_K)
+    return [
+        pos for pos in positions.tolist()
+        if _passes_filters(snap.products[pos], allowed_index, allowed_groups)
+    ]
+
+
+def _vector_ranked(
+    snap: CatalogSnapshot,
     q: str,
-    limit: int = Query(24, ge=1, le=200),
-    offset: int = Query(0, ge=0),
-    index_group_name: list[str] = Query(default=[]),
-    product_group_name: list[str] = Query(default=[]),
+    top_k: int,
+    allowed_index: set[str],
+    allowed_groups: set[str],
+    lexical: list[int] | None,
 ):
-    
-    try:
-        hits = semantic_search_ids(q, top_k=300)
-        intent = parse_query_intent(q)
-    except Exception as e:
-        raise HTTPException(status_code=503, detail=f"Semantic search unavailable: {e}")
-    # 1) vector retrieval
-    hits = semantic_search_ids(q, top_k=300)
+    """
+    Vector retrieval -> filtered, intent-boosted catalog positions, fused with
+    `lexical` when given (hybrid). Returns (ranked positions, intent).
+    """
+    binding = snap.semantic
+    positions, scores = semantic_search_positions(q, binding, top_k=top_k)
+    intent = parse_query_intent(q, binding.assets.vocab)
 
-    # 2) hydrate
+    # hydrate + apply existing filters (same as /products)
     items = []
-    for pid, score in hits:
-        p = INDEX.get(str(pid))
-        if not p:
+    for pos, score in zip(positions.tolist(), scores.tolist()):
+        p = snap.products[pos]
+        if not _passes_filters(p, allowed_index, allowed_groups):
             continue
-        p2 = dict(p)
-        p2["_score"] = score
-        items.append(p2)
-
-    # 3) apply existing filters (same as /products)
-    if index_group_name:
-        allowed = {s.strip().lower() for s in index_group_name}
-        items = [
-            p for p in items
-            if str(p.get("index_group_name", "")).strip().lower() in allowed
-        ]
-
-    if product_group_name:
-        allowed_groups = {s.strip().lower() for s in product_group_name}
-        items = [
-            p for p in items
-            if str(p.get("product_group_name", "")).strip().lower() in allowed_groups
-        ]
+        items.append({**p, "_score": score, "_pos": pos})
 
-    # 4) fuzzy intent boosts + rerank
-    intent = parse_query_intent(q)
+    # fuzzy intent boosts + rerank
     items = apply_fuzzy_boosts(items, intent)
+    vector = [p["_pos"] for p in items]
+    if lexical is not None:
+        return rrf_fuse([vector, lexical]), intent
+    return vector, intent
 
-    total = len(items)
-    page = items[offset : offset + limit]
 
-    # strip internal score field if you want
-    for p in page:
-        p.pop("_score", None)
+@app.get("/products/semantic")
+async def semantic_products(
+    q: str,
+    limit: int = Query(24, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    index_group_name: list[str] = Query(default=[]),
+    product_group_name: list[str] = Query(default=[]),
+    retrieval: str = Query("hybrid", pattern="^(hybrid|vector|lexical)$"),
+):
+    allowed_index = {s.strip().lower() for s in index_group_name}
+    allowed_groups = {s.strip().lower() for s in product_group_name}
+    # every position below indexes this snapshot's products, even if a refresh lands mid-request
+    snap = CATALOG
+    # BM25, filtering, rerank and fusion are CPU work: the lexical part runs
+    # in a worker thread, the rest inside the inference job, never on the loop
+
+    # 1) lexical retrieval (BM25, always available)
+    lexical: list[int] = []
+    if retrieval != "vector":
+        lexical = await asyncio.to_thread(_lexical_ranked, snap, q, allowed_index, allowed_groups)
+
+    # 2) vector retrieval -> catalog positions (fused with lexical for hybrid)
+    intent = None
+    if retrieval != "lexical" and snap.semantic is None:
+        if retrieval == "vector":
+            raise HTTPException(
+                status_code=503, detail=f"Semantic search unavailable: {SEMANTIC_ERR or SEMANTIC_LOAD_ERR}"
+            )
+        retrieval = "lexical"
+
+    ranked = lexical
+    if retrieval != "lexical":
+        top_k = SEMANTIC_TOP_K
+        if retrieval == "hybrid" and len(lexical) >= max(offset + limit, HYBRID_VECTOR_TOP_K):
+            top_k = HYBRID_VECTOR_TOP_K
+        try:
+            ranked, intent = await SEMANTIC_EXECUTOR.run(
+                _vector_ranked, snap, q, top_k, allowed_index, allowed_groups,
+                lexical if retrieval == "hybrid" else None,
+            )
+        except Overloaded as e:
+            # shed fast; hybrid callers still get BM25 results
+            if retrieval == "vector":
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"Semantic search overloaded: {e}",
+                    headers={"Retry-After": str(SEMANTIC_RETRY_AFTER_S)},
+                )
+            retrieval = "lexical"
+        except Exception as e:
+            if retrieval == "vector":
+                raise HTTPException(status_code=503, detail=f"Semantic search unavailable: {e}")
+            retrieval = "lexical"
+
+    total = len(ranked)
+    page = [snap.products[pos] for pos in ranked[offset : offset + limit]]
 
     return {
         "items": page,
         "total": total,
         "limit": limit,
         "offset": offset,
+        "retrieval": retrieval,
         "intent": intent,  # keep during dev; remove later if you want
     }
 
@@ -380,23 +669,78 @@ def semantic_meta():
     try:
         from app.search import _paths
         index_path, idmap_path, vocab_path = _paths()
+        binding = CATALOG.semantic
         return {
             "enabled": SEMANTIC_ENABLED,
             "import_err": SEMANTIC_ERR,
+            "load_err": SEMANTIC_LOAD_ERR,
+            # catalog version of the index build being served
+            "index_catalog_version": binding.assets.catalog_version if binding is not None else None,
             "index_exists": index_path.exists(),
             "idmap_exists": idmap_path.exists(),
             "vocab_exists": vocab_path.exists(),
             "index_path": str(index_path),
             "idmap_path": str(idmap_path),
             "vocab_path": str(vocab_path),
+            "executor": SEMANTIC_EXECUTOR.stats(),
         }
     except Exception as e:
-        return {"enabled": SEMANTIC_ENABLED, "import_err": SEMANTIC_ERR, "meta_err": str(e)}
+        return {
+            "enabled": SEMANTIC_ENABLED,
+            "import_err": SEMANTIC_ERR,
+            "meta_err": str(e),
+            "executor": SEMANTIC_EXECUTOR.stats(),
+        }
+
+
+@app.get("/meta/maintenance")
+def maintenance_meta():
+    return {
+        "enabled": settings.maintenance_enabled,
+        "interval_s": settings.maintenance_interval_s,
+        "last_run": maintenance.LAST_RUN,
+    }
+
+
+@app.get("/meta/events")
+def events_meta():
+    store = event_store.EVENT_STORE
+    return {
+        **EVENTS.stats(),
+        "reducer": REDUCER.stats(),
+        "store": store.stats() if store is not None else None,
+    }
+
+
+@app.get("/meta/catalog")
+def catalog_meta():
+    snap = CATALOG
+    return {
+        "version": snap.version,
+        "products": len(snap.products),
+        "refresh_interval_s": settings.catalog_refresh_interval_s,
+    }
+
+
+@app.get("/meta/popularity")
+def popularity_meta():
+    return POPULARITY.stats()
+
+
+@app.get("/meta/copurchase")
+def copurchase_meta():
+    return copurchase.COPURCHASE.stats()
+
+
+@app.get("/meta/write-queue")
+def write_queue_meta():
+    q = write_queue.WRITE_QUEUE
+    return {"enabled": q is not None, **(q.stats() if q else {})}
 
 
 @app.get("/products/{product_id}")
 def get_product(product_id: str):
-    p = INDEX.get(str(product_id))
+    p = CATALOG.index.get(str(product_id))
     if not p:
         raise HTTPException(status_code=404, detail="Product not found")
     return p
@@ -407,7 +751,8 @@ def similar_products(
     limit: int = Query(8, ge=1, le=50),
     seed: int | None = None,
 ):
-    base = INDEX.get(str(product_id))
+    snap = CATALOG
+    base = snap.index.get(str(product_id))
     if not base:
         raise HTTPException(status_code=404, detail="Product not found")
 
@@ -417,11 +762,11 @@ def similar_products(
     rng = random.Random(seed) if seed is not None else random
 
     # Primary: same group + color
-    primary_pool = GROUP_COLOR_INDEX.get((g, c), [])
+    primary_pool = snap.group_color_index.get((g, c), [])
     primary = [p for p in primary_pool if p["id"] != str(product_id)]
 
     # Secondary: same group (different colors)
-    group_pool = GROUP_INDEX.get(g, [])
+    group_pool = snap.group_index.get(g, [])
     secondary = [p for p in group_pool if p["id"] != str(product_id)]
 
     # Dedup while keeping order
@@ -454,7 +799,7 @@ def similar_products(
 def product_groups():
     # counts by index_group_name (Menswear/Ladieswear/Divided)
     by_mode: dict[str, Counter] = {}
-    for p in PRODUCTS:
+    for p in CATALOG.products:
         m = str(p.get("index_group_name", "")).strip() or "UNKNOWN"
         g = str(p.get("product_group_name", "")).strip() or "UNKNOWN"
         by_mode.setdefault(m, Counter())[g] += 1
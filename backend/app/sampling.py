@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import random
+
+
+class AliasTable:
+    """
+    Walker/Vose alias table over n weighted items: O(n) to build, O(1) per draw.
+
+    `prob` and `alias` are plain lists since draws index them one scalar at a
+    time, which is faster on lists than on numpy arrays.
+    """
+
+    __slots__ = ("n", "prob", "alias", "total")
+
+    def __init__(self, weights: list[float]):
+        n = len(weights)
+        total = float(sum(weights))
+        if n == 0 or total <= 0:
+            raise ValueError("alias table needs at least one positive weight")
+
+        prob = [w * n / total for w in weights]
+        alias = list(range(n))
+        small = [i for i, p in enumerate(prob) if p < 1.0]
+        large = [i for i, p in enumerate(prob) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large[-1]
+            alias[s] = l
+            prob[l] -= 1.0 - prob[s]
+            if prob[l] < 1.0:
+                large.pop()
+                small.append(l)
+        # leftovers are 1.0 up to rounding
+        for i in small + large:
+            prob[i] = 1.0
+
+        self.n = n
+        self.prob = prob
+        self.alias = alias
+        self.total = total
+
+    def draw(self, rng: random.Random) -> int:
+        i = int(rng.random() * self.n)
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+    def sample_distinct(self, rng: random.Random, k: int, max_draws: int | None = None) -> list[int]:
+        """
+        k distinct indices, each draw proportional to weight (repeats are rejected).
+        Expected O(k) unless a few items hold nearly all the weight; after
+        `max_draws` the remainder is filled uniformly from the unpicked items.
+        """
+        k = min(k, self.n)
+        if max_draws is None:
+            max_draws = 8 * k + 32
+        picked: list[int] = []
+        seen: set[int] = set()
+        draws = 0
+        while len(picked) < k and draws < max_draws:
+            i = self.draw(rng)
+            draws += 1
+            if i not in seen:
+                seen.add(i)
+                picked.append(i)
+
+        if len(picked) < k:
+            rest = [i for i in range(self.n) if i not in seen]
+            picked.extend(rng.sample(rest, k - len(picked)))
+        return picked
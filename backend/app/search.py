@@ -10,24 +10,9 @@ from typing import Any
 from rapidfuzz import process, fuzz
 
 # Lazy-loaded globals
-_INDEX: faiss.Index | None = None
-_IDMAP: list[str] | None = None
-_VOCAB: dict[str, list[str]] | None = None
-
 _MODEL: Any = None  # or TextEmbedding later
-
-def load_search_assets(model_name: str = "sentence-transformers/all-MiniLM-L6-v2") -> None:
-    global _MODEL, _INDEX, _IDMAP, _VOCAB
-    if _MODEL is not None and _INDEX is not None and _IDMAP is not None:
-        return
-
-    try:
-        from sentence_transformers import SentenceTransformer
-    except ModuleNotFoundError as e:
-        raise RuntimeError("Semantic search disabled: sentence-transformers not installed") from e
-
-    ...
-    _MODEL = SentenceTransformer(model_name, backend="onnx")
+# newest index build loaded (what semantic_search_ids and parse_query_intent default to)
+_ASSETS: SearchAssets | None = None
 
 def _paths() -> tuple[Path, Path, Path]:
     here = Path(__file__).resolve()
@@ -36,29 +21,149 @@ def _paths() -> tuple[Path, Path, Path]:
     out_dir = project_root / "data" / "semantic"
     return (
         out_dir / "faiss.index",
-        out_dir / "id_map.json",
+        out_dir / "id_map.npy",
         out_dir / "vocab.json",
     )
 
-def load_search_assets(model_name: str = "sentence-transformers/all-MiniLM-L6-v2") -> None:
-    global _MODEL, _INDEX, _IDMAP, _VOCAB
-    if _MODEL is not None and _INDEX is not None and _IDMAP is not None:
-        return
+def _settings():
+    # imported on use: Settings requires DATABASE_URL, and
+    # scripts.build_semantic_index uses this module for a CSV-only build
+    from app.core.config import settings
+    return settings
+
+def article_id_to_int(pid: str) -> int:
+    """'0110065002' -> 110065002; -1 for anything that isn't a numeric article_id."""
+    s = str(pid).strip()
+    return int(s) if s.isdigit() else -1
+
+def _load_idmap(idmap_path: Path) -> np.ndarray:
+    if idmap_path.exists():
+        return np.load(idmap_path, allow_pickle=False).astype(np.int64, copy=False)
+
+    # Older builds only wrote id_map.json
+    ids = json.loads(idmap_path.with_suffix(".json").read_text(encoding="utf-8"))
+    return np.fromiter((article_id_to_int(i) for i in ids), dtype=np.int64, count=len(ids))
+
+def load_embedding_model(
+    model_name: str | None = None,
+    onnx_file: str | None = None,
+    intra_op_threads: int | None = None,
+    inter_op_threads: int | None = None,
+) -> Any:
+    """
+    SentenceTransformer on the ONNX backend. Arguments left as None fall back to
+    settings, except onnx_file: pass settings.semantic_onnx_file explicitly to
+    get the configured (possibly quantized) variant; None loads fp32 model.onnx.
+    """
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ModuleNotFoundError as e:
+        raise RuntimeError("Semantic search disabled: sentence-transformers not installed") from e
+
+    if model_name is None or intra_op_threads is None or inter_op_threads is None:
+        settings = _settings()
+        model_name = model_name or settings.semantic_model_name
+        if intra_op_threads is None:
+            intra_op_threads = settings.semantic_intra_op_threads
+        if inter_op_threads is None:
+            inter_op_threads = settings.semantic_inter_op_threads
+    intra, inter = intra_op_threads, inter_op_threads
+
+    model_kwargs: dict[str, Any] = {}
+    if onnx_file:
+        model_kwargs["file_name"] = onnx_file
+    if intra or inter:
+        import onnxruntime as ort
+
+        so = ort.SessionOptions()
+        if intra:
+            so.intra_op_num_threads = intra
+        if inter:
+            so.inter_op_num_threads = inter
+            so.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+        model_kwargs["session_options"] = so
+
+    return SentenceTransformer(
+        model_name,
+        backend="onnx",
+        model_kwargs=model_kwargs or None,
+    )
+
+class SearchAssets:
+    """
+    One build of scripts.build_semantic_index: the FAISS index, its id map
+    (FAISS row -> article_id, int64) and vocab. Never mutated; a rebuild is
+    picked up by loading a new one.
+    """
+
+    def __init__(self, index: faiss.Index, idmap: np.ndarray, vocab: dict):
+        self.index = index
+        self.idmap = idmap
+        self.vocab = vocab
+        # catalog version the build covers (0 for builds that predate versions)
+        self.catalog_version = int(vocab.get("catalog_version", 0))
 
+def index_catalog_version() -> int | None:
+    """catalog_version recorded in vocab.json (written last by the build); None without a build."""
+    _, _, vocab_path = _paths()
+    try:
+        return int(json.loads(vocab_path.read_text(encoding="utf-8")).get("catalog_version", 0))
+    except FileNotFoundError:
+        return None
+
+def load_index_assets() -> SearchAssets:
+    """Reads the index files from disk (no model); also becomes the module default."""
+    global _ASSETS
     index_path, idmap_path, vocab_path = _paths()
-    if not index_path.exists() or not idmap_path.exists():
+    if not index_path.exists() or not (idmap_path.exists() or idmap_path.with_suffix(".json").exists()):
         raise RuntimeError(
             f"Semantic index not found. Run build script first.\nMissing: {index_path} or {idmap_path}"
         )
 
-    _MODEL = SentenceTransformer(model_name, backend="onnx")
-    _INDEX = faiss.read_index(str(index_path))
-    _IDMAP = json.loads(idmap_path.read_text(encoding="utf-8"))
+    # vocab first: if a build lands while we read, the version we record is
+    # older than the files and the next check loads them again
+    vocab = json.loads(vocab_path.read_text(encoding="utf-8")) if vocab_path.exists() else {}
+    _ASSETS = SearchAssets(faiss.read_index(str(index_path)), _load_idmap(idmap_path), vocab)
+    return _ASSETS
+
+def load_search_assets(model_name: str | None = None) -> None:
+    global _MODEL
+    if _ASSETS is None:
+        load_index_assets()
+    if _MODEL is None:
+        _MODEL = load_embedding_model(model_name, onnx_file=_settings().semantic_onnx_file)
+
+class CatalogBinding:
+    """
+    FAISS row -> position in one catalog list (-1 = not in it), for one
+    index build. Build one per catalog (re)load or index reload with the ids
+    in PRODUCTS order and keep it next to that list; the position array is
+    computed lazily on the first search.
+    """
+
+    def __init__(self, assets: SearchAssets, product_ids: list[str]):
+        self.assets = assets
+        self.catalog_ids = np.fromiter(
+            (article_id_to_int(i) for i in product_ids), dtype=np.int64, count=len(product_ids)
+        )
+        self._positions: np.ndarray | None = None
+
+    def positions(self) -> np.ndarray:
+        if self._positions is not None:
+            return self._positions
+
+        idmap = self.assets.idmap
+        positions = np.full(len(idmap), -1, dtype=np.int64)
+        if len(self.catalog_ids):
+            order = np.argsort(self.catalog_ids, kind="stable")
+            sorted_ids = self.catalog_ids[order]
+            j = np.minimum(np.searchsorted(sorted_ids, idmap), len(sorted_ids) - 1)
+            found = (sorted_ids[j] == idmap) & (idmap >= 0)
+            positions[found] = order[j[found]]
 
-    if vocab_path.exists():
-        _VOCAB = json.loads(vocab_path.read_text(encoding="utf-8"))
-    else:
-        _VOCAB = {}
+        # racing first searches compute the same array; either assignment is fine
+        self._positions = positions
+        return positions
 
 def _best_fuzzy_match(query: str, choices: list[str], score_cutoff: int = 85) -> Optional[str]:
     if not query or not choices:
@@ -71,22 +176,39 @@ def _best_fuzzy_match(query: str, choices: list[str], score_cutoff: int = 85) ->
     )
     return match[0] if match else None
 
-def parse_query_intent(q: str) -> dict[str, Optional[str]]:
+def parse_query_intent(q: str, vocab: dict | None = None) -> dict[str, Optional[str]]:
     """
     Light NLP: try to detect a color master or group mentioned in the query.
-    We do fuzzy matching against the known vocab lists.
+    We do fuzzy matching against the known vocab lists (`vocab`, or the
+    newest loaded build's).
     """
     qn = (q or "").strip()
     if not qn:
         return {"group": None, "color": None, "color_master": None}
 
-    vocab = _VOCAB or {}
+    if vocab is None:
+        vocab = _ASSETS.vocab if _ASSETS is not None else {}
     group = _best_fuzzy_match(qn, vocab.get("product_group_name", []), score_cutoff=88)
     color = _best_fuzzy_match(qn, vocab.get("colour_group_name", []), score_cutoff=88)
     color_master = _best_fuzzy_match(qn, vocab.get("perceived_colour_master_name", []), score_cutoff=88)
 
     return {"group": group, "color": color, "color_master": color_master}
 
+def _search(q: str, top_k: int, assets: SearchAssets | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """Returns (scores, faiss_rows) of `assets` (default: newest loaded) with FAISS padding (-1) removed."""
+    load_search_assets()
+    assets = assets or _ASSETS
+    assert _MODEL is not None and assets is not None
+
+    query = (q or "").strip()
+    if not query:
+        return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+    vec = _MODEL.encode([query], normalize_embeddings=True).astype("float32")
+    scores, idxs = assets.index.search(vec, top_k)
+    keep = idxs[0] >= 0
+    return scores[0][keep], idxs[0][keep]
+
 def semantic_search_ids(
     q: str,
     top_k: int = 200,
@@ -94,23 +216,27 @@ def semantic_search_ids(
     """
     Returns list of (product_id, score) from FAISS nearest neighbors.
     """
-    load_search_assets()
-    assert _MODEL is not None and _INDEX is not None and _IDMAP is not None
+    scores, idxs = _search(q, top_k)
+    assert _ASSETS is not None
+    return [
+        (str(pid).zfill(10), float(score))
+        for pid, score in zip(_ASSETS.idmap[idxs].tolist(), scores.tolist())
+    ]
 
-    query = (q or "").strip()
-    if not query:
-        return []
-
-    vec = _MODEL.encode([query], normalize_embeddings=True).astype("float32")
-    scores, idxs = _INDEX.search(vec, top_k)
-
-    out: list[tuple[str, float]] = []
-    for score, ix in zip(scores[0].tolist(), idxs[0].tolist()):
-        if ix < 0:
-            continue
-        pid = _IDMAP[ix]
-        out.append((pid, float(score)))
-    return out
+def semantic_search_positions(
+    q: str,
+    binding: CatalogBinding,
+    top_k: int = 200,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns (catalog_positions, scores) from FAISS nearest neighbors.
+    Positions index straight into the list `binding` was built from;
+    hits that aren't in that catalog are dropped.
+    """
+    scores, idxs = _search(q, top_k, binding.assets)
+    positions = binding.positions()[idxs]
+    keep = positions >= 0
+    return positions[keep], scores[keep]
 
 def apply_fuzzy_boosts(
     results: list[dict],
@@ -2,17 +2,23 @@ from __future__ import annotations
 
 from typing import Optional, Tuple
 from datetime import datetime
-from sqlalchemy.exc import IntegrityError
 
 from uuid import uuid4
 
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session, joinedload
 
-from app.db.models import Cart, CartItem, Product
+from app import catalog
+from app.core.write_queue import run_write
+from app.db.models import Cart, CartItem, Order, OrderLine, Product
+from app.services.copurchase import COPURCHASE
+from app.services.popularity import POPULARITY
 
 
 
 ACTIVE = "active"
+ORDERED = "ordered"
 
 def _new_id() -> str:
     return uuid4().hex
@@ -26,6 +32,60 @@ def _price_cents_from_product(p: Product) -> int | None:
     return None
 
 
+def _unit_price_cents(db: Session, product_id: str) -> int | None:
+    """
+    Snapshot price from the in-memory catalog; falls back to the products
+    table only when the catalog doesn't know the id (e.g. failed load).
+    Raises ValueError if the product doesn't exist at all.
+    """
+    p = catalog.get_product(product_id)
+    if p is not None:
+        return p.get("price_cents")
+
+    product = db.get(Product, product_id)
+    if not product or product.deleted_at is not None:
+        raise ValueError("product not found")
+    return _price_cents_from_product(product)
+
+
+def _dialect_insert(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+
+def _add_item_stmt(insert, cart_id: str, product_id: str, quantity: int, unit_price_cents: int | None):
+    """
+    INSERT ... SELECT ... ON CONFLICT DO UPDATE: the SELECT only yields a row
+    while the cart is ACTIVE, and concurrent adds to the same product are
+    summed by the database instead of racing on a read-modify-write.
+    """
+    now = datetime.utcnow()
+    src = select(
+        literal(_new_id()),
+        Cart.id,
+        literal(product_id),
+        literal(quantity),
+        literal(unit_price_cents, CartItem.unit_price_cents.type),
+        literal(now, CartItem.updated_at.type),
+        literal(now, CartItem.updated_at.type),
+    ).where(Cart.id == cart_id, Cart.status == ACTIVE)
+
+    stmt = insert(CartItem).from_select(
+        ["id", "cart_id", "product_id", "quantity", "unit_price_cents", "created_at", "updated_at"],
+        src,
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[CartItem.cart_id, CartItem.product_id],
+        set_={
+            "quantity": CartItem.quantity + stmt.excluded.quantity,
+            # keep the first snapshot, fill it if it was never taken
+            "unit_price_cents": func.coalesce(CartItem.unit_price_cents, stmt.excluded.unit_price_cents),
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+
+
 def add_item(
     db: Session,
     cart_id: str,
@@ -34,147 +94,276 @@ def add_item(
     snapshot_unit_price: bool = True,
 ) -> Cart:
     """
-    Add quantity of product to cart (upsert on cart_id+product_id).
-    Returns the updated cart (active) with items loaded.
+    Add quantity of product to cart (upsert on cart_id+product_id) with a
+    single statement, see _add_item_stmt(). Returns the updated cart (active)
+    with items loaded.
     """
+    _check_quantity(quantity)
 
-    cart = db.query(Cart).filter(Cart.id == cart_id, Cart.status == ACTIVE).one_or_none()
+    unit_price_cents = _unit_price_cents(db, product_id) if snapshot_unit_price else None
+    stmt = _add_item_stmt(_dialect_insert(db), cart_id, product_id, quantity, unit_price_cents)
+
+    def write(w: Session) -> None:
+        if w.execute(stmt).rowcount == 0:
+            raise ValueError("cart not found")
+
+    run_write(db, write)
+
+    cart = get_cart_with_items(db, cart_id)
     if not cart:
         raise ValueError("cart not found")
+    return cart
+
+def _batch_product_ids(ops: list[dict]) -> list[str]:
+    """Products whose price apply_batch() needs to snapshot, in first-seen order."""
+    return list(dict.fromkeys(op["product_id"] for op in ops if op["op"] == "add"))
+
+
+def _fold_batch(cart: Cart, ops: list[dict], prices: dict[str, int | None]):
+    """
+    Folds the ops against the cart's current lines. Returns (gone, absolute_rows,
+    delta_rows): product ids to delete, lines whose quantity is replaced and lines
+    whose quantity is added to the stored one. Raises ValueError on any invalid op.
+    """
+    cart_id = cart.id
+    by_item = {i.id: i.product_id for i in cart.items}
+    base = {i.product_id: i.quantity for i in cart.items}
+
+    qty: dict[str, int] = dict(base)
+    absolute: set[str] = set()   # final quantity replaces the stored one
+    removed: set[str] = set()
+
+    for op in ops:
+        kind = op["op"]
+        if kind == "add":
+            pid = op["product_id"]
+            n = op.get("quantity", 1)
+            if n < 1:
+                raise ValueError("quantity must be >= 1")
+            if pid in removed:
+                removed.discard(pid)
+                absolute.add(pid)
+                qty[pid] = n
+            else:
+                qty[pid] = qty.get(pid, 0) + n
+        elif kind in ("set_quantity", "remove"):
+            pid = by_item.get(op["item_id"])
+            if pid is None or pid in removed:
+                raise ValueError("cart item not found")
+            if kind == "remove":
+                removed.add(pid)
+                absolute.discard(pid)
+                qty.pop(pid, None)
+            else:
+                n = op["quantity"]
+                if n < 1:
+                    raise ValueError("quantity must be >= 1")
+                absolute.add(pid)
+                qty[pid] = n
+        else:
+            raise ValueError(f"unknown op: {kind}")
+
+    now = datetime.utcnow()
+    gone = [pid for pid in removed if pid in base]
+
+    def line(pid: str, n: int) -> dict:
+        return {
+            "id": _new_id(),
+            "cart_id": cart_id,
+            "product_id": pid,
+            "quantity": n,
+            "unit_price_cents": prices.get(pid),
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    absolute_rows = [line(pid, qty[pid]) for pid in absolute]
+    delta_rows = [
+        line(pid, qty[pid] - base.get(pid, 0))
+        for pid in qty
+        if pid not in absolute and qty[pid] != base.get(pid, 0)
+    ]
+    return gone, absolute_rows, delta_rows
+
+
+def _batch_stmts(insert, cart_id: str, gone: list[str], absolute_rows: list[dict], delta_rows: list[dict]) -> list:
+    """Bulk delete, absolute upsert and additive upsert; empty ones are skipped."""
+    stmts = []
+    if gone:
+        stmts.append(delete(CartItem).where(CartItem.cart_id == cart_id, CartItem.product_id.in_(gone)))
+
+    for rows, additive in ((absolute_rows, False), (delta_rows, True)):
+        if not rows:
+            continue
+        stmt = insert(CartItem).values(rows)
+        stmts.append(stmt.on_conflict_do_update(
+            index_elements=[CartItem.cart_id, CartItem.product_id],
+            set_={
+                "quantity": (CartItem.quantity + stmt.excluded.quantity) if additive else stmt.excluded.quantity,
+                "unit_price_cents": func.coalesce(CartItem.unit_price_cents, stmt.excluded.unit_price_cents),
+                "updated_at": stmt.excluded.updated_at,
+            },
+        ))
+    return stmts
+
+
+def _touch_cart_stmt(cart_id: str):
+    # Touch the cart first: validates it's still ACTIVE and, on SQLite, takes
+    # the write lock up front instead of upgrading a read transaction later.
+    return (
+        update(Cart)
+        .where(Cart.id == cart_id, Cart.status == ACTIVE)
+        .values(updated_at=datetime.utcnow())
+    )
+
 
+# Statements and in-memory steps shared with cart_service_async, which only
+# swaps the I/O (and joinedload for selectinload: no lazy loads under asyncio).
+
+def _check_quantity(quantity: int) -> None:
     if quantity < 1:
         raise ValueError("quantity must be >= 1")
 
-    product = db.query(Product).filter(Product.id == product_id).one_or_none()
-    if not product:
-        raise ValueError("product not found")
 
-    unit_price_cents = _price_cents_from_product(product) if snapshot_unit_price else None
+def _active_cart_stmt(cart_id: str):
+    return select(Cart).where(Cart.id == cart_id, Cart.status == ACTIVE)
 
-    # Try to update existing row first
-    item = (
-        db.query(CartItem)
-        .filter(CartItem.cart_id == cart_id, CartItem.product_id == product_id)
-        .one_or_none()
-    )
 
-    if item:
-        item.quantity += quantity
-        if snapshot_unit_price and item.unit_price_cents is None and unit_price_cents is not None:
-            item.unit_price_cents = unit_price_cents
-        item.updated_at = datetime.utcnow()
-        db.commit()
-        cart = get_cart_with_items(db, cart_id)
-        if not cart:
-            raise ValueError("cart not found")
-        return cart
-
-    # Otherwise create new row
-    item = CartItem(
-        cart_id=cart_id,
-        product_id=product_id,
-        quantity=quantity,
-        unit_price_cents=unit_price_cents if snapshot_unit_price else None,
-    )
-    db.add(item)
-    try:
-        db.commit()
-    except IntegrityError:
-        # In case of a race where another insert happened, retry as update
-        db.rollback()
-        item = (
-            db.query(CartItem)
-            .filter(CartItem.cart_id == cart_id, CartItem.product_id == product_id)
-            .one()
-        )
-        item.quantity += quantity
-        if snapshot_unit_price and item.unit_price_cents is None and unit_price_cents is not None:
-            item.unit_price_cents = unit_price_cents
-        item.updated_at = datetime.utctnow()
-        db.commit()
+def _user_cart_stmt(user_id: str):
+    return select(Cart).where(Cart.user_id == user_id, Cart.status == ACTIVE)
 
-    cart = get_cart_with_items(db, cart_id)
-    if not cart:
-        raise ValueError("cart not found")
-    return cart
 
-def get_cart_with_items(db: Session, cart_id: str) -> Cart | None:
+def _guest_cart_stmt(cart_id: str):
+    """The guest cart a cookie points to, if it is still ACTIVE and unowned (claimable)."""
+    return select(Cart).where(Cart.id == cart_id, Cart.status == ACTIVE, Cart.user_id.is_(None))
+
+
+def _set_quantity_stmt(cart_id: str, item_id: str, quantity: int):
     return (
-        db.query(Cart)
-        .options(joinedload(Cart.items))
-        .filter(Cart.id == cart_id, Cart.status == ACTIVE)
-        .one_or_none()
+        update(CartItem)
+        .where(CartItem.id == item_id, CartItem.cart_id == cart_id)
+        .values(quantity=quantity, updated_at=datetime.utcnow())
     )
 
-def get_or_create_guest_cart(db: Session, cart_id: str | None) -> tuple[Cart, bool]:
+
+def _remove_item_stmt(cart_id: str, item_id: str):
+    return delete(CartItem).where(CartItem.id == item_id, CartItem.cart_id == cart_id)
+
+
+def _clear_cart_stmt(cart_id: str):
+    return delete(CartItem).where(CartItem.cart_id == cart_id)
+
+
+def _merge_guest_items(db, guest: Cart, user_cart: Cart) -> None:
+    """Moves the guest cart's lines into user_cart (summing shared products) and retires the guest cart."""
+    existing = {i.product_id: i for i in user_cart.items}
+    for gi in guest.items:
+        if gi.product_id in existing:
+            existing[gi.product_id].quantity += gi.quantity
+        else:
+            db.add(CartItem(cart_id=user_cart.id, product_id=gi.product_id, quantity=gi.quantity))
+    guest.status = "merged"
+
+
+def apply_batch(db: Session, cart: Cart, ops: list[dict]) -> Cart:
     """
-    Returns (cart, created).
-    Reuses an existing guest cart if cart_id points to an ACTIVE cart with user_id NULL.
-    Otherwise creates a new guest cart.
+    Apply an ordered list of cart operations in one transaction:
+      {"op": "add", "product_id": ..., "quantity": n}
+      {"op": "set_quantity", "item_id": ..., "quantity": n}
+      {"op": "remove", "item_id": ...}
+
+    The ops are folded in memory against the cart's current lines, then written
+    with at most four statements (touch cart, bulk delete, absolute upsert,
+    additive upsert) and a single commit. Any invalid op fails the whole batch.
+    Returns the updated cart (active) with items loaded.
     """
-    if cart_id:
-        cart = (
-            db.query(Cart)
-            .options(joinedload(Cart.items))
-            .filter(Cart.id == cart_id)
-            .one_or_none()
-        )
-        if cart and cart.status == ACTIVE and cart.user_id is None:
-            return cart, False
+    cart_id = cart.id
+    prices = {pid: _unit_price_cents(db, pid) for pid in _batch_product_ids(ops)}
+    stmts = _batch_stmts(_dialect_insert(db), cart_id, *_fold_batch(cart, ops, prices))
 
-    # Create a brand new guest cart
-    cart = Cart(user_id=None, status=ACTIVE)
-    db.add(cart)
-    db.commit()
-    db.refresh(cart)
-    return cart, True
+    def write(w: Session) -> None:
+        if w.execute(_touch_cart_stmt(cart_id)).rowcount == 0:
+            raise ValueError("cart not found")
+        for stmt in stmts:
+            w.execute(stmt)
 
+    run_write(db, write)
 
-def get_or_create_active_cart(
+    cart = get_cart_with_items(db, cart_id)
+    if not cart:
+        raise ValueError("cart not found")
+    return cart
+
+def _one_with_items(db: Session, stmt) -> Cart | None:
+    return db.execute(stmt.options(joinedload(Cart.items))).unique().scalar_one_or_none()
+
+def get_cart_with_items(db: Session, cart_id: str) -> Cart | None:
+    return _one_with_items(db, _active_cart_stmt(cart_id))
+
+def find_active_cart(
     db: Session,
     *,
     user_id: str | None,
     cart_id: str | None,
-) -> tuple[Cart, bool]:
+) -> Cart | None:
     """
-    Returns (cart, created).
-    - If user_id is present: return user's ACTIVE cart (or claim guest cart_id if provided)
-    - Else: return/create guest cart
+    Returns the ACTIVE cart this request should use, with items loaded, or None.
+    Never creates a cart (read paths serve an empty virtual cart instead).
+    - If user_id is present: user's ACTIVE cart, else claim the guest cart_id if provided
+    - Else: the guest cart cart_id points to, if it's ACTIVE and unowned
     """
     if user_id:
         # 1) Prefer user's existing active cart
-        user_cart = (
-            db.query(Cart)
-            .options(joinedload(Cart.items))
-            .filter(Cart.user_id == user_id, Cart.status == ACTIVE)
-            .one_or_none()
-        )
+        user_cart = _one_with_items(db, _user_cart_stmt(user_id))
         if user_cart:
-            return user_cart, False
+            return user_cart
 
         # 2) If there's a guest cart cookie, claim it
         if cart_id:
-            guest = (
-                db.query(Cart)
-                .options(joinedload(Cart.items))
-                .filter(Cart.id == cart_id, Cart.status == ACTIVE, Cart.user_id.is_(None))
-                .one_or_none()
-            )
+            guest = _one_with_items(db, _guest_cart_stmt(cart_id))
             if guest:
                 guest.user_id = user_id
                 db.commit()
                 db.refresh(guest)
-                return guest, False
+                return guest
+        return None
 
-        # 3) Otherwise create a fresh user cart
-        cart = Cart(user_id=user_id, status=ACTIVE)
-        db.add(cart)
-        db.commit()
-        db.refresh(cart)
-        return cart, True
+    if cart_id:
+        return _one_with_items(db, _guest_cart_stmt(cart_id))
+    return None
+
+
+def get_or_create_active_cart(
+    db: Session,
+    *,
+    user_id: str | None,
+    cart_id: str | None,
+) -> tuple[Cart, bool]:
+    """
+    Returns (cart, created). Only for mutations: find_active_cart(), else
+    insert a new ACTIVE cart (user-owned if user_id is present).
+    """
+    cart = find_active_cart(db, user_id=user_id, cart_id=cart_id)
+    if cart:
+        return cart, False
+
+    cart = Cart(user_id=user_id, status=ACTIVE)
+    db.add(cart)
+    db.commit()
+    db.refresh(cart)
+    return cart, True
 
-    # ---- Guest flow (your existing behavior) ----
-    return get_or_create_guest_cart(db, cart_id)
+
+def empty_cart_summary(user_id: str | None = None) -> dict:
+    """cart_summary() shape for a cart that doesn't exist (yet)."""
+    return {
+        "id": None,
+        "user_id": user_id,
+        "status": ACTIVE,
+        "items": [],
+        "total_quantity": 0,
+        "subtotal_cents": 0,
+    }
 
 
 def attach_guest_cart_to_user(db: Session, guest_cart_id: str, user_id: str) -> Cart:
@@ -183,28 +372,13 @@ def attach_guest_cart_to_user(db: Session, guest_cart_id: str, user_id: str) ->
     If the user already has an active cart, merge items into it and keep that as active.
     Returns the resulting active cart (user-owned).
     """
-    guest = (
-        db.query(Cart)
-        .options(joinedload(Cart.items))
-        .filter(Cart.id == guest_cart_id)
-        .one_or_none()
-    )
+    guest = _one_with_items(db, select(Cart).where(Cart.id == guest_cart_id))
     if not guest or guest.status != ACTIVE or guest.user_id is not None:
         # nothing to attach
-        return (
-            db.query(Cart)
-            .filter(Cart.user_id == user_id, Cart.status == ACTIVE)
-            .one_or_none()
-            or guest
-        )
+        return db.execute(_user_cart_stmt(user_id)).scalar_one_or_none() or guest
 
     # Does user already have an active cart?
-    user_cart = (
-        db.query(Cart)
-        .options(joinedload(Cart.items))
-        .filter(Cart.user_id == user_id, Cart.status == ACTIVE)
-        .one_or_none()
-    )
+    user_cart = _one_with_items(db, _user_cart_stmt(user_id))
 
     if not user_cart:
         # Claim guest cart directly
@@ -213,36 +387,20 @@ def attach_guest_cart_to_user(db: Session, guest_cart_id: str, user_id: str) ->
         db.refresh(guest)
         return guest
 
-    # Merge guest items into user_cart
-    # Build quick index of existing items by product_id
-    existing = {i.product_id: i for i in user_cart.items}
-
-    for gi in guest.items:
-        if gi.product_id in existing:
-            existing[gi.product_id].quantity += gi.quantity
-        else:
-            db.add(CartItem(cart_id=user_cart.id, product_id=gi.product_id, quantity=gi.quantity))
-
-    guest.status = "merged"   
+    _merge_guest_items(db, guest, user_cart)
     db.commit()
     db.refresh(user_cart)
     return user_cart
 
 
 def set_item_quantity(db: Session, cart_id: str, item_id: str, quantity: int) -> Cart:
-    if quantity < 1:
-        raise ValueError("quantity must be >= 1")
+    _check_quantity(quantity)
 
-    item = (
-        db.query(CartItem)
-        .filter(CartItem.id == item_id, CartItem.cart_id == cart_id)
-        .one_or_none()
-    )
-    if not item:
-        raise ValueError("cart item not found")
+    def write(w: Session) -> None:
+        if w.execute(_set_quantity_stmt(cart_id, item_id, quantity)).rowcount == 0:
+            raise ValueError("cart item not found")
 
-    item.quantity = quantity
-    db.commit()
+    run_write(db, write)
     cart = get_cart_with_items(db, cart_id)
     if not cart:
         raise ValueError("cart not found")
@@ -250,37 +408,63 @@ def set_item_quantity(db: Session, cart_id: str, item_id: str, quantity: int) ->
 
 
 def remove_item(db: Session, cart_id: str, item_id: str) -> Cart:
-    item = (
-        db.query(CartItem)
-        .filter(CartItem.id == item_id, CartItem.cart_id == cart_id)
-        .one_or_none()
-    )
-    if not item:
-        raise ValueError("cart item not found")
+    def write(w: Session) -> None:
+        if w.execute(_remove_item_stmt(cart_id, item_id)).rowcount == 0:
+            raise ValueError("cart item not found")
 
-    db.delete(item)
-    db.commit()
+    run_write(db, write)
     cart = get_cart_with_items(db, cart_id)
     if not cart:
         raise ValueError("cart not found")
     return cart
 
 def clear_cart(db: Session, cart_id: str) -> Cart:
-    db.query(CartItem).filter(CartItem.cart_id == cart_id).delete(synchronize_session=False)
-    db.commit()
+    run_write(db, lambda w: w.execute(_clear_cart_stmt(cart_id)))
     cart = get_cart_with_items(db, cart_id)
     if not cart:
         raise ValueError("cart not found")
     return cart
 
-def cart_summary(db: Session, cart: Cart) -> dict:
-    product_ids = [i.product_id for i in cart.items]
-    products: dict[str, Product] = {}
+def _summary_fields_from_catalog(p: dict) -> dict:
+    return {
+        "id": p["id"],
+        "name": p.get("name"),
+        "category": p.get("product_group_name") or None,
+        "image_key": p.get("image_key"),
+        "has_image": bool(p.get("has_image", False)),
+        "color": p.get("colour_group_name") or None,
+        "price_cents": p.get("price_cents"),
+    }
+
+def _summary_fields_from_row(p: Product) -> dict:
+    return {
+        "id": p.id,
+        "name": p.name,
+        "category": p.category,
+        "image_key": p.image_key,
+        "has_image": bool(p.has_image),
+        "color": p.color,
+        "price_cents": _price_cents_from_product(p),
+    }
+
+def _summary_products(cart: Cart) -> tuple[dict[str, dict], list[str]]:
+    """Summary fields for the cart's products from the catalog, plus ids it doesn't know."""
+    products: dict[str, dict] = {}
+    missing: list[str] = []
+    for pid in {i.product_id for i in cart.items}:
+        p = catalog.get_product(pid)
+        if p is not None:
+            products[pid] = _summary_fields_from_catalog(p)
+        else:
+            missing.append(pid)
+    return products, missing
 
-    if product_ids:
-        rows = db.query(Product).filter(Product.id.in_(product_ids)).all()
-        products = {p.id: p for p in rows}
 
+def _summary_rows_stmt(missing: list[str]):
+    return select(Product).where(Product.id.in_(missing))
+
+
+def _build_summary(cart: Cart, products: dict[str, dict]) -> dict:
     items_out = []
     subtotal_cents = 0
     total_qty = 0
@@ -290,11 +474,8 @@ def cart_summary(db: Session, cart: Cart) -> dict:
 
         # Prefer snapshot price on the item (stable), else fall back to product price
         price_cents = it.unit_price_cents
-        if price_cents is None:
-            if p and getattr(p, "price_cents", None) is not None:
-                price_cents = int(p.price_cents)
-            elif p and getattr(p, "price", None) is not None:
-                price_cents = int(round(float(p.price) * 100))
+        if price_cents is None and p:
+            price_cents = p["price_cents"]
 
         total_qty += it.quantity
         if price_cents is not None:
@@ -308,12 +489,12 @@ def cart_summary(db: Session, cart: Cart) -> dict:
                 "unit_price_cents": price_cents,
                 "line_total_cents": (price_cents * it.quantity) if price_cents is not None else None,
                 "product": {
-                    "id": p.id if p else it.product_id,
-                    "name": p.name if p else None,
-                    "category": getattr(p, "category", None) if p else None,
-                    "image_key": getattr(p, "image_key", None) if p else None,
-                    "has_image": bool(getattr(p, "has_image", False)) if p else False,
-                    "color": getattr(p, "color", None) if p else None,
+                    "id": p["id"] if p else it.product_id,
+                    "name": p["name"] if p else None,
+                    "category": p["category"] if p else None,
+                    "image_key": p["image_key"] if p else None,
+                    "has_image": p["has_image"] if p else False,
+                    "color": p["color"] if p else None,
                 },
             }
         )
@@ -327,25 +508,97 @@ def cart_summary(db: Session, cart: Cart) -> dict:
         "subtotal_cents": subtotal_cents,
     }
 
-def checkout_cart(db: Session, cart: Cart) -> tuple[Cart, Cart]:
+
+def cart_summary(db: Session, cart: Cart) -> dict:
     """
-    Marks the current ACTIVE cart as ORDERED and creates a fresh ACTIVE cart
-    (same user_id if present). Returns (ordered_cart, new_active_cart).
+    Product fields and fallback prices come from the in-memory catalog, so a
+    summary of an already-loaded cart costs no queries. The products table is
+    only hit for ids the catalog doesn't know (e.g. catalog failed to load).
     """
-    # cart.items should already be loaded by get_or_create_guest_cart
-    if not cart.items or len(cart.items) == 0:
-        raise ValueError("cart is empty")
+    products, missing = _summary_products(cart)
+    if missing:
+        rows = db.scalars(_summary_rows_stmt(missing))
+        products.update({p.id: _summary_fields_from_row(p) for p in rows})
+    return _build_summary(cart, products)
 
-    cart.status = "ordered"
-    cart.updated_at = datetime.utcnow()
-    db.add(cart)
-    db.commit()
-    db.refresh(cart)
+def _checkout_cart_stmt(cart_id: str, now: datetime):
+    """
+    Flips the cart to ORDERED, guarded on ACTIVE: run it first and check its
+    rowcount. It also takes the write lock, so the lines read after it (with
+    _locked_cart_stmt) are exactly the ones being ordered.
+    """
+    return update(Cart).where(Cart.id == cart_id, Cart.status == ACTIVE).values(status=ORDERED, updated_at=now)
 
-    new_cart = Cart(user_id=cart.user_id, status=ACTIVE)
-    db.add(new_cart)
-    db.commit()
-    db.refresh(new_cart)
 
-    return cart, new_cart
+def _locked_cart_stmt(cart_id: str):
+    # the cart is ORDERED by now; populate_existing replaces lines the session loaded earlier
+    return select(Cart).where(Cart.id == cart_id).execution_options(populate_existing=True)
+
+
+def _checkout_stmts(cart: Cart, summary: dict, now: datetime) -> tuple[dict, list]:
+    """
+    The order row (returned) plus the statements that insert it with its
+    totals and the immutable lines, priced as in cart_summary().
+    """
+    order = {
+        "id": cart.id,
+        "user_id": cart.user_id,
+        "ordered_at": now,
+        "total_quantity": summary["total_quantity"],
+        "subtotal_cents": summary["subtotal_cents"],
+    }
+    lines = [
+        {
+            "id": it["id"],
+            "order_id": cart.id,
+            "product_id": it["product_id"],
+            "product_name": it["product"]["name"],
+            "quantity": it["quantity"],
+            "unit_price_cents": it["unit_price_cents"],
+            "line_total_cents": it["line_total_cents"],
+        }
+        for it in summary["items"]
+    ]
+    return order, [insert(Order).values(order), insert(OrderLine).values(lines)]
+
 
+def _purchased(cart: Cart) -> list[tuple[str, int]]:
+    return [(it.product_id, it.quantity) for it in cart.items]
+
+
+def _record_purchases(purchased: list[tuple[str, int]]) -> None:
+    """Feeds the placed order ((product_id, quantity) per line) into the trending counters (one purchase per unit) and co-purchase counts."""
+    POPULARITY.record_many([(pid, "purchase", None, n) for pid, n in purchased])
+    COPURCHASE.record_order([pid for pid, _ in purchased])
+
+
+def checkout_cart(db: Session, cart: Cart) -> dict:
+    """
+    Places the order in one transaction: the cart becomes ORDERED and an orders
+    row with its totals plus one order_lines row per item are written. Returns
+    the order row. No replacement cart is created; the next add_item/apply_batch
+    creates one on demand.
+    """
+    # cart.items should already be loaded by find_active_cart
+    if not cart.items:
+        raise ValueError("cart is empty")
+    cart_id = cart.id
+
+    def write(w: Session) -> tuple[dict, list[tuple[str, int]]]:
+        # priced from the lines as they are once the cart is locked, not as this
+        # request loaded them: an edit that committed in between is what gets ordered
+        now = datetime.utcnow()
+        if w.execute(_checkout_cart_stmt(cart_id, now)).rowcount == 0:
+            raise ValueError("cart not found")
+        locked = _one_with_items(w, _locked_cart_stmt(cart_id))
+        if not locked.items:
+            raise ValueError("cart is empty")
+        order, stmts = _checkout_stmts(locked, cart_summary(w, locked), now)
+        for stmt in stmts:
+            w.execute(stmt)
+        # plain data: with the write queue, `w` is closed once this returns
+        return order, _purchased(locked)
+
+    order, purchased = run_write(db, write)
+    _record_purchases(purchased)
+    return order
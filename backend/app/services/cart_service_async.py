@@ -0,0 +1,222 @@
+"""
+AsyncSession versions of the cart_service functions used by the API (DB_ASYNC=1).
+
+Statements, batch folding, guest-cart merging and summaries are shared with
+cart_service; only the I/O differs. Relationships are always loaded eagerly (selectinload) since lazy
+loads can't run under an AsyncSession.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app import catalog
+from app.db.models import Cart, Product
+from app.services.cart_service import (
+    ACTIVE,
+    _active_cart_stmt,
+    _add_item_stmt,
+    _batch_product_ids,
+    _batch_stmts,
+    _build_summary,
+    _check_quantity,
+    _checkout_cart_stmt,
+    _checkout_stmts,
+    _clear_cart_stmt,
+    _dialect_insert,
+    _fold_batch,
+    _guest_cart_stmt,
+    _locked_cart_stmt,
+    _merge_guest_items,
+    _price_cents_from_product,
+    _purchased,
+    _record_purchases,
+    _remove_item_stmt,
+    _set_quantity_stmt,
+    _summary_fields_from_row,
+    _summary_products,
+    _summary_rows_stmt,
+    _touch_cart_stmt,
+    _user_cart_stmt,
+)
+
+
+async def _unit_price_cents(db: AsyncSession, product_id: str) -> int | None:
+    p = catalog.get_product(product_id)
+    if p is not None:
+        return p.get("price_cents")
+
+    product = await db.get(Product, product_id)
+    if not product or product.deleted_at is not None:
+        raise ValueError("product not found")
+    return _price_cents_from_product(product)
+
+
+async def _commit(db: AsyncSession) -> None:
+    try:
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
+
+
+async def _one_with_items(db: AsyncSession, stmt) -> Cart | None:
+    return (await db.execute(stmt.options(selectinload(Cart.items)))).scalar_one_or_none()
+
+
+async def get_cart_with_items(db: AsyncSession, cart_id: str) -> Cart | None:
+    # writes went through Core statements; refresh what this session holds
+    return await _one_with_items(db, _active_cart_stmt(cart_id).execution_options(populate_existing=True))
+
+
+async def _reload(db: AsyncSession, cart_id: str) -> Cart:
+    cart = await get_cart_with_items(db, cart_id)
+    if not cart:
+        raise ValueError("cart not found")
+    return cart
+
+
+async def find_active_cart(
+    db: AsyncSession,
+    *,
+    user_id: str | None,
+    cart_id: str | None,
+) -> Cart | None:
+    """See cart_service.find_active_cart."""
+    if user_id:
+        user_cart = await _one_with_items(db, _user_cart_stmt(user_id))
+        if user_cart:
+            return user_cart
+
+        if cart_id:
+            guest = await _one_with_items(db, _guest_cart_stmt(cart_id))
+            if guest:
+                guest.user_id = user_id
+                await _commit(db)
+                return guest
+        return None
+
+    if cart_id:
+        return await _one_with_items(db, _guest_cart_stmt(cart_id))
+    return None
+
+
+async def get_or_create_active_cart(
+    db: AsyncSession,
+    *,
+    user_id: str | None,
+    cart_id: str | None,
+) -> tuple[Cart, bool]:
+    cart = await find_active_cart(db, user_id=user_id, cart_id=cart_id)
+    if cart:
+        return cart, False
+
+    cart = Cart(user_id=user_id, status=ACTIVE, items=[])
+    db.add(cart)
+    await _commit(db)
+    return cart, True
+
+
+async def attach_guest_cart_to_user(db: AsyncSession, guest_cart_id: str, user_id: str) -> Cart | None:
+    """See cart_service.attach_guest_cart_to_user."""
+    guest = await _one_with_items(db, select(Cart).where(Cart.id == guest_cart_id))
+    if not guest or guest.status != ACTIVE or guest.user_id is not None:
+        user_cart = (await db.execute(_user_cart_stmt(user_id))).scalar_one_or_none()
+        return user_cart or guest
+
+    user_cart = await _one_with_items(db, _user_cart_stmt(user_id))
+
+    if not user_cart:
+        guest.user_id = user_id
+        await _commit(db)
+        return guest
+
+    _merge_guest_items(db, guest, user_cart)
+    await _commit(db)
+    return await get_cart_with_items(db, user_cart.id)
+
+
+async def add_item(db: AsyncSession, cart_id: str, product_id: str, quantity: int = 1) -> Cart:
+    _check_quantity(quantity)
+
+    unit_price_cents = await _unit_price_cents(db, product_id)
+    stmt = _add_item_stmt(_dialect_insert(db), cart_id, product_id, quantity, unit_price_cents)
+    res = await db.execute(stmt)
+    if res.rowcount == 0:
+        await db.rollback()
+        raise ValueError("cart not found")
+    await _commit(db)
+    return await _reload(db, cart_id)
+
+
+async def apply_batch(db: AsyncSession, cart: Cart, ops: list[dict]) -> Cart:
+    """See cart_service.apply_batch."""
+    cart_id = cart.id
+    prices = {pid: await _unit_price_cents(db, pid) for pid in _batch_product_ids(ops)}
+    stmts = _batch_stmts(_dialect_insert(db), cart_id, *_fold_batch(cart, ops, prices))
+
+    if (await db.execute(_touch_cart_stmt(cart_id))).rowcount == 0:
+        await db.rollback()
+        raise ValueError("cart not found")
+    for stmt in stmts:
+        await db.execute(stmt)
+    await _commit(db)
+    return await _reload(db, cart_id)
+
+
+async def set_item_quantity(db: AsyncSession, cart_id: str, item_id: str, quantity: int) -> Cart:
+    _check_quantity(quantity)
+
+    if (await db.execute(_set_quantity_stmt(cart_id, item_id, quantity))).rowcount == 0:
+        await db.rollback()
+        raise ValueError("cart item not found")
+    await _commit(db)
+    return await _reload(db, cart_id)
+
+
+async def remove_item(db: AsyncSession, cart_id: str, item_id: str) -> Cart:
+    if (await db.execute(_remove_item_stmt(cart_id, item_id))).rowcount == 0:
+        await db.rollback()
+        raise ValueError("cart item not found")
+    await _commit(db)
+    return await _reload(db, cart_id)
+
+
+async def clear_cart(db: AsyncSession, cart_id: str) -> Cart:
+    await db.execute(_clear_cart_stmt(cart_id))
+    await _commit(db)
+    return await _reload(db, cart_id)
+
+
+async def cart_summary(db: AsyncSession, cart: Cart) -> dict:
+    products, missing = _summary_products(cart)
+    if missing:
+        rows = (await db.execute(_summary_rows_stmt(missing))).scalars()
+        products.update({p.id: _summary_fields_from_row(p) for p in rows})
+    return _build_summary(cart, products)
+
+
+async def checkout_cart(db: AsyncSession, cart: Cart) -> dict:
+    """See cart_service.checkout_cart."""
+    if not cart.items:
+        raise ValueError("cart is empty")
+
+    cart_id = cart.id
+    now = datetime.utcnow()
+    if (await db.execute(_checkout_cart_stmt(cart_id, now))).rowcount == 0:
+        await db.rollback()
+        raise ValueError("cart not found")
+    locked = await _one_with_items(db, _locked_cart_stmt(cart_id))
+    if not locked.items:
+        await db.rollback()
+        raise ValueError("cart is empty")
+    order, stmts = _checkout_stmts(locked, await cart_summary(db, locked), now)
+    for stmt in stmts:
+        await db.execute(stmt)
+    purchased = _purchased(locked)
+    await _commit(db)
+    _record_purchases(purchased)
+    return order
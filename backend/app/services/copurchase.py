@@ -0,0 +1,239 @@
+"""
+Item-item co-purchase counts ("frequently bought together").
+
+C[a, b] = number of orders containing both a and b. The bulk of C is a CSR
+matrix (numpy indptr/indices/data) built from order_lines at startup; orders
+placed since then go into a small dict-of-dicts delta that is merged back into
+the CSR once it grows past `merge_threshold` entries. Each product's top-N
+partners are kept up to date on every checkout, so bought_together() is a
+lookup; score() ranks candidates for a whole cart as one sparse vector-matrix
+product (sum of the cart's rows).
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from collections import defaultdict
+from itertools import groupby
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.db.models import OrderLine
+
+log = logging.getLogger(__name__)
+
+
+class CoPurchaseMatrix:
+    def __init__(self, top_n: int, max_order_items: int, merge_threshold: int = 50_000):
+        self.top_n = top_n
+        # bigger orders (bulk buys) are skipped: O(m^2) pairs and little signal
+        self.max_order_items = max_order_items
+        self.merge_threshold = merge_threshold
+
+        self._ids: list[str] = []
+        self._pos: dict[str, int] = {}
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.zeros(0, dtype=np.int32)
+        self._data = np.zeros(0, dtype=np.float64)
+        self._delta: dict[int, dict[int, int]] = {}
+        self._delta_nnz = 0
+        self._top: dict[int, list[tuple[int, int]]] = {}  # row -> [(count, col)], best first
+        self._lock = threading.Lock()
+
+        self.orders = 0
+        self.merges = 0
+
+    def _intern(self, product_id: str) -> int:
+        i = self._pos.get(product_id)
+        if i is None:
+            i = self._pos[product_id] = len(self._ids)
+            self._ids.append(product_id)
+        return i
+
+    def _base_rows(self) -> int:
+        return len(self._indptr) - 1
+
+    def _base_count(self, a: int, b: int) -> int:
+        if a >= self._base_rows():
+            return 0
+        lo, hi = self._indptr[a], self._indptr[a + 1]
+        j = lo + np.searchsorted(self._indices[lo:hi], b)
+        return int(self._data[j]) if j < hi and self._indices[j] == b else 0
+
+    def _set_csr(self, rows: np.ndarray, cols: np.ndarray, vals: np.ndarray) -> None:
+        """Replaces the CSR with the given (unsorted, possibly repeated) triplets; repeats are summed."""
+        n = len(self._ids)
+        if len(rows):
+            keys, inverse = np.unique(rows.astype(np.int64) * n + cols, return_inverse=True)
+            vals = np.bincount(inverse, weights=vals)
+            rows, cols = keys // n, keys % n
+        self._indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=n)))).astype(np.int64)
+        self._indices = cols.astype(np.int32)
+        self._data = vals.astype(np.float64)
+
+    def _rebuild_top(self) -> None:
+        self._top = {}
+        for a in range(self._base_rows()):
+            lo, hi = self._indptr[a], self._indptr[a + 1]
+            if lo == hi:
+                continue
+            vals = self._data[lo:hi]
+            best = np.argsort(-vals, kind="stable")[: self.top_n]
+            self._top[a] = [(int(vals[j]), int(self._indices[lo + j])) for j in best]
+
+    def _merge(self) -> None:
+        """Folds the delta into the CSR."""
+        if not self._delta:
+            return
+        base_rows = np.repeat(np.arange(self._base_rows()), np.diff(self._indptr))
+        d_rows, d_cols, d_vals = [], [], []
+        for a, row in self._delta.items():
+            for b, c in row.items():
+                d_rows.append(a)
+                d_cols.append(b)
+                d_vals.append(c)
+        self._set_csr(
+            np.concatenate((base_rows, np.asarray(d_rows, dtype=np.int64))),
+            np.concatenate((self._indices.astype(np.int64), np.asarray(d_cols, dtype=np.int64))),
+            np.concatenate((self._data, np.asarray(d_vals, dtype=np.float64))),
+        )
+        self._delta = {}
+        self._delta_nnz = 0
+        self.merges += 1
+
+    def _offer_top(self, a: int, b: int, count: int) -> None:
+        """Counts only grow, so a partner can only enter a's top-N on its own increment."""
+        top = self._top.setdefault(a, [])
+        for i, (_, col) in enumerate(top):
+            if col == b:
+                top[i] = (count, b)
+                break
+        else:
+            if len(top) >= self.top_n and (-count, b) > (-top[-1][0], top[-1][1]):
+                return
+            top.append((count, b))
+        # ties go to the lower column, as in _rebuild_top (stable sort over sorted indices)
+        top.sort(key=lambda t: (-t[0], t[1]))
+        del top[self.top_n :]
+
+    def _order_positions(self, product_ids) -> list[int] | None:
+        distinct = list(dict.fromkeys(product_ids))
+        if len(distinct) < 2 or len(distinct) > self.max_order_items:
+            return None
+        return [self._intern(pid) for pid in distinct]
+
+    def record_order(self, product_ids: list[str]) -> None:
+        """Adds one placed order (its product ids; repeats are ignored)."""
+        with self._lock:
+            self.orders += 1
+            pos = self._order_positions(product_ids)
+            if pos is None:
+                return
+            for a in pos:
+                row = self._delta.setdefault(a, {})
+                for b in pos:
+                    if a == b:
+                        continue
+                    if b not in row:
+                        self._delta_nnz += 1
+                    row[b] = row.get(b, 0) + 1
+                    self._offer_top(a, b, self._base_count(a, b) + row[b])
+            if self._delta_nnz >= self.merge_threshold:
+                self._merge()
+
+    def load(self, db: Session) -> int:
+        """Rebuilds the matrix from every order line; returns the number of orders read."""
+        rows = db.execute(select(OrderLine.order_id, OrderLine.product_id).order_by(OrderLine.order_id))
+        pairs: dict[tuple[int, int], int] = defaultdict(int)
+        with self._lock:
+            self._ids, self._pos = [], {}
+            self._delta, self._delta_nnz = {}, 0
+            orders = 0
+            for _, lines in groupby(rows, key=lambda r: r[0]):
+                orders += 1
+                pos = self._order_positions(r[1] for r in lines)
+                if pos is None:
+                    continue
+                for a in pos:
+                    for b in pos:
+                        if a != b:
+                            pairs[(a, b)] += 1
+
+            if pairs:
+                ab = np.fromiter((x for k in pairs for x in k), dtype=np.int64, count=2 * len(pairs)).reshape(-1, 2)
+                vals = np.fromiter(pairs.values(), dtype=np.float64, count=len(pairs))
+            else:
+                ab = np.zeros((0, 2), dtype=np.int64)
+                vals = np.zeros(0, dtype=np.float64)
+            self._set_csr(ab[:, 0], ab[:, 1], vals)
+            self._rebuild_top()
+            self.orders = orders
+        return orders
+
+    def bought_together(self, product_id: str, limit: int) -> list[tuple[str, int]]:
+        """[(product_id, orders containing both)] best first."""
+        with self._lock:
+            a = self._pos.get(product_id)
+            if a is None:
+                return []
+            return [(self._ids[b], c) for c, b in self._top.get(a, [])[:limit]]
+
+    def score(self, product_ids: list[str], limit: int) -> list[tuple[str, float]]:
+        """
+        Candidates for a basket, ranked by total co-purchases with its items
+        (x^T C for the basket's indicator vector x). Basket items are excluded.
+        """
+        with self._lock:
+            pos = sorted({self._pos[pid] for pid in product_ids if pid in self._pos})
+            n = len(self._ids)
+            if not pos or n == 0:
+                return []
+
+            base = [a for a in pos if a < self._base_rows()]
+            if base:
+                spans = [np.arange(self._indptr[a], self._indptr[a + 1]) for a in base]
+                take = np.concatenate(spans)
+                scores = np.bincount(self._indices[take], weights=self._data[take], minlength=n)
+            else:
+                scores = np.zeros(n, dtype=np.float64)
+            for a in pos:
+                for b, c in self._delta.get(a, {}).items():
+                    scores[b] += c
+
+            scores[pos] = 0.0
+            k = min(limit, int(np.count_nonzero(scores)))
+            if k == 0:
+                return []
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best], kind="stable")]
+            return [(self._ids[b], float(scores[b])) for b in best]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "products": len(self._ids),
+                "orders": self.orders,
+                "nnz": int(len(self._indices)),
+                "delta_nnz": self._delta_nnz,
+                "merges": self.merges,
+                "top_n": self.top_n,
+            }
+
+
+COPURCHASE = CoPurchaseMatrix(
+    top_n=settings.copurchase_top_n,
+    max_order_items=settings.copurchase_max_order_items,
+)
+
+
+def load_copurchase() -> None:
+    try:
+        with SessionLocal() as db:
+            n = COPURCHASE.load(db)
+        log.info("co-purchase: loaded %d orders", n)
+    except Exception:
+        log.exception("co-purchase load failed; starting empty")
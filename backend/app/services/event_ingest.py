@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.db.models import Event
+from app.services.event_store import EVENT_STORE, EventStore
+
+log = logging.getLogger(__name__)
+
+# dropped first when the buffer runs hot; purchases/cart events are kept until it's full
+SHEDDABLE_TYPES = frozenset({"view"})
+
+
+class EventIngestor:
+    """
+    Bounded in-memory buffer of event rows, drained by one background writer.
+
+    offer() never blocks and never touches the DB: rows are appended to the
+    buffer and the writer bulk-inserts them (one executemany + commit per
+    batch, off the event loop) whenever `batch_size` rows are waiting or
+    `flush_interval_s` has passed. Under overload it sheds in two steps:
+    above `high_water` (fraction of `max_queue`) low-value types are dropped,
+    at `max_queue` everything is. stop() drains what's buffered.
+
+    Batches go to the events table, to an append-only EventStore, or both.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        max_queue: int,
+        batch_size: int,
+        flush_interval_s: float,
+        high_water: float = 0.8,
+        store: EventStore | None = None,
+        write_db: bool = True,
+    ):
+        self.session_factory = session_factory
+        self.store = store
+        self.write_db = write_db
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.high_water_rows = int(max_queue * high_water)
+
+        self._buf: deque[dict] = deque()
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+        self._stopping = False
+        self._task: asyncio.Task | None = None
+
+        self.accepted = 0
+        self.dropped_full = 0
+        self.dropped_shed = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.last_flush_ms = 0.0
+
+    def offer(self, rows: list[dict]) -> tuple[int, int]:
+        """Buffers what fits; returns (accepted, dropped). Safe to call from any thread."""
+        accepted = dropped_shed = dropped_full = 0
+        with self._lock:
+            for row in rows:
+                depth = len(self._buf)
+                if depth >= self.max_queue:
+                    dropped_full += 1
+                elif depth >= self.high_water_rows and row["event_type"] in SHEDDABLE_TYPES:
+                    dropped_shed += 1
+                else:
+                    self._buf.append(row)
+                    accepted += 1
+            self.accepted += accepted
+            self.dropped_shed += dropped_shed
+            self.dropped_full += dropped_full
+            wake = len(self._buf) >= self.batch_size
+
+        if wake:
+            self._notify()
+        return accepted, dropped_shed + dropped_full
+
+    def is_full(self) -> bool:
+        return len(self._buf) >= self.max_queue
+
+    def _notify(self) -> None:
+        if self._loop is None or self._wake is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._wake.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def _take(self) -> list[dict]:
+        with self._lock:
+            n = min(self.batch_size, len(self._buf))
+            return [self._buf.popleft() for _ in range(n)]
+
+    def _insert_db(self, db: Session, rows: list[dict]) -> int:
+        """
+        Inserts rows in one statement; if a constraint (e.g. an unknown
+        product_id) rejects it, retries each half so only the offending rows
+        are lost. Returns how many rows were rejected.
+        """
+        try:
+            db.execute(insert(Event), rows)
+            db.commit()
+            return 0
+        except IntegrityError:
+            db.rollback()
+            if len(rows) == 1:
+                return 1
+        mid = len(rows) // 2
+        return self._insert_db(db, rows[:mid]) + self._insert_db(db, rows[mid:])
+
+    def _insert(self, rows: list[dict]) -> int:
+        """Writes one batch to the configured sinks; returns rows the DB rejected."""
+        if self.store is not None:
+            self.store.append(rows)
+        if not self.write_db:
+            return 0
+        with self.session_factory() as db:
+            return self._insert_db(db, rows)
+
+    async def _flush(self) -> None:
+        """Writes everything buffered, batch_size rows per transaction."""
+        while True:
+            rows = self._take()
+            if not rows:
+                return
+            t0 = time.perf_counter()
+            try:
+                rejected = await asyncio.to_thread(self._insert, rows)
+            except Exception:
+                log.exception("event batch insert failed (%d rows dropped)", len(rows))
+                rejected = len(rows)
+            else:
+                if rejected:
+                    log.warning("event batch: %d of %d rows rejected by the database", rejected, len(rows))
+            self.failed += rejected
+            self.written += len(rows) - rejected
+            self.batches += 1
+            self.last_batch_size = len(rows)
+            self.last_flush_ms = round((time.perf_counter() - t0) * 1000, 2)
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval_s)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self._flush()
+        await self._flush()
+
+    def start(self) -> asyncio.Task:
+        self._stopping = False
+        self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self) -> None:
+        """Stops the writer after it has flushed everything buffered."""
+        self._stopping = True
+        if self._task is None:
+            await self._flush()
+            return
+        if self._wake is not None:
+            self._wake.set()
+        await self._task
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": len(self._buf),
+            "max_queue": self.max_queue,
+            "high_water": self.high_water_rows,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": int(self.flush_interval_s * 1000),
+            "accepted": self.accepted,
+            "dropped": {"shed": self.dropped_shed, "full": self.dropped_full},
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+            "avg_batch": round((self.written + self.failed) / self.batches, 1) if self.batches else 0.0,
+            "last_batch_size": self.last_batch_size,
+            "last_flush_ms": self.last_flush_ms,
+            "sink": settings.events_sink,
+        }
+
+
+EVENTS = EventIngestor(
+    SessionLocal,
+    max_queue=settings.events_max_queue,
+    batch_size=settings.events_batch_size,
+    flush_interval_s=settings.events_flush_interval_ms / 1000.0,
+    high_water=settings.events_shed_high_water,
+    store=EVENT_STORE,
+    write_db=settings.events_sink != "segments",
+)
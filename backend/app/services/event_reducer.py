@@ -0,0 +1,132 @@
+"""
+Ingestion-side volume reduction for POST /v1/events, applied before events
+reach the trending counters or storage:
+
+- dedup: a repeated (session, user, product, type) within the window is dropped.
+  Keys (the tuples themselves, so there are no false positives) live in a
+  small TTL set made of two generations; the current one is retired once it
+  is `window_s` old (or holds `max_keys`), so a key is remembered for between
+  one and two windows and memory stays bounded.
+- sampling: each event type can be kept with probability `rate`; kept events
+  carry weight 1/rate so counts can be scaled back up.
+"""
+from __future__ import annotations
+
+import random
+import threading
+import time
+
+from app.core.config import settings
+
+ANONYMOUS = "anonymous"
+
+
+class EventReducer:
+    def __init__(
+        self,
+        window_s: float,
+        dedup_types: frozenset[str],
+        max_keys: int,
+        sample_rates: dict[str, float],
+        rng: random.Random | None = None,
+    ):
+        self.window_s = window_s
+        self.dedup_types = dedup_types
+        self.max_keys = max_keys
+        self.sample_rates = {t: r for t, r in sample_rates.items() if r < 1.0}
+        self._rng = rng or random.Random()
+
+        self._current: set[tuple[str, str, str, str]] = set()
+        self._previous: set[tuple[str, str, str, str]] = set()
+        self._rotated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.seen = 0
+        self.deduped = 0
+        self.sampled_out = 0
+        self.rotations = 0
+
+    def _rotate_if_due(self, now: float) -> None:
+        if now - self._rotated_at >= self.window_s or len(self._current) >= self.max_keys:
+            self._previous = self._current
+            self._current = set()
+            self._rotated_at = now
+            self.rotations += 1
+
+    @staticmethod
+    def _key(row: dict) -> tuple[str, str, str, str] | None:
+        # events without any identity all share one key space; never collapse them
+        if row["session_id"] == ANONYMOUS and row["user_id"] == ANONYMOUS:
+            return None
+        return (row["session_id"], row["user_id"], row["product_id"], row["event_type"])
+
+    def _is_repeat(self, row: dict) -> bool:
+        key = self._key(row)
+        if key is None:
+            return False
+        if key in self._current or key in self._previous:
+            return True
+        self._current.add(key)
+        return False
+
+    def reduce(self, rows: list[dict]) -> list[dict]:
+        """Rows that survive dedup and sampling, each with its "weight" set."""
+        dedup = self.window_s > 0
+        kept = []
+        deduped = sampled_out = 0
+        with self._lock:
+            if dedup:
+                self._rotate_if_due(time.monotonic())
+            for row in rows:
+                t = row["event_type"]
+                if dedup and t in self.dedup_types and self._is_repeat(row):
+                    deduped += 1
+                    continue
+                rate = self.sample_rates.get(t)
+                if rate is not None:
+                    if self._rng.random() >= rate:
+                        sampled_out += 1
+                        continue
+                    row["weight"] = 1.0 / rate
+                else:
+                    row["weight"] = 1.0
+                kept.append(row)
+            self.seen += len(rows)
+            self.deduped += deduped
+            self.sampled_out += sampled_out
+        return kept
+
+    def forget(self, rows: list[dict]) -> None:
+        """
+        Un-records the dedup keys of `rows` (kept rows from reduce() that were
+        not stored after all), so a retry of the same events isn't dropped.
+        """
+        with self._lock:
+            for row in rows:
+                if row["event_type"] not in self.dedup_types:
+                    continue
+                key = self._key(row)
+                if key is not None:
+                    self._current.discard(key)
+                    self._previous.discard(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "window_s": self.window_s,
+                "dedup_types": sorted(self.dedup_types),
+                "sample_rates": self.sample_rates,
+                "keys": len(self._current) + len(self._previous),
+                "seen": self.seen,
+                "deduped": self.deduped,
+                "sampled_out": self.sampled_out,
+                "rotations": self.rotations,
+            }
+
+
+REDUCER = EventReducer(
+    window_s=settings.events_dedup_window_s,
+    dedup_types=frozenset(settings.events_dedup_types),
+    max_keys=settings.events_dedup_max_keys,
+    sample_rates=settings.events_sample_rates,
+)
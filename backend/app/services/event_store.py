@@ -0,0 +1,389 @@
+"""
+Append-only, hour-partitioned event log on disk: an alternative (or addition)
+to the events table for high-volume events such as views.
+
+Layout under the store root:
+
+    segments/YYYYMMDDHH/<pid>-<token>-<seq>.ndjson.gz
+                                                one open segment per writer process
+                                                (token is random per EventStore, so a
+                                                restarted worker that reuses a pid never
+                                                appends to a file it didn't create);
+                                                each append adds one gzip member
+    segments/YYYYMMDDHH/<name>.meta.json        sidecar index: rows, ts range, bytes
+    segments/YYYYMMDDHH/compact.ndjson.gz       written by compact(): the hour's
+                                                segments merged and sorted by ts
+    segments/YYYYMMDDHH/compact.pending.json    meta of a compaction that has not
+                                                finished swapping files in
+    export/YYYYMMDDHH.npz                       columnar export of a compacted hour
+
+Hours are partitioned by arrival time, so once an hour (plus a grace period)
+is over no writer touches it again and compact() can rewrite it safely. Event
+timestamps (client-supplied) go in the rows and the ts range in each sidecar,
+which is what iter_events() uses to skip segments.
+"""
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.popularity import TRENDING_TYPES
+
+log = logging.getLogger(__name__)
+
+HOUR_FMT = "%Y%m%d%H"
+COMPACT_NAME = "compact.ndjson.gz"
+PENDING_NAME = "compact.pending.json"
+# an hour is sealed (no more appends) this long after it ends
+SEAL_GRACE = timedelta(minutes=5)
+# a compaction lock older than this is assumed to belong to a dead process
+STALE_LOCK_S = 3600
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _ms(ts: datetime) -> int:
+    return int((ts - _EPOCH).total_seconds() * 1000)
+
+
+def _from_ms(ms: int) -> datetime:
+    return _EPOCH + timedelta(milliseconds=ms)
+
+
+def _write_json(path: Path, obj: dict) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(obj))
+    os.replace(tmp, path)
+
+
+def _meta_path(segment: Path) -> Path:
+    return segment.with_name(segment.name.removesuffix(".ndjson.gz") + ".meta.json")
+
+
+def default_store_dir() -> Path:
+    here = Path(__file__).resolve()
+    backend_root = here.parents[2]  # backend/
+    project_root = backend_root if (backend_root / "data").exists() else backend_root.parent
+    return project_root / "data" / "events"
+
+
+class EventStore:
+    def __init__(self, root: Path, segment_max_bytes: int = 64 * 1024 * 1024):
+        self.root = Path(root)
+        self.segment_max_bytes = segment_max_bytes
+        self._lock = threading.Lock()
+        self._token = uuid.uuid4().hex[:8]
+        self._seq = 0
+        self._open: tuple[str, Path] | None = None  # (hour, segment) this process appends to
+        self._meta: dict | None = None
+
+        self.appended = 0
+        self.compacted_hours = 0
+
+    def _hour_dir(self, hour: str) -> Path:
+        return self.root / "segments" / hour
+
+    def _segment_for(self, hour: str) -> Path:
+        if self._open is not None and self._open[0] == hour and self._meta["bytes"] < self.segment_max_bytes:
+            return self._open[1]
+
+        d = self._hour_dir(hour)
+        d.mkdir(parents=True, exist_ok=True)
+        self._seq += 1
+        seg = d / f"{os.getpid()}-{self._token}-{self._seq:04d}.ndjson.gz"
+        self._open = (hour, seg)
+        self._meta = {"rows": 0, "min_ts": None, "max_ts": None, "bytes": 0}
+        return seg
+
+    def append(self, rows: list[dict]) -> None:
+        """
+        Writes rows (events-table dicts; ts is a naive UTC datetime) as one gzip
+        member of the current segment. Safe to call from any thread.
+        """
+        if not rows:
+            return
+        lines = []
+        lo = hi = None
+        for r in rows:
+            ts = _ms(r["ts"])
+            lo = ts if lo is None or ts < lo else lo
+            hi = ts if hi is None or ts > hi else hi
+            lines.append(
+                json.dumps(
+                    {
+                        "ts": ts,
+                        "event_type": r["event_type"],
+                        "product_id": r["product_id"],
+                        "user_id": r["user_id"],
+                        "session_id": r["session_id"],
+                        "weight": r.get("weight", 1.0),
+                    },
+                    separators=(",", ":"),
+                )
+            )
+        payload = gzip.compress(("\n".join(lines) + "\n").encode("utf-8"))
+
+        with self._lock:
+            seg = self._segment_for(datetime.utcnow().strftime(HOUR_FMT))
+            with open(seg, "ab") as f:
+                f.write(payload)
+            m = self._meta
+            m["rows"] += len(rows)
+            m["bytes"] += len(payload)
+            m["min_ts"] = lo if m["min_ts"] is None else min(m["min_ts"], lo)
+            m["max_ts"] = hi if m["max_ts"] is None else max(m["max_ts"], hi)
+            _write_json(_meta_path(seg), m)
+            self.appended += len(rows)
+
+    # ---- reading ----
+
+    def _hours(self) -> list[str]:
+        d = self.root / "segments"
+        return sorted(p.name for p in d.iterdir() if p.is_dir()) if d.exists() else []
+
+    def _segments(self, hour: str) -> list[tuple[Path, dict]]:
+        out = []
+        for meta_path in sorted(self._hour_dir(hour).glob("*.meta.json")):
+            seg = meta_path.with_name(meta_path.name.removesuffix(".meta.json") + ".ndjson.gz")
+            try:
+                meta = json.loads(meta_path.read_text())
+            except (OSError, ValueError):
+                continue
+            if seg.exists():
+                out.append((seg, meta))
+        return out
+
+    @staticmethod
+    def _read_segment(seg: Path) -> Iterator[dict]:
+        try:
+            with gzip.open(seg, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        except (EOFError, gzip.BadGzipFile, zlib.error, json.JSONDecodeError):
+            # torn last member from a crash mid-append: everything before it is intact
+            log.warning("event segment %s ends early; skipping the rest", seg)
+
+    def iter_events(
+        self,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        types: Iterable[str] | None = None,
+    ) -> Iterator[dict]:
+        """
+        Streams stored events ({ts: datetime, event_type, product_id, user_id,
+        session_id, weight}) with since <= ts < until, partition by partition; segments
+        whose ts range misses the window are not opened. Order is by arrival
+        hour, and by ts within compacted hours.
+        """
+        lo = _ms(since) if since else None
+        hi = _ms(until) if until else None
+        wanted = set(types) if types else None
+
+        for hour in self._hours():
+            for seg, meta in self._segments(hour):
+                if not meta.get("rows"):
+                    continue
+                if lo is not None and meta["max_ts"] < lo:
+                    continue
+                if hi is not None and meta["min_ts"] >= hi:
+                    continue
+                for e in self._read_segment(seg):
+                    if lo is not None and e["ts"] < lo:
+                        continue
+                    if hi is not None and e["ts"] >= hi:
+                        continue
+                    if wanted is not None and e["event_type"] not in wanted:
+                        continue
+                    e["ts"] = _from_ms(e["ts"])
+                    yield e
+
+    # ---- compaction ----
+
+    def _acquire(self, hour: str) -> Path | None:
+        lock = self._hour_dir(hour) / ".compact.lock"
+        try:
+            if time.time() - lock.stat().st_mtime > STALE_LOCK_S:
+                lock.unlink(missing_ok=True)
+        except FileNotFoundError:
+            pass
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return None
+        return lock
+
+    def _export(self, hour: str, events: list[dict]) -> Path:
+        """Columnar copy of one hour: int64 ts (ms) plus dictionary-encoded string columns."""
+        cols = {
+            "ts": np.fromiter((e["ts"] for e in events), dtype=np.int64, count=len(events)),
+            "weight": np.fromiter((e.get("weight", 1.0) for e in events), dtype=np.float32, count=len(events)),
+        }
+        for name in ("event_type", "product_id", "user_id", "session_id"):
+            values, codes = np.unique(np.array([e[name] for e in events], dtype=str), return_inverse=True)
+            cols[name] = codes.astype(np.int32)
+            cols[f"{name}_values"] = values
+        out_dir = self.root / "export"
+        out_dir.mkdir(parents=True, exist_ok=True)
+        out = out_dir / f"{hour}.npz"
+        tmp = out_dir / f"{hour}.tmp.npz"
+        np.savez_compressed(tmp, **cols)
+        os.replace(tmp, out)
+        return out
+
+    def _drop_merged_sources(self, target: Path) -> None:
+        if not target.exists():
+            # the merge never landed: its sources are the only copy
+            return
+        try:
+            merged = json.loads(_meta_path(target).read_text()).get("sources", [])
+        except (OSError, ValueError):
+            return
+        for name in merged:
+            seg = target.with_name(name)
+            _meta_path(seg).unlink(missing_ok=True)
+            seg.unlink(missing_ok=True)
+
+    def _finish_pending(self, target: Path, tmp: Path) -> None:
+        """Settles a compaction that died between writing its pending meta and publishing it."""
+        pending = target.with_name(PENDING_NAME)
+        if not pending.exists():
+            tmp.unlink(missing_ok=True)
+            return
+        if tmp.exists():
+            # died before the swap: the target and its meta are still the old pair
+            tmp.unlink()
+            pending.unlink()
+        else:
+            # died after the swap: the target is the merged file, publish its meta
+            os.replace(pending, _meta_path(target))
+
+    def compact_hour(self, hour: str) -> int:
+        """
+        Merges every segment of a sealed hour into one ts-sorted segment and
+        writes its columnar export. Returns rows written (0 if nothing to do).
+        """
+        lock = self._acquire(hour)
+        if lock is None:
+            return 0
+        try:
+            d = self._hour_dir(hour)
+            target = d / COMPACT_NAME
+            tmp = d / (COMPACT_NAME + ".tmp")
+            self._finish_pending(target, tmp)
+            self._drop_merged_sources(target)
+            segs = self._segments(hour)
+            if not segs or (len(segs) == 1 and segs[0][0] == target):
+                return 0
+
+            events = [e for seg, _ in segs for e in self._read_segment(seg)]
+            events.sort(key=lambda e: e["ts"])
+
+            with gzip.open(tmp, "wt", encoding="utf-8") as f:
+                for e in events:
+                    f.write(json.dumps(e, separators=(",", ":")) + "\n")
+            sources = [seg.name for seg, _ in segs if seg != target]
+            meta = {
+                "rows": len(events),
+                "min_ts": events[0]["ts"] if events else None,
+                "max_ts": events[-1]["ts"] if events else None,
+                "bytes": tmp.stat().st_size,
+                "sources": sources,
+            }
+            # order matters for crash recovery (see _finish_pending): the new meta
+            # waits beside the target until the merged file has replaced it, and
+            # the sources only go once both are in place
+            _write_json(d / PENDING_NAME, meta)
+            os.replace(tmp, target)
+            os.replace(d / PENDING_NAME, _meta_path(target))
+            self._drop_merged_sources(target)
+
+            if events:
+                self._export(hour, events)
+            self.compacted_hours += 1
+            return len(events)
+        finally:
+            lock.unlink(missing_ok=True)
+
+    def compact(self, now: datetime | None = None) -> dict:
+        """Compacts every sealed hour that still has more than one segment."""
+        now = now or datetime.utcnow()
+        sealed_before = (now - SEAL_GRACE).replace(minute=0, second=0, microsecond=0)
+        report = {"hours": 0, "rows": 0}
+        for hour in self._hours():
+            if datetime.strptime(hour, HOUR_FMT) >= sealed_before:
+                continue
+            n = self.compact_hour(hour)
+            if n:
+                report["hours"] += 1
+                report["rows"] += n
+        return report
+
+    def stats(self) -> dict:
+        hours = self._hours()
+        segments = rows = size = 0
+        for hour in hours:
+            for _, meta in self._segments(hour):
+                segments += 1
+                rows += meta.get("rows") or 0
+                size += meta.get("bytes") or 0
+        return {
+            "root": str(self.root),
+            "hours": len(hours),
+            "segments": segments,
+            "rows": rows,
+            "bytes": size,
+            "appended": self.appended,
+            "compacted_hours": self.compacted_hours,
+        }
+
+
+def replay_popularity(store: EventStore, counters, since: datetime | None = None, batch: int = 10_000) -> int:
+    """Feeds stored views / add_to_cart events into popularity counters; returns events replayed."""
+    n = 0
+    buf = []
+    for e in store.iter_events(since=since, types=TRENDING_TYPES):
+        buf.append((e["product_id"], e["event_type"], (e["ts"] - _EPOCH).total_seconds(), e.get("weight", 1.0)))
+        if len(buf) >= batch:
+            counters.record_many(buf)
+            n += len(buf)
+            buf = []
+    if buf:
+        counters.record_many(buf)
+        n += len(buf)
+    return n
+
+
+EVENT_STORE: EventStore | None = (
+    EventStore(
+        Path(settings.events_store_dir) if settings.events_store_dir else default_store_dir(),
+        segment_max_bytes=settings.events_store_segment_bytes,
+    )
+    if settings.events_sink != "db"
+    else None
+)
+
+
+async def compaction_loop() -> None:
+    while True:
+        await asyncio.sleep(settings.events_store_compact_interval_s)
+        try:
+            report = await asyncio.to_thread(EVENT_STORE.compact)
+            if report["hours"]:
+                log.info("event store compaction: %s", report)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.exception("event store compaction failed")
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, exists, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.db.models import Cart, CartItem, UserSession
+
+log = logging.getLogger(__name__)
+
+ACTIVE = "active"
+ABANDONED = "abandoned"
+
+LAST_RUN: dict | None = None
+
+
+def _in_batches(db: Session, select_ids, apply, batch_size: int, max_batches: int) -> int:
+    """Repeatedly select up to batch_size ids and apply() them, one commit per batch."""
+    total = 0
+    for _ in range(max_batches):
+        ids = list(db.execute(select_ids.limit(batch_size)).scalars())
+        if not ids:
+            break
+        total += apply(ids)
+        db.commit()
+        if len(ids) < batch_size:
+            break
+    return total
+
+
+def mark_abandoned_carts(db: Session, now: datetime, batch_size: int, max_batches: int) -> int:
+    """
+    Guest carts become 'abandoned' when they're empty and older than the empty TTL,
+    or when neither the cart nor any of its items changed within the idle TTL.
+    """
+    empty_cutoff = now - timedelta(hours=settings.cart_empty_ttl_hours)
+    idle_cutoff = now - timedelta(days=settings.cart_idle_ttl_days)
+
+    has_items = exists().where(CartItem.cart_id == Cart.id)
+    recent_items = exists().where(CartItem.cart_id == Cart.id, CartItem.updated_at >= idle_cutoff)
+
+    select_ids = select(Cart.id).where(
+        Cart.user_id.is_(None),
+        Cart.status == ACTIVE,
+        ((~has_items) & (Cart.updated_at < empty_cutoff))
+        | ((Cart.updated_at < idle_cutoff) & ~recent_items),
+    )
+
+    def apply(ids: list[str]) -> int:
+        # updated_at marks when it was abandoned, which starts the purge grace period
+        res = db.execute(
+            update(Cart)
+            .where(Cart.id.in_(ids), Cart.status == ACTIVE)
+            .values(status=ABANDONED, updated_at=now)
+        )
+        return res.rowcount or 0
+
+    return _in_batches(db, select_ids, apply, batch_size, max_batches)
+
+
+def purge_abandoned_carts(db: Session, now: datetime, batch_size: int, max_batches: int) -> tuple[int, int]:
+    """Deletes abandoned carts (and their items) once the grace period has passed."""
+    cutoff = now - timedelta(days=settings.cart_purge_grace_days)
+    select_ids = select(Cart.id).where(Cart.status == ABANDONED, Cart.updated_at < cutoff)
+    items_deleted = 0
+
+    def apply(ids: list[str]) -> int:
+        nonlocal items_deleted
+        res = db.execute(delete(CartItem).where(CartItem.cart_id.in_(ids)))
+        items_deleted += res.rowcount or 0
+        res = db.execute(delete(Cart).where(Cart.id.in_(ids), Cart.status == ABANDONED))
+        return res.rowcount or 0
+
+    carts_deleted = _in_batches(db, select_ids, apply, batch_size, max_batches)
+    return carts_deleted, items_deleted
+
+
+def purge_expired_sessions(db: Session, now: datetime, batch_size: int, max_batches: int) -> int:
+    select_ids = select(UserSession.id).where(UserSession.expires_at < now)
+
+    def apply(ids: list[str]) -> int:
+        res = db.execute(delete(UserSession).where(UserSession.id.in_(ids)))
+        return res.rowcount or 0
+
+    return _in_batches(db, select_ids, apply, batch_size, max_batches)
+
+
+def run_maintenance() -> dict:
+    """One sweep. Each step is bounded by batch_size * max_batches rows."""
+    global LAST_RUN
+    t0 = time.perf_counter()
+    now = datetime.utcnow()
+    batch_size = settings.maintenance_batch_size
+    max_batches = settings.maintenance_max_batches
+
+    with SessionLocal() as db:
+        abandoned = mark_abandoned_carts(db, now, batch_size, max_batches)
+        carts_purged, items_purged = purge_abandoned_carts(db, now, batch_size, max_batches)
+        sessions_deleted = purge_expired_sessions(db, now, batch_size, max_batches)
+
+    report = {
+        "ran_at": now,
+        "carts_abandoned": abandoned,
+        "carts_purged": carts_purged,
+        "cart_items_purged": items_purged,
+        "sessions_deleted": sessions_deleted,
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1),
+    }
+    LAST_RUN = report
+    log.info("maintenance sweep: %s", report)
+    return report
+
+
+async def maintenance_loop() -> None:
+    """Runs run_maintenance() every maintenance_interval_s, off the event loop."""
+    while True:
+        try:
+            await asyncio.to_thread(run_maintenance)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.exception("maintenance sweep failed")
+        await asyncio.sleep(settings.maintenance_interval_s)
@@ -0,0 +1,299 @@
+"""
+In-memory, time-decayed popularity per product and event type.
+
+Counters use forward decay: an event at time t adds w * exp((t - landmark) / tau)
+instead of decaying every counter as time passes. All counters share the same
+decay factor at read time, so relative order only changes when a counter is
+incremented; that's what lets each group keep a small top-k set updated on
+write, and /products/trending read it without scanning the catalog.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import catalog
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.db.models import ProductPopularity
+
+log = logging.getLogger(__name__)
+
+TRACKED = ("view", "add_to_cart", "purchase")
+# contribution of one event of each type to the trending score
+EVENT_WEIGHTS = {"view": 1.0, "add_to_cart": 5.0, "purchase": 20.0}
+ALL_GROUPS = "all"
+# event types counted from POST /v1/events; purchases come from checkouts, which can't be replayed from the client
+TRENDING_TYPES = frozenset({"view", "add_to_cart"})
+
+# rebase the landmark before exp() gets anywhere near float overflow
+_MAX_EXPONENT = 30.0
+
+
+def _group_of(product_id: str) -> str | None:
+    p = catalog.get_product(product_id)
+    if p is None:
+        return None
+    return str(p.get("product_group_name", "")).strip().lower() or None
+
+
+class _TopK:
+    """Highest-scoring k members of one group, with the current minimum cached."""
+
+    __slots__ = ("k", "members", "min_pid", "min_score", "ranked")
+
+    def __init__(self, k: int):
+        self.k = k
+        self.members: dict[str, float] = {}
+        self.min_pid: str | None = None
+        self.min_score = 0.0
+        self.ranked: list[tuple[str, float]] | None = None
+
+    def _refresh_min(self) -> None:
+        self.min_pid, self.min_score = min(self.members.items(), key=lambda kv: kv[1])
+
+    def offer(self, pid: str, score: float) -> None:
+        """Scores only ever grow, so an outsider can only get in on its own increment."""
+        if pid in self.members:
+            self.members[pid] = score
+            if pid == self.min_pid:
+                self._refresh_min()
+        elif len(self.members) < self.k:
+            self.members[pid] = score
+            if self.min_pid is None or score < self.min_score:
+                self.min_pid, self.min_score = pid, score
+        elif score > self.min_score:
+            del self.members[self.min_pid]
+            self.members[pid] = score
+            self._refresh_min()
+        else:
+            return
+        self.ranked = None
+
+    def scale(self, factor: float) -> None:
+        for pid in self.members:
+            self.members[pid] *= factor
+        self.min_score *= factor
+        self.ranked = None
+
+    def top(self) -> list[tuple[str, float]]:
+        if self.ranked is None:
+            self.ranked = sorted(self.members.items(), key=lambda kv: kv[1], reverse=True)
+        return self.ranked
+
+
+class PopularityCounters:
+    def __init__(self, half_life_s: float, top_k: int):
+        self.tau = half_life_s / math.log(2)
+        self.top_k = top_k
+        self._landmark = time.time()
+        self._counts: dict[str, list[float]] = {}  # pid -> per TRACKED type, landmark space
+        self._scores: dict[str, float] = {}        # pid -> weighted sum, landmark space
+        self._top: dict[str, _TopK] = {}
+        self._dirty: set[str] = set()              # changed since the last snapshot
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.last_snapshot: dict | None = None
+
+    def _rebase(self, now: float) -> None:
+        factor = math.exp(-(now - self._landmark) / self.tau)
+        for c in self._counts.values():
+            for i in range(len(c)):
+                c[i] *= factor
+        for pid in self._scores:
+            self._scores[pid] *= factor
+        for top in self._top.values():
+            top.scale(factor)
+        self._landmark = now
+
+    def _bump(self, pid: str, kind: int, amount: float) -> None:
+        c = self._counts.get(pid)
+        if c is None:
+            c = self._counts[pid] = [0.0] * len(TRACKED)
+        c[kind] += amount
+        score = self._scores.get(pid, 0.0) + EVENT_WEIGHTS[TRACKED[kind]] * amount
+        self._scores[pid] = score
+        self._dirty.add(pid)
+
+        for g in (ALL_GROUPS, _group_of(pid)):
+            if g is None:
+                continue
+            top = self._top.get(g)
+            if top is None:
+                top = self._top[g] = _TopK(self.top_k)
+            top.offer(pid, score)
+
+    def record_many(self, events: list[tuple[str, str, float | None, float]]) -> None:
+        """events: (product_id, event_type, epoch ts or None for now, count). Untracked types are ignored."""
+        now = time.time()
+        with self._lock:
+            if (now - self._landmark) / self.tau > _MAX_EXPONENT:
+                self._rebase(now)
+            for pid, event_type, ts, n in events:
+                if event_type not in EVENT_WEIGHTS:
+                    continue
+                t = now if ts is None else min(ts, now)
+                self._bump(pid, TRACKED.index(event_type), n * math.exp((t - self._landmark) / self.tau))
+                self.recorded += 1
+
+    def record(self, product_id: str, event_type: str, ts: float | None = None, n: float = 1.0) -> None:
+        self.record_many([(product_id, event_type, ts, n)])
+
+    def _to_now(self, now: float) -> float:
+        return math.exp((self._landmark - now) / self.tau)
+
+    def trending(self, group: str | None, limit: int) -> list[tuple[str, float]]:
+        """[(product_id, decayed score)] best first; score is in weighted events."""
+        now = time.time()
+        with self._lock:
+            top = self._top.get((group or ALL_GROUPS).strip().lower())
+            if top is None:
+                return []
+            f = self._to_now(now)
+            return [(pid, s * f) for pid, s in top.top()[:limit]]
+
+    def scores(self) -> dict[str, float]:
+        """Decayed trending score of every product with any activity (a copy)."""
+        now = time.time()
+        with self._lock:
+            f = self._to_now(now)
+            return {pid: s * f for pid, s in self._scores.items()}
+
+    def type_counts(self) -> dict[str, tuple[float, ...]]:
+        """Decayed per-type counts (in TRACKED order) of every product with any activity."""
+        now = time.time()
+        with self._lock:
+            f = self._to_now(now)
+            return {pid: tuple(v * f for v in c) for pid, c in self._counts.items()}
+
+    def counts(self, product_id: str) -> dict[str, float]:
+        now = time.time()
+        with self._lock:
+            c = self._counts.get(product_id)
+            f = self._to_now(now)
+            return {t: (c[i] * f if c else 0.0) for i, t in enumerate(TRACKED)}
+
+    # ---- persistence ----
+
+    def snapshot(self, db: Session) -> int:
+        """Upserts counters changed since the last snapshot, decayed to now."""
+        from app.services.cart_service import _dialect_insert
+
+        now = time.time()
+        with self._lock:
+            f = self._to_now(now)
+            rows = [
+                {
+                    "product_id": pid,
+                    "view_score": self._counts[pid][0] * f,
+                    "add_to_cart_score": self._counts[pid][1] * f,
+                    "purchase_score": self._counts[pid][2] * f,
+                    "updated_at": datetime.utcfromtimestamp(now),
+                }
+                for pid in self._dirty
+            ]
+            self._dirty.clear()
+
+        if rows:
+            insert = _dialect_insert(db)
+            stmt = insert(ProductPopularity)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[ProductPopularity.product_id],
+                set_={
+                    "view_score": stmt.excluded.view_score,
+                    "add_to_cart_score": stmt.excluded.add_to_cart_score,
+                    "purchase_score": stmt.excluded.purchase_score,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+            db.execute(stmt, rows)
+            db.commit()
+
+        self.last_snapshot = {"at": datetime.utcfromtimestamp(now), "rows": len(rows)}
+        return len(rows)
+
+    def load(self, db: Session) -> int:
+        """Replaces the in-memory state with the last snapshot, decayed to now."""
+        now = time.time()
+        rows = db.execute(select(ProductPopularity)).scalars().all()
+        with self._lock:
+            self._landmark = now
+            self._counts.clear()
+            self._scores.clear()
+            self._top.clear()
+            self._dirty.clear()
+            for r in rows:
+                age = max(0.0, now - (r.updated_at - datetime(1970, 1, 1)).total_seconds())
+                f = math.exp(-age / self.tau)
+                for kind, v in enumerate((r.view_score, r.add_to_cart_score, r.purchase_score)):
+                    if v:
+                        self._bump(r.product_id, kind, v * f)
+            self._dirty.clear()
+        return len(rows)
+
+    def rebuild_groups(self) -> None:
+        """Re-derives the per-group top sets, e.g. after the catalog (and so group membership) changed."""
+        with self._lock:
+            self._top.clear()
+            for pid, score in self._scores.items():
+                for g in (ALL_GROUPS, _group_of(pid)):
+                    if g is not None:
+                        self._top.setdefault(g, _TopK(self.top_k)).offer(pid, score)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "products": len(self._scores),
+                "groups": len(self._top),
+                "recorded": self.recorded,
+                "dirty": len(self._dirty),
+                "half_life_h": round(self.tau * math.log(2) / 3600, 2),
+                "last_snapshot": self.last_snapshot,
+            }
+
+
+POPULARITY = PopularityCounters(
+    half_life_s=settings.popularity_half_life_hours * 3600,
+    top_k=settings.popularity_top_k,
+)
+
+
+def load_popularity() -> None:
+    try:
+        with SessionLocal() as db:
+            n = POPULARITY.load(db)
+        log.info("popularity: loaded %d products from snapshot", n)
+    except Exception:
+        log.exception("popularity snapshot load failed; starting empty")
+
+
+def snapshot_popularity() -> int:
+    with SessionLocal() as db:
+        return POPULARITY.snapshot(db)
+
+
+def save_popularity() -> None:
+    """Final snapshot on shutdown; a failure only loses what changed since the last one."""
+    try:
+        snapshot_popularity()
+    except Exception:
+        log.exception("popularity snapshot on shutdown failed")
+
+
+async def popularity_loop() -> None:
+    """Snapshots changed counters every popularity_snapshot_interval_s, off the event loop."""
+    while True:
+        await asyncio.sleep(settings.popularity_snapshot_interval_s)
+        try:
+            await asyncio.to_thread(snapshot_popularity)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.exception("popularity snapshot failed")
@@ -0,0 +1,368 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING
+
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.db import get_async_db, get_db
+from app.core.write_queue import run_write
+from app.db.models import User, UserSession
+
+if TYPE_CHECKING or settings.db_async:
+    # the *_async helpers are only used by the DB_ASYNC=1 routers; the sync
+    # deployment must import without greenlet
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+SESSION_COOKIE = "sid"
+SIGNED_PREFIX = "s1."
+
+
+@dataclass(frozen=True)
+class AuthUser:
+    id: str
+    email: str
+    name: str | None
+    expires_at: datetime  # session expiry (UTC)
+
+
+def token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _as_utc(dt: datetime) -> datetime:
+    # SQLite may return naive datetimes; treat as UTC
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+
+class SessionCache:
+    """
+    Bounded LRU of token_hash -> AuthUser with a per-entry TTL.
+
+    The TTL bounds how long another worker's logout can go unnoticed here;
+    logouts and expiries seen by this process are evicted immediately.
+    """
+
+    def __init__(self, max_entries: int, ttl_s: float):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._data: OrderedDict[str, tuple[float, AuthUser]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, th: str) -> AuthUser | None:
+        with self._lock:
+            entry = self._data.get(th)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[th]
+                self.misses += 1
+                return None
+            self._data.move_to_end(th)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, th: str, user: AuthUser) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[th] = (time.monotonic() + self.ttl_s, user)
+            self._data.move_to_end(th)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def invalidate(self, th: str) -> None:
+        with self._lock:
+            self._data.pop(th, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+SESSION_CACHE = SessionCache(
+    max_entries=settings.session_cache_max_entries,
+    ttl_s=settings.session_cache_ttl_s,
+)
+
+
+def _b64e(b: bytes) -> str:
+    return base64.urlsafe_b64encode(b).rstrip(b"=").decode("ascii")
+
+def _b64d(s: str) -> bytes:
+    return base64.urlsafe_b64decode(s + "=" * (-len(s) % 4))
+
+def _sign(body: str) -> bytes:
+    assert settings.session_signing_key
+    return hmac.new(settings.session_signing_key.encode("utf-8"), body.encode("ascii"), hashlib.sha256).digest()
+
+def issue_signed_token(user: User, session_id: str, expires_at: datetime) -> str:
+    """s1.<b64 payload>.<b64 hmac-sha256>; payload carries everything AuthUser needs."""
+    payload = {
+        "uid": user.id,
+        "sid": session_id,
+        "exp": int(_as_utc(expires_at).timestamp()),
+        "email": user.email,
+        "name": user.name,
+    }
+    body = _b64e(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+    return f"{SIGNED_PREFIX}{body}.{_b64e(_sign(body))}"
+
+def verify_signed_token(token: str) -> tuple[str, AuthUser] | None:
+    """Returns (session_id, user) for a well-formed, correctly signed token (expired or not)."""
+    if not settings.session_signing_key or not token.startswith(SIGNED_PREFIX):
+        return None
+    try:
+        body, sig = token[len(SIGNED_PREFIX):].split(".", 1)
+        if not hmac.compare_digest(_b64d(sig), _sign(body)):
+            return None
+        payload = json.loads(_b64d(body))
+        user = AuthUser(
+            id=payload["uid"],
+            email=payload["email"],
+            name=payload.get("name"),
+            expires_at=datetime.fromtimestamp(payload["exp"], tz=timezone.utc),
+        )
+        return payload["sid"], user
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+class RevocationList:
+    """
+    Session ids logged out before expiry, kept until they'd have expired anyway.
+
+    Logouts in this process are added directly; other workers' logouts are
+    picked up by an incremental sync on user_sessions.revoked_at, at most
+    once per `refresh_s`.
+    """
+
+    def __init__(self, refresh_s: float):
+        self.refresh_s = refresh_s
+        self._revoked: dict[str, float] = {}  # session id -> expiry epoch
+        self._lock = threading.Lock()
+        self._next_sync = 0.0
+        self._synced_until: datetime | None = None
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._revoked
+
+    def add(self, session_id: str, expires_at: datetime) -> None:
+        with self._lock:
+            self._revoked[session_id] = _as_utc(expires_at).timestamp()
+
+    def _sync_due(self) -> bool:
+        if time.monotonic() < self._next_sync:
+            return False
+        with self._lock:
+            if time.monotonic() < self._next_sync:
+                return False
+            self._next_sync = time.monotonic() + self.refresh_s
+        return True
+
+    def _sync_stmt(self, now: datetime):
+        stmt = select(UserSession.id, UserSession.expires_at, UserSession.revoked_at).where(
+            UserSession.revoked_at.isnot(None),
+            UserSession.expires_at > now.replace(tzinfo=None),
+        )
+        if self._synced_until is not None:
+            # overlap a little so commits from workers with slightly skewed clocks aren't missed
+            stmt = stmt.where(UserSession.revoked_at >= self._synced_until - timedelta(minutes=1))
+        return stmt
+
+    def _apply_sync(self, rows, now: datetime) -> None:
+        with self._lock:
+            for sid, exp, revoked_at in rows:
+                self._revoked[sid] = _as_utc(exp).timestamp()
+                if self._synced_until is None or revoked_at > self._synced_until:
+                    self._synced_until = revoked_at
+            cutoff = now.timestamp()
+            for sid in [sid for sid, exp in self._revoked.items() if exp < cutoff]:
+                del self._revoked[sid]
+
+    def maybe_sync(self, db: Session) -> None:
+        if self._sync_due():
+            now = datetime.now(timezone.utc)
+            self._apply_sync(db.execute(self._sync_stmt(now)).all(), now)
+
+    async def maybe_sync_async(self, db: AsyncSession) -> None:
+        if self._sync_due():
+            now = datetime.now(timezone.utc)
+            self._apply_sync((await db.execute(self._sync_stmt(now))).all(), now)
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+
+REVOKED_SESSIONS = RevocationList(refresh_s=settings.session_revocation_refresh_s)
+
+
+def remember_session(token: str, user: User, expires_at: datetime) -> None:
+    """Prime the cache right after login/register so the next request is query-free."""
+    if token.startswith(SIGNED_PREFIX):
+        return  # verified without the DB; nothing to cache
+    SESSION_CACHE.put(
+        token_hash(token),
+        AuthUser(id=user.id, email=user.email, name=user.name, expires_at=_as_utc(expires_at)),
+    )
+
+
+def _session_lookup_stmt(th: str):
+    return (
+        select(UserSession.expires_at, User.id, User.email, User.name)
+        .join(User, User.id == UserSession.user_id)
+        .where(UserSession.token_hash == th)
+    )
+
+
+def _delete_session_stmt(th: str):
+    return delete(UserSession).where(UserSession.token_hash == th)
+
+
+def _revoke_session_stmt(session_id: str):
+    return update(UserSession).where(UserSession.id == session_id).values(revoked_at=datetime.utcnow())
+
+
+def _signed_user(token: str, now: datetime) -> tuple[str, AuthUser] | None:
+    verified = verify_signed_token(token)
+    if verified is None or verified[1].expires_at < now:
+        return None
+    return verified
+
+
+def _user_from_row(th: str, row, now: datetime) -> AuthUser:
+    exp, uid, email, name = row
+    user = AuthUser(id=uid, email=email, name=name, expires_at=_as_utc(exp))
+    if user.expires_at >= now:
+        SESSION_CACHE.put(th, user)
+    return user
+
+
+def resolve_user(req: Request, db: Session) -> AuthUser | None:
+    token = req.cookies.get(SESSION_COOKIE)
+    if not token:
+        return None
+
+    now = datetime.now(timezone.utc)
+
+    if token.startswith(SIGNED_PREFIX):
+        verified = _signed_user(token, now)
+        if verified is None:
+            return None
+        session_id, user = verified
+        REVOKED_SESSIONS.maybe_sync(db)
+        return None if session_id in REVOKED_SESSIONS else user
+
+    th = token_hash(token)
+    user = SESSION_CACHE.get(th)
+    if user is None:
+        row = db.execute(_session_lookup_stmt(th)).first()
+        if not row:
+            return None
+        user = _user_from_row(th, row, now)
+
+    if user.expires_at < now:
+        SESSION_CACHE.invalidate(th)
+        run_write(db, lambda w: w.execute(_delete_session_stmt(th)))
+        return None
+
+    return user
+
+
+async def resolve_user_async(req: Request, db: AsyncSession) -> AuthUser | None:
+    """resolve_user() on an AsyncSession."""
+    token = req.cookies.get(SESSION_COOKIE)
+    if not token:
+        return None
+
+    now = datetime.now(timezone.utc)
+
+    if token.startswith(SIGNED_PREFIX):
+        verified = _signed_user(token, now)
+        if verified is None:
+            return None
+        session_id, user = verified
+        await REVOKED_SESSIONS.maybe_sync_async(db)
+        return None if session_id in REVOKED_SESSIONS else user
+
+    th = token_hash(token)
+    user = SESSION_CACHE.get(th)
+    if user is None:
+        row = (await db.execute(_session_lookup_stmt(th))).first()
+        if not row:
+            return None
+        user = _user_from_row(th, row, now)
+
+    if user.expires_at < now:
+        SESSION_CACHE.invalidate(th)
+        await db.execute(_delete_session_stmt(th))
+        await db.commit()
+        return None
+
+    return user
+
+
+def get_current_user(req: Request, db: Session = Depends(get_db)) -> AuthUser | None:
+    """Request-scoped: resolves the sid cookie at most once per request."""
+    if not hasattr(req.state, "auth_user"):
+        req.state.auth_user = resolve_user(req, db)
+    return req.state.auth_user
+
+
+def require_user(user: AuthUser | None = Depends(get_current_user)) -> AuthUser:
+    if user is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return user
+
+
+async def get_current_user_async(req: Request, db: AsyncSession = Depends(get_async_db)) -> AuthUser | None:
+    if not hasattr(req.state, "auth_user"):
+        req.state.auth_user = await resolve_user_async(req, db)
+    return req.state.auth_user
+
+
+def require_user_async(user: AuthUser | None = Depends(get_current_user_async)) -> AuthUser:
+    if user is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return user
+
+
+def forget_session(token: str, db: Session) -> None:
+    verified = verify_signed_token(token)
+    if verified is not None:
+        # keep the row for audit; revoke it here and (via sync) on other workers
+        session_id, user = verified
+        run_write(db, lambda w: w.execute(_revoke_session_stmt(session_id)))
+        REVOKED_SESSIONS.add(session_id, user.expires_at)
+        return
+
+    th = token_hash(token)
+    SESSION_CACHE.invalidate(th)
+    run_write(db, lambda w: w.execute(_delete_session_stmt(th)))
+
+
+async def forget_session_async(token: str, db: AsyncSession) -> None:
+    verified = verify_signed_token(token)
+    if verified is not None:
+        session_id, user = verified
+        await db.execute(_revoke_session_stmt(session_id))
+        await db.commit()
+        REVOKED_SESSIONS.add(session_id, user.expires_at)
+        return
+
+    th = token_hash(token)
+    SESSION_CACHE.invalidate(th)
+    await db.execute(_delete_session_stmt(th))
+    await db.commit()
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import heapq
+import json
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from app.lexical import tokenize
+
+# catalog field -> suggestion kind
+CATALOG_FIELDS: dict[str, str] = {
+    "name": "product",
+    "product_type_name": "type",
+    "product_group_name": "group",
+    "colour_group_name": "color",  # weights for the vocab colour terms
+}
+
+# vocab.json list -> suggestion kind
+VOCAB_FIELDS: dict[str, str] = {
+    "product_type_name": "type",
+    "product_group_name": "group",
+    "colour_group_name": "color",
+    "perceived_colour_master_name": "color",
+}
+
+MAX_LIMIT = 20
+# Prefixes this short match a large slice of the index, so their answers are precomputed
+HEAD_PREFIX_LEN = 2
+
+def vocab_path() -> Path:
+    here = Path(__file__).resolve()
+    backend_root = here.parents[1]  # backend/
+    project_root = backend_root if (backend_root / "data").exists() else backend_root.parent
+    return project_root / "data" / "semantic" / "vocab.json"
+
+def load_vocab() -> dict:
+    path = vocab_path()
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+class SuggestIndex:
+    """
+    Typeahead over product names, types, groups and vocab terms.
+
+    Every word-boundary suffix of each phrase is a key in one sorted list, so
+    "jea" finds "Slim jeans" with a single bisect. Entries are ranked by a
+    popularity weight (how many catalog items carry the phrase).
+    """
+
+    def __init__(
+        self,
+        keys: list[str],
+        entry_ids: np.ndarray,
+        entries: list[tuple[str, str, int]],
+        head: dict[str, list[int]],
+    ):
+        self._keys = keys
+        self._entry_ids = entry_ids
+        self._entries = entries
+        self._head = head
+
+    @classmethod
+    def build(cls, products: list[dict], vocab: dict | None = None) -> "SuggestIndex":
+        weights: Counter = Counter()
+        for p in products:
+            for field, kind in CATALOG_FIELDS.items():
+                v = str(p.get(field) or "").strip()
+                if v:
+                    weights[(v, kind)] += 1
+        for field, kind in VOCAB_FIELDS.items():
+            for v in (vocab or {}).get(field, []):
+                v = str(v).strip()
+                if v and (v, kind) not in weights:
+                    weights[(v, kind)] = 1
+
+        entries = [(text, kind, w) for (text, kind), w in weights.items()]
+
+        pairs: list[tuple[str, int]] = []
+        for eid, (text, _, _) in enumerate(entries):
+            words = tokenize(text)
+            for i in range(len(words)):
+                pairs.append((" ".join(words[i:]), eid))
+        pairs.sort()
+
+        keys = [k for k, _ in pairs]
+        entry_ids = np.fromiter((e for _, e in pairs), dtype=np.int32, count=len(pairs))
+        index = cls(keys, entry_ids, entries, {})
+
+        head: dict[str, list[int]] = {}
+        for prefix in {k[:n] for k in keys for n in range(1, HEAD_PREFIX_LEN + 1)}:
+            head[prefix] = index._rank(prefix, MAX_LIMIT)
+        index._head = head
+        return index
+
+    def _rank(self, prefix: str, limit: int) -> list[int]:
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_left(self._keys, prefix + "\uffff", lo)
+        candidates = set(self._entry_ids[lo:hi].tolist())
+        return heapq.nsmallest(
+            limit,
+            candidates,
+            key=lambda eid: (-self._entries[eid][2], len(self._entries[eid][0]), self._entries[eid][0]),
+        )
+
+    def lookup(self, q: str, limit: int = 8) -> list[dict]:
+        prefix = " ".join(tokenize(q))
+        if not prefix:
+            return []
+
+        limit = min(limit, MAX_LIMIT)
+        ids = self._head.get(prefix) if len(prefix) <= HEAD_PREFIX_LEN else None
+        if ids is None:
+            ids = self._rank(prefix, limit)
+
+        out = []
+        for eid in ids[:limit]:
+            text, kind, weight = self._entries[eid]
+            out.append({"text": text, "kind": kind, "weight": weight})
+        return out
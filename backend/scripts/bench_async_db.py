@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark: sync sessions on a threadpool vs AsyncSession.
+
+The sync side mirrors how FastAPI runs `def` endpoints: each request's
+cart_service call runs on a worker thread from a limiter of --threads
+(Starlette's default is 40). The async side awaits cart_service_async
+directly on the event loop. Both use the same pool size.
+
+    python -m scripts.bench_async_db --requests 2000 --concurrency 50 200
+    python -m scripts.bench_async_db --op add
+    python -m scripts.bench_async_db --url postgresql+psycopg://...   # network waits are where async pays off
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import anyio
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.core.db  # noqa: F401  # registers the SQLite pragmas listener
+from app import catalog
+from app.core.db import Base, async_database_url
+from app.db.models import Cart, CartItem, Product
+from app.services import cart_service, cart_service_async
+
+PRODUCT_IDS = [f"{i:010d}" for i in range(1, 21)]
+PRICE_CENTS = 1999
+
+
+def sync_op(SessionLocal, op: str, cart_id: str, n: int):
+    with SessionLocal() as db:
+        if op == "read":
+            cart = cart_service.find_active_cart(db, user_id=None, cart_id=cart_id)
+            return cart_service.cart_summary(db, cart)
+        cart = cart_service.add_item(db, cart_id, PRODUCT_IDS[n % len(PRODUCT_IDS)], 1)
+        return cart_service.cart_summary(db, cart)
+
+
+async def async_op(AsyncSessionLocal, op: str, cart_id: str, n: int):
+    async with AsyncSessionLocal() as db:
+        if op == "read":
+            cart = await cart_service_async.find_active_cart(db, user_id=None, cart_id=cart_id)
+            return await cart_service_async.cart_summary(db, cart)
+        cart = await cart_service_async.add_item(db, cart_id, PRODUCT_IDS[n % len(PRODUCT_IDS)], 1)
+        return await cart_service_async.cart_summary(db, cart)
+
+
+async def drive(call, cart_ids: list[str], requests: int, concurrency: int) -> tuple[float, list[float], int]:
+    sem = asyncio.Semaphore(concurrency)
+    lat: list[float] = []
+    errors = 0
+
+    async def one(n: int):
+        nonlocal errors
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                await call(cart_ids[n % len(cart_ids)], n)
+            except Exception:
+                errors += 1
+                return
+            lat.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(requests)))
+    return time.perf_counter() - t0, lat, errors
+
+
+async def amain(args):
+    tmp = None
+    url = args.url
+    if not url:
+        tmp = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{Path(tmp.name) / 'bench_async.db'}"
+
+    sqlite = url.startswith("sqlite")
+    connect_args = {"check_same_thread": False} if sqlite else {}
+    engine = create_engine(url, connect_args=connect_args, pool_size=args.pool, max_overflow=0)
+    aengine = create_async_engine(async_database_url(url), pool_size=args.pool, max_overflow=0)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    AsyncSessionLocal = async_sessionmaker(aengine, autoflush=False, expire_on_commit=False)
+
+    with SessionLocal() as db:
+        for pid in PRODUCT_IDS:
+            if not db.get(Product, pid):
+                db.add(Product(id=pid, name="Bench tee", price_cents=PRICE_CENTS, price=PRICE_CENTS / 100))
+        carts = [Cart(user_id=None, status="active") for _ in range(args.carts)]
+        db.add_all(carts)
+        db.flush()
+        db.add_all(
+            CartItem(cart_id=c.id, product_id=pid, quantity=1, unit_price_cents=PRICE_CENTS)
+            for c in carts
+            for pid in PRODUCT_IDS[:3]
+        )
+        db.commit()
+        cart_ids = [c.id for c in carts]
+    products = [{"id": pid, "price_cents": PRICE_CENTS} for pid in PRODUCT_IDS]
+    catalog.publish(products, {p["id"]: p for p in products})
+
+    limiter = anyio.CapacityLimiter(args.threads)
+
+    async def sync_call(cart_id, n):
+        await anyio.to_thread.run_sync(sync_op, SessionLocal, args.op, cart_id, n, limiter=limiter)
+
+    async def async_call(cart_id, n):
+        await async_op(AsyncSessionLocal, args.op, cart_id, n)
+
+    print(
+        f"{url.split('://')[0]}: op={args.op}, {args.requests} requests, "
+        f"pool={args.pool}, sync threads={args.threads}"
+    )
+    print(f"{'path':<6} {'conc':>5} {'seconds':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for conc in args.concurrency:
+        for name, call in (("sync", sync_call), ("async", async_call)):
+            await drive(call, cart_ids, min(args.requests, 100), conc)  # warm pools
+            elapsed, lat, errors = await drive(call, cart_ids, args.requests, conc)
+            lat.sort()
+            p99 = lat[int(len(lat) * 0.99) - 1] if lat else float("nan")
+            p50 = statistics.median(lat) if lat else float("nan")
+            print(f"{name:<6} {conc:>5} {elapsed:>8.2f} {len(lat) / elapsed:>8.0f} {p50:>8.2f} {p99:>8.2f} {errors:>7}")
+
+    await aengine.dispose()
+    engine.dispose()
+    if tmp:
+        tmp.cleanup()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", default=None, help="sync database URL (default: a throwaway SQLite file)")
+    ap.add_argument("--op", choices=["read", "add"], default="read")
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    ap.add_argument("--threads", type=int, default=40, help="sync worker threads (Starlette default: 40)")
+    ap.add_argument("--pool", type=int, default=20, help="connection pool size for both engines")
+    ap.add_argument("--carts", type=int, default=200)
+    asyncio.run(amain(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark for add-to-cart.
+
+Many threads add the same product to the same cart at once. Compares the
+single-statement upsert in cart_service.add_item with the previous
+select-then-update path, and checks that the final quantity equals the
+number of adds (no lost updates).
+
+    python -m scripts.bench_cart_add --threads 8 --adds 200
+    python -m scripts.bench_cart_add --url postgresql+psycopg://...
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import Session, sessionmaker
+
+import app.core.db  # noqa: F401  # registers the SQLite pragmas listener
+from app import catalog
+from app.core.db import Base
+from app.db.models import Cart, CartItem, Product
+from app.services.cart_service import ACTIVE, add_item, get_cart_with_items
+
+PRODUCT_ID = "0000000001"
+PRICE_CENTS = 1999
+
+
+def legacy_add_item(db: Session, cart_id: str, product_id: str, quantity: int = 1) -> Cart:
+    """The pre-upsert path: select cart, product and item, then update or insert."""
+    cart = db.query(Cart).filter(Cart.id == cart_id, Cart.status == ACTIVE).one()
+    product = db.query(Product).filter(Product.id == product_id).one()
+    item = (
+        db.query(CartItem)
+        .filter(CartItem.cart_id == cart.id, CartItem.product_id == product.id)
+        .one_or_none()
+    )
+    if item:
+        item.quantity += quantity
+        item.updated_at = datetime.utcnow()
+    else:
+        db.add(CartItem(cart_id=cart_id, product_id=product_id, quantity=quantity, unit_price_cents=product.price_cents))
+    db.commit()
+    return get_cart_with_items(db, cart_id)
+
+
+def run(SessionLocal, fn, cart_id: str, threads: int, adds: int) -> tuple[float, int]:
+    errors = 0
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker():
+        nonlocal errors
+        barrier.wait()
+        for _ in range(adds):
+            with SessionLocal() as db:
+                try:
+                    fn(db, cart_id, PRODUCT_ID, 1)
+                except Exception:
+                    db.rollback()
+                    with lock:
+                        errors += 1
+
+    ts = [threading.Thread(target=worker) for _ in range(threads)]
+    t0 = time.perf_counter()
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    return time.perf_counter() - t0, errors
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", default=None, help="database URL (default: a throwaway SQLite file)")
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--adds", type=int, default=200, help="adds per thread")
+    args = ap.parse_args()
+
+    tmp = None
+    url = args.url
+    if not url:
+        tmp = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{Path(tmp.name) / 'bench_cart.db'}"
+
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    with SessionLocal() as db:
+        if not db.get(Product, PRODUCT_ID):
+            db.add(Product(id=PRODUCT_ID, name="Bench tee", price_cents=PRICE_CENTS, price=PRICE_CENTS / 100))
+            db.commit()
+    catalog.publish(
+        [{"id": PRODUCT_ID, "price_cents": PRICE_CENTS}],
+        {PRODUCT_ID: {"id": PRODUCT_ID, "price_cents": PRICE_CENTS}},
+    )
+
+    expected = args.threads * args.adds
+    print(f"{url.split('://')[0]}: {args.threads} threads x {args.adds} adds to one cart line")
+    print(f"{'path':<8} {'seconds':>8} {'adds/s':>9} {'errors':>7} {'quantity':>9} {'expected':>9}")
+
+    for name, fn in (("legacy", legacy_add_item), ("upsert", add_item)):
+        with SessionLocal() as db:
+            cart = Cart(user_id=None, status=ACTIVE)
+            db.add(cart)
+            db.commit()
+            cart_id = cart.id
+
+        elapsed, errors = run(SessionLocal, fn, cart_id, args.threads, args.adds)
+
+        with SessionLocal() as db:
+            cart = get_cart_with_items(db, cart_id)
+            qty = sum(i.quantity for i in cart.items)
+            db.execute(delete(CartItem).where(CartItem.cart_id == cart_id))
+            db.commit()
+
+        print(f"{name:<8} {elapsed:>8.2f} {expected / elapsed:>9.0f} {errors:>7} {qty:>9} {expected:>9}")
+
+    engine.dispose()
+    if tmp:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
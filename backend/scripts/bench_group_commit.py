@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Load test for the group-commit write queue (app.core.write_queue).
+
+Each thread owns a cart and adds items to it in a loop, like many shoppers
+at once. Runs the same load with one commit per request and through the
+single-writer queue, then reports throughput, p50/p99 latency, busy errors
+and whether every add landed.
+
+    python -m scripts.bench_group_commit --threads 16 --adds 200
+    python -m scripts.bench_group_commit --window-ms 1 --synchronous FULL
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.orm import sessionmaker
+
+import app.core.db  # noqa: F401  # registers the SQLite pragmas listener
+from app import catalog
+from app.core import write_queue
+from app.core.db import Base
+from app.db.models import Cart, CartItem, Product
+from app.services.cart_service import ACTIVE, add_item
+
+PRODUCT_IDS = [f"{i:010d}" for i in range(1, 51)]
+PRICE_CENTS = 1999
+
+
+def run(SessionLocal, threads: int, adds: int) -> tuple[float, list[float], int, list[str]]:
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    with SessionLocal() as db:
+        carts = [Cart(user_id=None, status=ACTIVE) for _ in range(threads)]
+        db.add_all(carts)
+        db.commit()
+        cart_ids = [c.id for c in carts]
+
+    def worker(cart_id: str):
+        nonlocal errors
+        mine = []
+        barrier.wait()
+        for n in range(adds):
+            pid = PRODUCT_IDS[n % len(PRODUCT_IDS)]
+            with SessionLocal() as db:
+                t0 = time.perf_counter()
+                try:
+                    add_item(db, cart_id, pid, 1)
+                except Exception:
+                    db.rollback()
+                    with lock:
+                        errors += 1
+                    continue
+                mine.append((time.perf_counter() - t0) * 1000)
+        with lock:
+            latencies.extend(mine)
+
+    ts = [threading.Thread(target=worker, args=(cid,)) for cid in cart_ids]
+    t0 = time.perf_counter()
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    return time.perf_counter() - t0, latencies, errors, cart_ids
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--threads", type=int, default=16)
+    ap.add_argument("--adds", type=int, default=200, help="adds per thread")
+    ap.add_argument("--window-ms", type=float, default=0.0, help="extra time the writer waits to grow a batch")
+    ap.add_argument("--max-batch", type=int, default=64)
+    ap.add_argument("--synchronous", default="NORMAL", choices=["OFF", "NORMAL", "FULL"],
+                    help="SQLite synchronous pragma (FULL fsyncs every commit)")
+    args = ap.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    url = f"sqlite:///{Path(tmp.name) / 'bench_group_commit.db'}"
+    engine = create_engine(url, connect_args={"check_same_thread": False}, pool_size=args.threads + 2)
+
+    @event.listens_for(engine, "connect")
+    def _sync(dbapi_connection, _):
+        dbapi_connection.execute(f"PRAGMA synchronous={args.synchronous}")
+
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    with SessionLocal() as db:
+        db.add_all(Product(id=pid, name="Bench tee", price_cents=PRICE_CENTS, price=PRICE_CENTS / 100) for pid in PRODUCT_IDS)
+        db.commit()
+    products = [{"id": pid, "price_cents": PRICE_CENTS} for pid in PRODUCT_IDS]
+    catalog.publish(products, {p["id"]: p for p in products})
+
+    expected = args.threads * args.adds
+    print(f"sqlite (synchronous={args.synchronous}): {args.threads} threads x {args.adds} adds")
+    print(f"{'mode':<14} {'seconds':>8} {'adds/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'stored':>7} {'batch':>6}")
+
+    for mode in ("per-request", "group-commit"):
+        q = None
+        if mode == "group-commit":
+            q = write_queue.start_write_queue(SessionLocal, window_ms=args.window_ms, max_batch=args.max_batch)
+
+        elapsed, lat, errors, cart_ids = run(SessionLocal, args.threads, args.adds)
+        avg_batch = q.stats()["avg_batch"] if q else 1.0
+        write_queue.stop_write_queue()
+
+        with SessionLocal() as db:
+            stored = db.scalar(select(func.sum(CartItem.quantity)).where(CartItem.cart_id.in_(cart_ids))) or 0
+
+        lat.sort()
+        p99 = lat[int(len(lat) * 0.99) - 1] if lat else float("nan")
+        p50 = statistics.median(lat) if lat else float("nan")
+        print(
+            f"{mode:<14} {elapsed:>8.2f} {len(lat) / elapsed:>8.0f} {p50:>8.2f} {p99:>8.2f} "
+            f"{errors:>7} {stored:>7} {avg_batch:>6.1f}"
+        )
+        if stored != expected - errors:
+            print(f"  !! expected {expected - errors} stored adds")
+
+    engine.dispose()
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
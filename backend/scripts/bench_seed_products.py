@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark for scripts.seed_products: batched upserts vs --bulk on SQLite.
+
+Writes a synthetic articles CSV shaped like the H&M one (105,542 rows by
+default, the size of the full article set) and loads it into fresh databases
+with each mode, then loads it again on top (every row conflicts and updates).
+
+    python -m scripts.bench_seed_products
+    python -m scripts.bench_seed_products --rows 20000 --synchronous FULL
+    python -m scripts.bench_seed_products --csv data/catalog_trimmed_priced.csv
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import csv
+import io
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.orm import sessionmaker
+
+import app.core.db  # noqa: F401  # registers the SQLite pragmas listener
+from app.core.db import Base
+from app.db.models import Product
+from scripts.seed_products import iter_rows, seed_batched, seed_bulk
+
+FULL_ARTICLE_COUNT = 105_542
+
+COLUMNS = [
+    "article_id", "product_code", "prod_name", "product_type_no", "product_type_name",
+    "product_group_name", "graphical_appearance_no", "graphical_appearance_name",
+    "colour_group_code", "colour_group_name", "perceived_colour_value_id",
+    "perceived_colour_value_name", "perceived_colour_master_id", "perceived_colour_master_name",
+    "department_no", "department_name", "index_code", "index_name", "index_group_no",
+    "index_group_name", "section_no", "section_name", "garment_group_no", "garment_group_name",
+    "detail_desc", "price_cents", "currency",
+]
+GROUPS = ["Garment Upper body", "Garment Lower body", "Accessories", "Underwear", "Shoes", "Swimwear"]
+COLOURS = ["Black", "White", "Dark Blue", "Light Pink", "Grey", "Beige", "Red", "Green"]
+INDEXES = [("A", "Ladieswear", 1), ("B", "Lingeries/Tights", 1), ("F", "Menswear", 3), ("D", "Divided", 2)]
+
+
+def write_csv(path: Path, rows: int, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    with path.open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(COLUMNS)
+        for i in range(rows):
+            code = 108775 + i // 3
+            colour = rng.randrange(len(COLOURS))
+            idx_code, idx_name, idx_group = rng.choice(INDEXES)
+            group = rng.choice(GROUPS)
+            w.writerow([
+                f"{code:07d}{i % 3 + 1:03d}", code, f"Article {code} {COLOURS[colour]}",
+                253 + i % 40, f"Type {i % 40}", group, 1010016, "Solid",
+                9 + colour, COLOURS[colour], 4, "Dark", 5, COLOURS[colour],
+                1676 + i % 50, f"Department {i % 50}", idx_code, idx_name, idx_group,
+                "Ladieswear" if idx_group == 1 else idx_name, 16 + i % 30, f"Section {i % 30}",
+                1002 + i % 20, f"Garment group {i % 20}",
+                "Jersey top with narrow shoulder straps. " * rng.randint(1, 4),
+                rng.randint(499, 9999), "USD",
+            ])
+
+
+def load(csv_path: Path, db_path: Path, bulk: bool, synchronous: str) -> tuple[float, int]:
+    engine = create_engine(f"sqlite:///{db_path}")
+
+    @event.listens_for(engine, "connect")
+    def _sync(dbapi_connection, _):
+        dbapi_connection.execute(f"PRAGMA synchronous={synchronous}")
+
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    t0 = time.perf_counter()
+    with SessionLocal() as db, contextlib.redirect_stdout(io.StringIO()):
+        if bulk:
+            seed_bulk(db, iter_rows(csv_path))
+        else:
+            seed_batched(db, iter_rows(csv_path))
+    elapsed = time.perf_counter() - t0
+
+    with SessionLocal() as db:
+        stored = db.scalar(select(func.count()).select_from(Product))
+    engine.dispose()
+    return elapsed, stored
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=FULL_ARTICLE_COUNT)
+    ap.add_argument("--csv", type=Path, default=None, help="use this CSV instead of a synthetic one")
+    ap.add_argument("--synchronous", default="NORMAL", choices=["OFF", "NORMAL", "FULL"],
+                    help="SQLite synchronous pragma (FULL fsyncs every commit)")
+    args = ap.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    csv_path = args.csv
+    if csv_path is None:
+        csv_path = Path(tmp.name) / "articles.csv"
+        write_csv(csv_path, args.rows)
+
+    print(f"sqlite (synchronous={args.synchronous}), {csv_path.name}")
+    print(f"{'mode':<8} {'run':<7} {'seconds':>8} {'rows/s':>9} {'stored':>8}")
+    for mode in ("batched", "bulk"):
+        db_path = Path(tmp.name) / f"{mode}.db"
+        for run in ("insert", "update"):
+            elapsed, stored = load(csv_path, db_path, mode == "bulk", args.synchronous)
+            print(f"{mode:<8} {run:<7} {elapsed:>8.2f} {stored / elapsed:>9,.0f} {stored:>8}")
+
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark ONNX query-encoder variants against the fp32 FAISS index.
+
+For each variant reports single-query encode latency (p50/p95), batched
+throughput, and recall@k of the variant's FAISS hits against fp32 hits on a
+fixed query set.
+
+    python -m scripts.bench_semantic_onnx \\
+        --variant onnx/model_qint8_avx512_vnni.onnx --variant onnx/model_O3.onnx \\
+        --intra-op-threads 2
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+import faiss
+
+from app.search import _paths, load_embedding_model
+
+QUERIES = [
+    "black jeans",
+    "slim fit trousers",
+    "white t-shirt",
+    "red dress",
+    "summer dress with flowers",
+    "warm winter jacket",
+    "denim shorts",
+    "striped shirt",
+    "knitted sweater",
+    "hoodie with print",
+    "sports bra",
+    "swimsuit",
+    "bikini top",
+    "pyjamas",
+    "socks 5-pack",
+    "tights",
+    "leather belt",
+    "handbag",
+    "sneakers",
+    "ankle boots",
+    "sandals",
+    "beanie",
+    "sunglasses",
+    "earrings",
+    "blazer",
+    "cardigan",
+    "skirt",
+    "leggings",
+    "baby bodysuit",
+    "kids rain jacket",
+    "blue chinos",
+    "oversized sweatshirt",
+]
+
+def encode(model, texts: list[str]) -> np.ndarray:
+    return model.encode(texts, normalize_embeddings=True).astype("float32")
+
+def bench_variant(model, index, queries: list[str], k: int, repeat: int, batch_size: int) -> dict:
+    # warm-up (first call builds the ORT session graph)
+    encode(model, queries[:2])
+
+    lat_ms = []
+    for _ in range(repeat):
+        for q in queries:
+            t0 = time.perf_counter()
+            encode(model, [q])
+            lat_ms.append((time.perf_counter() - t0) * 1000)
+
+    batch = (queries * ((batch_size // len(queries)) + 1))[:batch_size]
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        encode(model, batch)
+    qps = (batch_size * repeat) / (time.perf_counter() - t0)
+
+    _, ids = index.search(encode(model, queries), k)
+    return {
+        "p50_ms": statistics.median(lat_ms),
+        "p95_ms": float(np.percentile(lat_ms, 95)),
+        "qps": qps,
+        "ids": ids,
+    }
+
+def recall_at_k(ref: np.ndarray, got: np.ndarray) -> float:
+    k = ref.shape[1]
+    hits = [len(set(r.tolist()) & set(g.tolist())) / k for r, g in zip(ref, got)]
+    return float(np.mean(hits))
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--variant", action="append", default=[], help="onnx file_name inside the model repo (repeatable)")
+    ap.add_argument("--k", type=int, default=24)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--batch-size", type=int, default=64)
+    ap.add_argument("--intra-op-threads", type=int, default=None)
+    ap.add_argument("--inter-op-threads", type=int, default=None)
+    args = ap.parse_args()
+
+    index_path, _, _ = _paths()
+    if not index_path.exists():
+        raise SystemExit(f"FAISS index not found: {index_path} (run scripts.build_semantic_index first)")
+    index = faiss.read_index(str(index_path))
+
+    threads = dict(intra_op_threads=args.intra_op_threads, inter_op_threads=args.inter_op_threads)
+    rows = []
+    ref_ids = None
+    for variant in [None, *args.variant]:
+        model = load_embedding_model(onnx_file=variant, **threads)
+        r = bench_variant(model, index, QUERIES, args.k, args.repeat, args.batch_size)
+        if ref_ids is None:
+            ref_ids = r["ids"]
+        rows.append((variant or "onnx/model.onnx (fp32)", r, recall_at_k(ref_ids, r["ids"])))
+
+    print(f"{len(QUERIES)} queries, k={args.k}, repeat={args.repeat}, batch={args.batch_size}, "
+          f"threads intra={args.intra_op_threads or 'default'} inter={args.inter_op_threads or 'default'}")
+    print(f"{'variant':<42} {'p50 ms':>8} {'p95 ms':>8} {'batch q/s':>10} {'recall@k':>9}")
+    for name, r, rec in rows:
+        print(f"{name:<42} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['qps']:>10.1f} {rec:>9.3f}")
+
+if __name__ == "__main__":
+    main()
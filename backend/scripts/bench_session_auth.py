@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Per-request auth overhead for the sid cookie, in each session mode:
+
+  db (no cache)   UserSession+User lookup on every request
+  db (cached)     in-process SessionCache hit
+  signed          HMAC verify + revocation-set check, no DB
+
+    python -m scripts.bench_session_auth --requests 5000
+    python -m scripts.bench_session_auth --url postgresql+psycopg://...
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+import app.core.db  # noqa: F401  # registers the SQLite pragmas listener
+from app.auth import _expires_at, _new_token
+from app.core.config import settings
+from app.core.db import Base
+from app.db.models import User, UserSession
+from app.services import session_service
+from app.services.session_service import (
+    SESSION_COOKIE,
+    issue_signed_token,
+    resolve_user,
+    token_hash,
+)
+
+
+def make_request(token: str) -> Request:
+    cookie = f"{SESSION_COOKIE}={token}".encode("latin-1")
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [(b"cookie", cookie)]})
+
+
+def time_resolve(SessionLocal, token: str, n: int) -> list[float]:
+    out = []
+    with SessionLocal() as db:
+        for _ in range(n):
+            req = make_request(token)
+            t0 = time.perf_counter()
+            user = resolve_user(req, db)
+            out.append((time.perf_counter() - t0) * 1e6)
+            assert user is not None
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", default=None, help="database URL (default: a throwaway SQLite file)")
+    ap.add_argument("--requests", type=int, default=5000)
+    ap.add_argument("--sessions", type=int, default=10000, help="rows in user_sessions")
+    args = ap.parse_args()
+
+    tmp = None
+    url = args.url
+    if not url:
+        tmp = tempfile.TemporaryDirectory()
+        url = f"sqlite:///{Path(tmp.name) / 'bench_auth.db'}"
+
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    if not settings.session_signing_key:
+        settings.session_signing_key = "bench-only-signing-key"
+
+    with SessionLocal() as db:
+        user = User(email=f"bench-{time.time_ns()}@example.com", name="Bench", password_hash="x")
+        db.add(user)
+        db.flush()
+        # realistic table size for the token_hash index
+        db.add_all(
+            UserSession(user_id=user.id, token_hash=token_hash(_new_token()), expires_at=_expires_at())
+            for _ in range(args.sessions)
+        )
+        opaque = _new_token()
+        db.add(UserSession(user_id=user.id, token_hash=token_hash(opaque), expires_at=_expires_at()))
+        signed_sess = UserSession(user_id=user.id, token_hash="", expires_at=_expires_at())
+        db.add(signed_sess)
+        db.flush()
+        signed = issue_signed_token(user, signed_sess.id, signed_sess.expires_at)
+        signed_sess.token_hash = token_hash(signed)
+        db.commit()
+
+    cache = session_service.SESSION_CACHE
+    rows = []
+
+    cache.max_entries = 0
+    rows.append(("db (no cache)", time_resolve(SessionLocal, opaque, args.requests)))
+
+    cache.max_entries = 10000
+    time_resolve(SessionLocal, opaque, 1)  # warm
+    rows.append(("db (cached)", time_resolve(SessionLocal, opaque, args.requests)))
+
+    time_resolve(SessionLocal, signed, 1)  # first call syncs the revocation list
+    rows.append(("signed", time_resolve(SessionLocal, signed, args.requests)))
+
+    print(f"{url.split('://')[0]}: {args.requests} requests, {args.sessions} session rows")
+    print(f"{'mode':<14} {'mean us':>9} {'p50 us':>9} {'p99 us':>9}")
+    for name, us in rows:
+        us_sorted = sorted(us)
+        p99 = us_sorted[int(len(us_sorted) * 0.99) - 1]
+        print(f"{name:<14} {statistics.mean(us):>9.1f} {statistics.median(us):>9.1f} {p99:>9.1f}")
+
+    engine.dispose()
+    if tmp:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
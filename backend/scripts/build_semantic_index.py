@@ -1,14 +1,27 @@
 #!/usr/bin/env python3
+"""
+Build the FAISS index, id map and vocab used by /products/semantic.
+
+    python -m scripts.build_semantic_index                 # full build from the CSV
+    python -m scripts.build_semantic_index --incremental   # re-embed only products changed
+                                                           # since the catalog version in vocab.json
+
+A running API swaps in the new files on its next catalog refresh
+(CATALOG_REFRESH_INTERVAL_S), once vocab.json records a different version.
+"""
 from __future__ import annotations
 
+import argparse
 import json
 import csv
+import os
 from pathlib import Path
 from typing import Dict, List, Tuple
 
 import numpy as np
 import faiss
-from sentence_transformers import SentenceTransformer
+
+from app.search import article_id_to_int, load_embedding_model
 
 # ---------- paths ----------
 HERE = Path(__file__).resolve()
@@ -20,9 +33,16 @@ OUT_DIR = PROJECT_ROOT / "data" / "semantic"
 OUT_DIR.mkdir(parents=True, exist_ok=True)
 
 INDEX_PATH = OUT_DIR / "faiss.index"
-IDMAP_PATH = OUT_DIR / "id_map.json"
+IDMAP_PATH = OUT_DIR / "id_map.npy"  # int64 article_id per FAISS row
 VOCAB_PATH = OUT_DIR / "vocab.json"
 
+VOCAB_FIELDS = [
+    "product_group_name",
+    "colour_group_name",
+    "perceived_colour_master_name",
+    "product_type_name",
+]
+
 # ---------- config ----------
 MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 BATCH_SIZE = 128
@@ -57,18 +77,63 @@ def build_search_text(row: dict) -> str:
 
     return " | ".join(parts)
 
-def main():
+def embed(texts: List[str]) -> np.ndarray:
+    # Documents are encoded once, offline, so the index always uses the fp32
+    # model; SEMANTIC_ONNX_FILE only swaps the query encoder in the API.
+    # Default onnxruntime threading too, so nothing here reads settings and a
+    # CSV-only build needs no DATABASE_URL.
+    model = load_embedding_model(MODEL_NAME, onnx_file=None, intra_op_threads=0, inter_op_threads=0)
+    return model.encode(
+        texts,
+        batch_size=BATCH_SIZE,
+        normalize_embeddings=True,   # cosine similarity via dot product
+        show_progress_bar=True,
+    ).astype("float32")
+
+def write_outputs(index: faiss.Index, id_map: np.ndarray, vocab: dict) -> None:
+    # Each file is swapped in whole, vocab.json last: a running API reloads
+    # the index once the catalog_version in vocab.json moves, and by then the
+    # index and id map it reads belong to this build.
+    tmp_index = INDEX_PATH.with_name(INDEX_PATH.name + ".tmp")
+    faiss.write_index(index, str(tmp_index))
+    os.replace(tmp_index, INDEX_PATH)
+    # Compact id map: the API maps FAISS rows -> catalog positions with one
+    # vectorized lookup instead of parsing a JSON list of strings per worker.
+    tmp_idmap = IDMAP_PATH.with_name("id_map.tmp.npy")
+    np.save(tmp_idmap, id_map, allow_pickle=False)
+    os.replace(tmp_idmap, IDMAP_PATH)
+    tmp_vocab = VOCAB_PATH.with_name(VOCAB_PATH.name + ".tmp")
+    tmp_vocab.write_text(json.dumps(vocab, indent=2), encoding="utf-8")
+    os.replace(tmp_vocab, VOCAB_PATH)
+
+    print("Wrote:")
+    print(f"  {INDEX_PATH}")
+    print(f"  {IDMAP_PATH}")
+    print(f"  {VOCAB_PATH}")
+
+def db_catalog_version() -> int:
+    """Current catalog version, or 0 when there's no (migrated) DB to ask: the full build only needs the CSV."""
+    try:
+        from app.catalog import current_version
+        from app.core.db import SessionLocal
+
+        with SessionLocal() as db:
+            return current_version(db)
+    except Exception as e:
+        print(f"Catalog version unavailable ({e.__class__.__name__}); recording 0.")
+        return 0
+
+def build_full():
     if not CSV_PATH.exists():
         raise SystemExit(f"CSV not found: {CSV_PATH}")
 
+    # read first: the CSV is at least this new (seed it before building)
+    catalog_version = db_catalog_version()
+
     # Load rows + build texts
     product_ids: List[str] = []
     texts: List[str] = []
-
-    groups = set()
-    colors = set()
-    color_masters = set()
-    types = set()
+    vocab_sets: Dict[str, set] = {k: set() for k in VOCAB_FIELDS}
 
     with CSV_PATH.open("r", encoding="utf-8") as f:
         r = csv.DictReader(f)
@@ -79,54 +144,99 @@ def main():
                 continue
 
             # collect vocab for fuzzy parsing
-            g = (row.get("product_group_name") or "").strip()
-            if g: groups.add(g)
-
-            c = (row.get("colour_group_name") or "").strip()
-            if c: colors.add(c)
-
-            cm = (row.get("perceived_colour_master_name") or "").strip()
-            if cm: color_masters.add(cm)
-
-            t = (row.get("product_type_name") or "").strip()
-            if t: types.add(t)
+            for k in VOCAB_FIELDS:
+                v = (row.get(k) or "").strip()
+                if v: vocab_sets[k].add(v)
 
             product_ids.append(pid)
             texts.append(build_search_text(row))
 
     print(f"Loaded {len(texts)} products from {CSV_PATH}")
 
-    # Embed
-    model = SentenceTransformer(MODEL_NAME, backend = "onnx")
-    emb = model.encode(
-        texts,
-        batch_size=BATCH_SIZE,
-        normalize_embeddings=True,   # cosine similarity via dot product
-        show_progress_bar=True,
-    ).astype("float32")
+    emb = embed(texts)
 
     # Build FAISS index (inner product works as cosine because normalized)
     dim = emb.shape[1]
     index = faiss.IndexFlatIP(dim)
     index.add(emb)
 
-    faiss.write_index(index, str(INDEX_PATH))
-    IDMAP_PATH.write_text(json.dumps(product_ids), encoding="utf-8")
-
-    vocab = {
-        "product_group_name": sorted(groups),
-        "colour_group_name": sorted(colors),
-        "perceived_colour_master_name": sorted(color_masters),
-        "product_type_name": sorted(types),
-        "model": MODEL_NAME,
-        "count": len(product_ids),
-    }
-    VOCAB_PATH.write_text(json.dumps(vocab, indent=2), encoding="utf-8")
+    id_map = np.array([int(pid) for pid in product_ids], dtype=np.int64)
+
+    vocab = {k: sorted(vocab_sets[k]) for k in VOCAB_FIELDS}
+    vocab.update({"model": MODEL_NAME, "count": len(product_ids), "catalog_version": catalog_version})
+    write_outputs(index, id_map, vocab)
+
+def build_incremental():
+    """
+    Drop the FAISS rows of products changed or deleted after the catalog version
+    the index was built from, then embed and append the changed ones.
+    Vocab lists only grow; run a full build now and then to prune them.
+    """
+    from sqlalchemy import select
+
+    from app.catalog import current_version
+    from app.core.db import SessionLocal
+    from app.db.models import Product
+
+    if not (INDEX_PATH.exists() and IDMAP_PATH.exists() and VOCAB_PATH.exists()):
+        raise SystemExit("No index to update; run a full build first.")
+
+    vocab = json.loads(VOCAB_PATH.read_text(encoding="utf-8"))
+    if vocab.get("model") != MODEL_NAME:
+        raise SystemExit(f"Index was built with {vocab.get('model')!r}; run a full build.")
+    since = int(vocab.get("catalog_version", 0))
+
+    with SessionLocal() as db:
+        version = current_version(db)
+        if version <= since:
+            print(f"Index is current (catalog version {since}).")
+            return
+        stmt = select(Product).where(Product.version > since, Product.version <= version)
+        rows = db.execute(stmt).scalars().all()
+
+        touched = np.array([article_id_to_int(r.id) for r in rows], dtype=np.int64)
+        live = [r for r in rows if r.deleted_at is None and article_id_to_int(r.id) >= 0]
+        product_ids = [article_id_to_int(r.id) for r in live]
+        texts = [build_search_text({k: getattr(r, k) or "" for k in FIELDS}) for r in live]
+        for r in live:
+            for k in VOCAB_FIELDS:
+                v = (getattr(r, k) or "").strip()
+                if v and v not in vocab[k]:
+                    vocab[k].append(v)
+
+    index = faiss.read_index(str(INDEX_PATH))
+    id_map = np.load(IDMAP_PATH, allow_pickle=False).astype(np.int64, copy=False)
+
+    # IndexFlat.remove_ids compacts the remaining rows in order, so the same
+    # mask keeps id_map aligned with the index
+    drop = np.isin(id_map, touched)
+    index.remove_ids(np.flatnonzero(drop).astype(np.int64))
+    id_map = id_map[~drop]
+
+    if texts:
+        index.add(embed(texts))
+        id_map = np.concatenate([id_map, np.array(product_ids, dtype=np.int64)])
+
+    print(
+        f"Catalog {since} -> {version}: {int(drop.sum())} rows dropped, "
+        f"{len(texts)} embedded, {index.ntotal} total"
+    )
+
+    for k in VOCAB_FIELDS:
+        vocab[k] = sorted(vocab[k])
+    vocab.update({"count": int(index.ntotal), "catalog_version": version})
+    write_outputs(index, id_map, vocab)
 
-    print("Wrote:")
-    print(f"  {INDEX_PATH}")
-    print(f"  {IDMAP_PATH}")
-    print(f"  {VOCAB_PATH}")
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--incremental", action="store_true",
+                    help="update the existing index from products changed since its catalog version")
+    args = ap.parse_args()
+
+    if args.incremental:
+        build_incremental()
+    else:
+        build_full()
 
 if __name__ == "__main__":
     main()
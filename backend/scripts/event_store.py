@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Maintenance for the on-disk event store (EVENTS_SINK=segments|both).
+
+    python -m scripts.event_store stats
+    python -m scripts.event_store compact            # sealed hours -> one segment + .npz export
+    python -m scripts.event_store dump --since 2026-10-01 --type view | head
+    python -m scripts.event_store replay-popularity  # rebuild trending counters from the log
+
+--dir overrides EVENTS_STORE_DIR (default data/events).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from app.services.event_store import EventStore, default_store_dir, replay_popularity
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("command", choices=["stats", "compact", "dump", "replay-popularity"])
+    ap.add_argument("--dir", type=Path, default=None)
+    ap.add_argument("--since", type=datetime.fromisoformat, default=None)
+    ap.add_argument("--until", type=datetime.fromisoformat, default=None)
+    ap.add_argument("--type", action="append", default=None, help="event type (repeatable)")
+    ap.add_argument("--no-snapshot", action="store_true", help="replay-popularity: don't write product_popularity")
+    args = ap.parse_args()
+
+    from app.core.config import settings
+
+    root = args.dir or (Path(settings.events_store_dir) if settings.events_store_dir else default_store_dir())
+    store = EventStore(root)
+
+    if args.command == "stats":
+        print(json.dumps(store.stats(), indent=2))
+
+    elif args.command == "compact":
+        t0 = time.perf_counter()
+        report = store.compact()
+        print(f"compacted {report['hours']} hours, {report['rows']} rows in {time.perf_counter() - t0:.1f}s")
+
+    elif args.command == "dump":
+        for e in store.iter_events(since=args.since, until=args.until, types=args.type):
+            e["ts"] = e["ts"].isoformat()
+            sys.stdout.write(json.dumps(e) + "\n")
+
+    else:
+        from app.services.popularity import POPULARITY, snapshot_popularity
+
+        t0 = time.perf_counter()
+        n = replay_popularity(store, POPULARITY, since=args.since)
+        print(f"replayed {n} events in {time.perf_counter() - t0:.1f}s: {POPULARITY.stats()}")
+        if not args.no_snapshot:
+            print(f"snapshot: {snapshot_popularity()} products written")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,50 @@
+"""
+Load data/catalog_trimmed_priced.csv into `products` (upsert on article_id).
+
+    python -m scripts.seed_products                 # incremental: write only new/changed rows
+    python -m scripts.seed_products --dry-run       # print the diff, write nothing
+    python -m scripts.seed_products --delete-missing  # also soft-delete articles gone from the CSV
+    python -m scripts.seed_products --full          # multi-row upserts of every row, commit per batch
+    python -m scripts.seed_products --bulk          # every row in one transaction: executemany (SQLite)
+                                                    # or COPY into a staging table + merge (Postgres)
+    python -m scripts.seed_products --bulk --csv path/to/articles.csv
+
+Incremental runs compare a hash of each parsed row with products.content_hash,
+write the inserted/changed rows with version = N + 1 and record version N + 1 in
+catalog_versions, all in one transaction; a run that changes nothing leaves the
+version alone. The API and scripts.build_semantic_index pick up rows with
+version > the one they last loaded. The first incremental run over a table
+seeded by --full/--bulk has no hashes to compare and rewrites every row once.
+"""
 from __future__ import annotations
 
+import argparse
 import csv
+import hashlib
+import json
+import time
+from datetime import datetime
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator
 
 from sqlalchemy.orm import Session
 from sqlalchemy.dialects.sqlite import insert
 
+from app.catalog import current_version
 from app.core.db import SessionLocal
-from app.db.models import Product
+from app.db.models import CatalogVersion, Product
 
-from sqlalchemy import text
+from sqlalchemy import select, text, update
 
 
 CSV_PATH = Path("data/catalog_trimmed_priced.csv")
 
+# rows per executemany / COPY progress report in --bulk mode
+BULK_CHUNK = 5000
+STAGE_TABLE = "products_stage"
+# ids per UPDATE when soft-deleting (SQLite variable limit)
+DELETE_CHUNK = 500
+
 
 def to_int(v: Any) -> int | None:
     if v in (None, ""):
@@ -34,93 +64,131 @@ def to_str(v: Any) -> str | None:
     return str(v)
 
 
-def main():
-    if not CSV_PATH.exists():
-        raise FileNotFoundError(f"CSV not found: {CSV_PATH.resolve()}")
+def parse_row(row: dict[str, str]) -> dict[str, Any] | None:
+    article_id = row.get("article_id")
+    prod_name = row.get("prod_name")
+    if not article_id or not prod_name:
+        return None
 
-    db: Session = SessionLocal()
-    try:
-        # Helps if SQLite is busy during bulk inserts
-        db.connection().exec_driver_sql("PRAGMA busy_timeout = 5000;")
+    price_cents = to_int(row.get("price_cents"))
+    price = (price_cents / 100.0) if price_cents is not None else None
+
+    return {
+        # PK
+        "id": str(article_id),
+
+        # convenience fields
+        "name": str(prod_name),
+        "category": to_str(row.get("product_group_name")),
+        "price": price,
+        "description": to_str(row.get("detail_desc")),
+        "color": to_str(row.get("colour_group_name")),
+
+        "image_key": None,
+        "has_image": False,
+
+        # full CSV fields
+        "product_code": to_int(row.get("product_code")),
+        "prod_name": to_str(row.get("prod_name")),
+        "product_type_no": to_int(row.get("product_type_no")),
+        "product_type_name": to_str(row.get("product_type_name")),
+        "product_group_name": to_str(row.get("product_group_name")),
+        "graphical_appearance_no": to_int(row.get("graphical_appearance_no")),
+        "graphical_appearance_name": to_str(row.get("graphical_appearance_name")),
+        "colour_group_code": to_int(row.get("colour_group_code")),
+        "colour_group_name": to_str(row.get("colour_group_name")),
+        "perceived_colour_value_id": to_int(row.get("perceived_colour_value_id")),
+        "perceived_colour_value_name": to_str(row.get("perceived_colour_value_name")),
+        "perceived_colour_master_id": to_int(row.get("perceived_colour_master_id")),
+        "perceived_colour_master_name": to_str(row.get("perceived_colour_master_name")),
+        "department_no": to_int(row.get("department_no")),
+        "department_name": to_str(row.get("department_name")),
+        "index_code": to_str(row.get("index_code")),
+        "index_name": to_str(row.get("index_name")),
+        "index_group_no": to_int(row.get("index_group_no")),
+        "index_group_name": to_str(row.get("index_group_name")),
+        "section_no": to_int(row.get("section_no")),
+        "section_name": to_str(row.get("section_name")),
+        "garment_group_no": to_int(row.get("garment_group_no")),
+        "garment_group_name": to_str(row.get("garment_group_name")),
+        "detail_desc": to_str(row.get("detail_desc")),
+        "price_cents": price_cents,
+        "currency": to_str(row.get("currency")),
+    }
+
+
+def iter_rows(csv_path: Path) -> Iterator[dict[str, Any]]:
+    with csv_path.open("r", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            row_dict = parse_row(row)
+            if row_dict is not None:
+                yield row_dict
+
+
+def row_hash(row: dict[str, Any]) -> str:
+    """Content hash of a parsed row (parse_row output), stable across runs and key order."""
+    payload = json.dumps(row, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
 
-        MAX_SQL_VARS = 900  # safe under typical 999 default
-
-        batch: list[dict[str, Any]] = []
-        BATCH_SIZE: int | None = None
-        inserted = 0
-
-        with CSV_PATH.open("r", newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-
-            for row in reader:
-                article_id = row.get("article_id")
-                prod_name = row.get("prod_name")
-                if not article_id or not prod_name:
-                    continue
-
-                price_cents = to_int(row.get("price_cents"))
-                price = (price_cents / 100.0) if price_cents is not None else None
-
-                row_dict: dict[str, Any] = {
-                    # PK
-                    "id": str(article_id),
-
-                    # convenience fields
-                    "name": str(prod_name),
-                    "category": to_str(row.get("product_group_name")),
-                    "price": price,
-                    "description": to_str(row.get("detail_desc")),
-                    "color": to_str(row.get("colour_group_name")),
-
-                    "image_key": None,
-                    "has_image": False,
-
-                    # full CSV fields
-                    "product_code": to_int(row.get("product_code")),
-                    "prod_name": to_str(row.get("prod_name")),
-                    "product_type_no": to_int(row.get("product_type_no")),
-                    "product_type_name": to_str(row.get("product_type_name")),
-                    "product_group_name": to_str(row.get("product_group_name")),
-                    "graphical_appearance_no": to_int(row.get("graphical_appearance_no")),
-                    "graphical_appearance_name": to_str(row.get("graphical_appearance_name")),
-                    "colour_group_code": to_int(row.get("colour_group_code")),
-                    "colour_group_name": to_str(row.get("colour_group_name")),
-                    "perceived_colour_value_id": to_int(row.get("perceived_colour_value_id")),
-                    "perceived_colour_value_name": to_str(row.get("perceived_colour_value_name")),
-                    "perceived_colour_master_id": to_int(row.get("perceived_colour_master_id")),
-                    "perceived_colour_master_name": to_str(row.get("perceived_colour_master_name")),
-                    "department_no": to_int(row.get("department_no")),
-                    "department_name": to_str(row.get("department_name")),
-                    "index_code": to_str(row.get("index_code")),
-                    "index_name": to_str(row.get("index_name")),
-                    "index_group_no": to_int(row.get("index_group_no")),
-                    "index_group_name": to_str(row.get("index_group_name")),
-                    "section_no": to_int(row.get("section_no")),
-                    "section_name": to_str(row.get("section_name")),
-                    "garment_group_no": to_int(row.get("garment_group_no")),
-                    "garment_group_name": to_str(row.get("garment_group_name")),
-                    "detail_desc": to_str(row.get("detail_desc")),
-                    "price_cents": price_cents,
-                    "currency": to_str(row.get("currency")),
-                }
-
-                if BATCH_SIZE is None:
-                    cols = len(row_dict.keys())
-                    BATCH_SIZE = max(1, min(200, MAX_SQL_VARS // cols))
-                    print(f"Using BATCH_SIZE={BATCH_SIZE} for {cols} columns (SQLite var limit safe).")
-
-                batch.append(row_dict)
-
-                if len(batch) >= BATCH_SIZE:
-                    inserted += upsert_batch(db, batch)
-                    batch.clear()
-
-            if batch:
-                inserted += upsert_batch(db, batch)
-
-        print(f"Upserted {inserted} products into SQLite.")
-    finally:
-        db.close()
+
+class Progress:
+    """Prints rows and rows/s every `every` rows and once at the end."""
+
+    def __init__(self, every: int = BULK_CHUNK):
+        self.every = every
+        self.rows = 0
+        self.t0 = time.perf_counter()
+        self._next = every
+
+    def add(self, n: int) -> None:
+        self.rows += n
+        if self.rows >= self._next:
+            self._next += self.every
+            self.report()
+
+    def report(self, label: str = "") -> None:
+        dt = time.perf_counter() - self.t0
+        rate = self.rows / dt if dt > 0 else 0.0
+        print(f"{label}{self.rows} rows in {dt:.1f}s ({rate:,.0f} rows/s)", flush=True)
+
+
+def _chunks(rows: Iterable[dict[str, Any]], size: int) -> Iterator[list[dict[str, Any]]]:
+    chunk: list[dict[str, Any]] = []
+    for r in rows:
+        chunk.append(r)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def seed_batched(db: Session, rows: Iterable[dict[str, Any]]) -> int:
+    """Multi-row INSERT ... ON CONFLICT DO UPDATE kept under SQLite's variable limit, one commit each."""
+    # Helps if SQLite is busy during bulk inserts
+    db.connection().exec_driver_sql("PRAGMA busy_timeout = 5000;")
+
+    MAX_SQL_VARS = 900  # safe under typical 999 default
+
+    batch: list[dict[str, Any]] = []
+    BATCH_SIZE: int | None = None
+    inserted = 0
+
+    for row_dict in rows:
+        if BATCH_SIZE is None:
+            cols = len(row_dict.keys())
+            BATCH_SIZE = max(1, min(200, MAX_SQL_VARS // cols))
+            print(f"Using BATCH_SIZE={BATCH_SIZE} for {cols} columns (SQLite var limit safe).")
+
+        batch.append(row_dict)
+
+        if len(batch) >= BATCH_SIZE:
+            inserted += upsert_batch(db, batch)
+            batch.clear()
+
+    if batch:
+        inserted += upsert_batch(db, batch)
+    return inserted
 
 
 def upsert_batch(db: Session, rows: list[dict[str, Any]]) -> int:
@@ -135,5 +203,235 @@ def upsert_batch(db: Session, rows: list[dict[str, Any]]) -> int:
     return result.rowcount or 0
 
 
+def seed_bulk_sqlite(db: Session, rows: Iterable[dict[str, Any]], progress: Progress) -> int:
+    """
+    One prepared single-row upsert run through executemany, BULK_CHUNK rows per
+    call, all in one transaction: no variable limit, no per-batch commit/fsync.
+    """
+    db.connection().exec_driver_sql("PRAGMA busy_timeout = 5000;")
+    stmt = None
+    for chunk in _chunks(rows, BULK_CHUNK):
+        if stmt is None:
+            stmt = insert(Product)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Product.id],
+                set_={k: getattr(stmt.excluded, k) for k in chunk[0].keys() if k != "id"},
+            )
+        db.execute(stmt, chunk)
+        progress.add(len(chunk))
+    return progress.rows
+
+
+def seed_bulk_postgres(db: Session, rows: Iterable[dict[str, Any]], progress: Progress) -> int:
+    """
+    COPY every row into a temporary staging table, then merge it into products
+    with a single INSERT ... SELECT ... ON CONFLICT DO UPDATE. One transaction.
+    """
+    cols: list[str] | None = None
+    raw = db.connection().connection.dbapi_connection  # psycopg 3 connection
+    with raw.cursor() as cur:
+        for chunk in _chunks(rows, BULK_CHUNK):
+            if cols is None:
+                cols = list(chunk[0].keys())
+                # stage_seq numbers rows in CSV order (COPY leaves it to its default)
+                cur.execute(
+                    f"CREATE TEMP TABLE {STAGE_TABLE} "
+                    f"(LIKE {Product.__tablename__} INCLUDING DEFAULTS, stage_seq bigserial) ON COMMIT DROP"
+                )
+                copy_sql = f"COPY {STAGE_TABLE} ({', '.join(cols)}) FROM STDIN"
+            with cur.copy(copy_sql) as cp:
+                for r in chunk:
+                    cp.write_row([r[c] for c in cols])
+            progress.add(len(chunk))
+
+    if cols is None:
+        return 0
+
+    col_list = ", ".join(cols)
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in cols if c != "id")
+    db.execute(
+        text(
+            f"INSERT INTO {Product.__tablename__} ({col_list}) "
+            # DISTINCT ON: a CSV repeating an article_id must not hit the same row
+            # twice; the later row wins, as with the SQLite path
+            f"SELECT DISTINCT ON (id) {col_list} FROM {STAGE_TABLE} "
+            f"ORDER BY id, stage_seq DESC "
+            f"ON CONFLICT (id) DO UPDATE SET {updates}"
+        )
+    )
+    return progress.rows
+
+
+def seed_bulk(db: Session, rows: Iterable[dict[str, Any]], commit: bool = True) -> int:
+    progress = Progress()
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        n = seed_bulk_postgres(db, rows, progress)
+    else:
+        n = seed_bulk_sqlite(db, rows, progress)
+    if commit:
+        db.commit()
+    progress.report("done: ")
+    return n
+
+
+class CatalogDiff:
+    """Counts (and ids) from comparing the CSV with `products` by content hash."""
+
+    def __init__(self):
+        self.inserted = 0
+        self.changed = 0
+        self.unchanged = 0
+        self.missing: list[str] = []
+
+    def __str__(self) -> str:
+        return (
+            f"{self.inserted} inserted, {self.changed} changed, "
+            f"{self.unchanged} unchanged, {len(self.missing)} missing from the CSV"
+        )
+
+
+def load_hashes(db: Session) -> dict[str, tuple[str | None, bool]]:
+    """id -> (content_hash, soft-deleted) for every products row."""
+    stmt = select(Product.id, Product.content_hash, Product.deleted_at)
+    return {
+        pid: (h, deleted_at is not None)
+        for pid, h, deleted_at in db.execute(stmt.execution_options(yield_per=BULK_CHUNK))
+    }
+
+
+def diff_rows(
+    rows: Iterable[dict[str, Any]],
+    existing: dict[str, tuple[str | None, bool]],
+    version: int,
+    diff: CatalogDiff,
+) -> Iterator[dict[str, Any]]:
+    """
+    Rows that are new, changed, or coming back after a soft delete, stamped with
+    their hash and `version`. Consumes `existing`: what is left afterwards is
+    the set of ids the CSV no longer has.
+    """
+    seen: set[str] = set()
+    for row in rows:
+        h = row_hash(row)
+        pid = row["id"]
+        prev = existing.pop(pid, None)
+        if pid in seen:
+            # repeated article_id: later row wins, like the plain upsert
+            yield {**row, "content_hash": h, "version": version, "deleted_at": None}
+            continue
+        seen.add(pid)
+        if prev is None:
+            diff.inserted += 1
+        elif prev[0] != h or prev[1]:
+            diff.changed += 1
+        else:
+            diff.unchanged += 1
+            continue
+        yield {**row, "content_hash": h, "version": version, "deleted_at": None}
+
+    diff.missing = sorted(pid for pid, (_, deleted) in existing.items() if not deleted)
+
+
+def soft_delete(db: Session, ids: list[str], version: int) -> int:
+    now = datetime.utcnow()
+    n = 0
+    for i in range(0, len(ids), DELETE_CHUNK):
+        chunk = ids[i : i + DELETE_CHUNK]
+        db.execute(
+            update(Product)
+            .where(Product.id.in_(chunk))
+            .values(deleted_at=now, version=version)
+        )
+        n += len(chunk)
+    return n
+
+
+def seed_incremental(
+    db: Session,
+    rows: Iterable[dict[str, Any]],
+    source: str | None = None,
+    delete_missing: bool = False,
+    dry_run: bool = False,
+) -> tuple[int | None, CatalogDiff]:
+    """
+    Write only the rows whose content hash moved and record the new catalog
+    version, in one transaction. Returns (new version or None if nothing was
+    written, diff).
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        db.connection().exec_driver_sql("PRAGMA busy_timeout = 5000;")
+    version = current_version(db) + 1
+    diff = CatalogDiff()
+    changed = diff_rows(rows, load_hashes(db), version, diff)
+
+    if dry_run:
+        for _ in changed:
+            pass
+        db.rollback()
+        return None, diff
+
+    seed_bulk(db, changed, commit=False)
+    deleted = soft_delete(db, diff.missing, version) if delete_missing else 0
+
+    if not (diff.inserted or diff.changed or deleted):
+        db.rollback()
+        return None, diff
+
+    db.add(CatalogVersion(
+        version=version,
+        source=source,
+        inserted=diff.inserted,
+        changed=diff.changed,
+        deleted=deleted,
+    ))
+    db.commit()
+    return version, diff
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--csv", type=Path, default=CSV_PATH)
+    mode = ap.add_mutually_exclusive_group()
+    mode.add_argument("--full", action="store_true", help="upsert every row, commit per batch")
+    mode.add_argument("--bulk", action="store_true", help="upsert every row in one transaction (executemany / COPY)")
+    ap.add_argument("--delete-missing", action="store_true",
+                    help="incremental: soft-delete articles that are no longer in the CSV")
+    ap.add_argument("--dry-run", action="store_true", help="incremental: print the diff, write nothing")
+    args = ap.parse_args()
+
+    csv_path: Path = args.csv
+    if not csv_path.exists():
+        raise FileNotFoundError(f"CSV not found: {csv_path.resolve()}")
+
+    db: Session = SessionLocal()
+    try:
+        if args.bulk:
+            inserted = seed_bulk(db, iter_rows(csv_path))
+            print(f"Upserted {inserted} products into {db.get_bind().dialect.name}.")
+        elif args.full:
+            inserted = seed_batched(db, iter_rows(csv_path))
+            print(f"Upserted {inserted} products into {db.get_bind().dialect.name}.")
+        else:
+            version, diff = seed_incremental(
+                db,
+                iter_rows(csv_path),
+                source=csv_path.name,
+                delete_missing=args.delete_missing,
+                dry_run=args.dry_run,
+            )
+            print(f"{diff}.")
+            if diff.missing and not args.delete_missing:
+                print("Missing articles kept; pass --delete-missing to soft-delete them.")
+            if args.dry_run:
+                print("Dry run: nothing written.")
+            elif version is None:
+                print("Catalog unchanged.")
+            else:
+                print(f"Catalog version {version}.")
+    finally:
+        db.close()
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,101 @@
+"""
+Shared fixtures. The app reads its settings at import time, so the test
+environment (a throwaway SQLite file, no background maintenance or catalog
+polling) is set up here before anything imports `app`.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+_TMP = tempfile.TemporaryDirectory(prefix="hm-shop-tests-")
+TEST_DB = Path(_TMP.name) / "test.db"
+
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB}"
+os.environ["IMAGE_BASE_URL"] = ""
+os.environ["DB_ASYNC"] = "false"
+os.environ["MAINTENANCE_ENABLED"] = "false"
+os.environ["CATALOG_REFRESH_INTERVAL_S"] = "0"
+os.environ["WRITE_QUEUE_ENABLED"] = "false"
+os.environ["EVENTS_SINK"] = "db"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.core.db import Base, SessionLocal, engine  # noqa: E402
+from app.db.models import Product  # noqa: E402
+
+# (id, name, product_group_name, colour_group_name, index_group_name, price_cents)
+CATALOG_ROWS = [
+    ("0108775015", "Strap top", "Garment Upper body", "Black", "Ladieswear", 899),
+    ("0108775044", "Strap top", "Garment Upper body", "White", "Ladieswear", 899),
+    ("0110065001", "OP T-shirt (Idro)", "Garment Upper body", "Black", "Menswear", 1299),
+    ("0111565001", "20 den 1p Stockings", "Socks & Tights", "Black", "Ladieswear", 499),
+    ("0118458003", "Tilda tank", "Garment Upper body", "Light Pink", "Divided", 699),
+    ("0123173001", "Banjo dress", "Garment Full body", "Dark Blue", "Ladieswear", 2499),
+    ("0126589006", "Zola dress", "Garment Full body", "Black", "Divided", 1999),
+    ("0145872037", "Jersey trousers", "Garment Lower body", "Grey", "Menswear", 1599),
+]
+
+
+def _seed_catalog() -> None:
+    with SessionLocal() as db:
+        for pid, name, group, colour, index_group, cents in CATALOG_ROWS:
+            db.add(Product(
+                id=pid,
+                name=name,
+                prod_name=name,
+                product_group_name=group,
+                colour_group_name=colour,
+                index_group_name=index_group,
+                product_type_name=name.split()[-1].title(),
+                detail_desc=f"{name} in {colour.lower()}.",
+                price=cents / 100.0,
+                price_cents=cents,
+            ))
+        db.commit()
+
+
+Base.metadata.create_all(engine)
+_seed_catalog()
+
+
+@pytest.fixture(scope="session")
+def app_module():
+    import app.main as main
+
+    return main
+
+
+@pytest.fixture(scope="session")
+def client(app_module):
+    with TestClient(app_module.app) as c:
+        yield c
+
+
+@pytest.fixture
+def guest(client, app_module):
+    """A client with its own (empty) cookie jar; the app is already started by `client`."""
+    return TestClient(app_module.app)
+
+
+@pytest.fixture
+def count_queries():
+    """`with count_queries() as statements:` collects every SQL statement sent to the sync engine."""
+
+    @contextmanager
+    def counter():
+        statements: list[str] = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    return counter
@@ -0,0 +1,39 @@
+import pytest
+
+PRODUCT = "0110065001"
+OTHER = "0145872037"
+
+
+def _batch(c, *ops):
+    return c.post("/cart/batch", json={"ops": list(ops)})
+
+
+@pytest.mark.parametrize(
+    "op, message",
+    [
+        ({"op": "add", "quantity": 2}, "add requires product_id"),
+        ({"op": "set_quantity", "quantity": 2}, "set_quantity requires item_id"),
+        ({"op": "set_quantity", "item_id": "x"}, "set_quantity requires quantity"),
+        ({"op": "remove"}, "remove requires item_id"),
+    ],
+)
+def test_ops_missing_their_fields_are_rejected(guest, op, message):
+    r = _batch(guest, op)
+    assert r.status_code == 422
+    assert message in r.text
+
+
+def test_batch_applies_ops_in_order(guest):
+    r = _batch(guest, {"op": "add", "product_id": PRODUCT}, {"op": "add", "product_id": OTHER, "quantity": 3})
+    assert r.status_code == 200
+    items = {i["product_id"]: i for i in r.json()["items"]}
+    assert items[PRODUCT]["quantity"] == 1
+    assert items[OTHER]["quantity"] == 3
+
+    r = _batch(
+        guest,
+        {"op": "set_quantity", "item_id": items[PRODUCT]["id"], "quantity": 5},
+        {"op": "remove", "item_id": items[OTHER]["id"]},
+    )
+    assert r.status_code == 200
+    assert [(i["product_id"], i["quantity"]) for i in r.json()["items"]] == [(PRODUCT, 5)]
@@ -0,0 +1,48 @@
+"""GET /cart takes a single DB round trip: product fields come from the in-memory catalog."""
+import uuid
+
+PID = "0108775015"
+
+
+def _select_count(statements: list[str]) -> int:
+    return sum(1 for s in statements if s.lstrip().upper().startswith("SELECT"))
+
+
+def test_guest_get_cart_is_one_query(guest, count_queries):
+    r = guest.post("/cart/items", json={"product_id": PID, "quantity": 2})
+    assert r.status_code == 200
+
+    with count_queries() as statements:
+        r = guest.get("/cart")
+
+    assert r.status_code == 200
+    body = r.json()
+    assert [(it["product_id"], it["quantity"]) for it in body["items"]] == [(PID, 2)]
+    assert body["items"][0]["product"]["name"] == "Strap top"
+    assert len(statements) == 1, statements
+    assert "products" not in statements[0]
+
+
+def test_logged_in_get_cart_is_one_query(guest, count_queries):
+    email = f"cart-{uuid.uuid4().hex[:8]}@example.com"
+    assert guest.post("/auth/register", json={"email": email}).status_code == 200
+    assert guest.post("/cart/items", json={"product_id": PID, "quantity": 1}).status_code == 200
+    # first read warms the in-process session cache
+    assert guest.get("/cart").status_code == 200
+
+    with count_queries() as statements:
+        r = guest.get("/cart")
+
+    assert r.status_code == 200
+    assert r.json()["total_quantity"] == 1
+    assert _select_count(statements) == 1, statements
+    assert len(statements) == 1, statements
+
+
+def test_get_cart_without_cart_runs_no_query(guest, count_queries):
+    with count_queries() as statements:
+        r = guest.get("/cart")
+
+    assert r.status_code == 200
+    assert r.json()["items"] == []
+    assert statements == []
@@ -0,0 +1,35 @@
+from app.core.db import SessionLocal
+from app.db.models import OrderLine
+from app.services import cart_service
+
+PRODUCT = "0110065001"
+OTHER = "0145872037"
+
+
+def test_checkout_orders_the_lines_as_they_are_at_checkout(guest):
+    r = guest.post("/cart/batch", json={"ops": [{"op": "add", "product_id": PRODUCT, "quantity": 2}]})
+    assert r.status_code == 200
+    item_id = r.json()["items"][0]["id"]
+    cart_id = guest.cookies["cart_id"]
+
+    with SessionLocal() as db:
+        cart = cart_service.get_cart_with_items(db, cart_id)
+        assert [(it.product_id, it.quantity) for it in cart.items] == [(PRODUCT, 2)]
+
+        # edits that commit after this request loaded the cart but before its write runs
+        r = guest.post(
+            "/cart/batch",
+            json={
+                "ops": [
+                    {"op": "set_quantity", "item_id": item_id, "quantity": 5},
+                    {"op": "add", "product_id": OTHER},
+                ]
+            },
+        )
+        assert r.status_code == 200
+
+        order = cart_service.checkout_cart(db, cart)
+        assert order["total_quantity"] == 6
+        lines = db.query(OrderLine).filter(OrderLine.order_id == cart_id).all()
+        assert sorted((l.product_id, l.quantity) for l in lines) == [(PRODUCT, 5), (OTHER, 1)]
+        assert order["subtotal_cents"] == sum(l.line_total_cents for l in lines)
@@ -0,0 +1,19 @@
+import asyncio
+
+import pytest
+
+from app.core.db import AsyncSessionLocal, _is_sqlite_driver, engine, get_async_db
+
+
+def test_async_sessions_need_db_async():
+    # conftest runs the suite with DB_ASYNC=false
+    assert AsyncSessionLocal is None
+    with pytest.raises(RuntimeError, match="DB_ASYNC"):
+        asyncio.run(anext(get_async_db()))
+
+
+def test_sqlite_pragmas_applied():
+    with engine.connect() as conn:
+        assert _is_sqlite_driver(conn.connection.dbapi_connection)
+        assert conn.exec_driver_sql("PRAGMA foreign_keys").scalar() == 1
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
@@ -0,0 +1,79 @@
+import asyncio
+import uuid
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from app.core.db import SessionLocal
+from app.db.models import Event
+from app.services.event_ingest import EventIngestor
+
+KNOWN = ["0108775015", "0110065001", "0123173001"]
+
+
+def _ingestor(**kw) -> EventIngestor:
+    args = {"max_queue": 1000, "batch_size": 100, "flush_interval_s": 60.0}
+    args.update(kw)
+    return EventIngestor(SessionLocal, **args)
+
+
+def _rows(session: str, product_ids: list[str]) -> list[dict]:
+    return [
+        {
+            "user_id": "anonymous",
+            "session_id": session,
+            "product_id": pid,
+            "event_type": "view",
+            "ts": datetime.utcnow(),
+            "weight": 1.0,
+        }
+        for pid in product_ids
+    ]
+
+
+def _stored(session: str) -> list[str]:
+    with SessionLocal() as db:
+        return sorted(db.scalars(select(Event.product_id).where(Event.session_id == session)))
+
+
+def test_flush_writes_the_batch():
+    session = f"ing-{uuid.uuid4().hex[:8]}"
+    ing = _ingestor()
+    assert ing.offer(_rows(session, KNOWN)) == (3, 0)
+    asyncio.run(ing._flush())
+    assert _stored(session) == sorted(KNOWN)
+    assert ing.stats()["written"] == 3 and ing.stats()["failed"] == 0
+
+
+def test_rows_violating_a_constraint_only_drop_themselves():
+    session = f"ing-{uuid.uuid4().hex[:8]}"
+    pids = KNOWN[:2] + ["0999999999"] + KNOWN[2:] + ["0999999998"] * 2
+    ing = _ingestor()
+    ing.offer(_rows(session, pids))
+    asyncio.run(ing._flush())
+
+    assert _stored(session) == sorted(KNOWN)
+    stats = ing.stats()
+    assert stats["written"] == 3
+    assert stats["failed"] == 3
+    assert stats["batches"] == 1
+
+
+def test_shedding_under_pressure():
+    session = f"ing-{uuid.uuid4().hex[:8]}"
+    ing = _ingestor(max_queue=4, high_water=0.5)
+    rows = _rows(session, KNOWN * 2)
+    for r, t in zip(rows, ["purchase", "view", "view", "view", "purchase", "purchase"]):
+        r["event_type"] = t
+    accepted, dropped = ing.offer(rows)
+    # views shed once 2 rows wait, everything once 4 do
+    assert (accepted, dropped) == (4, 2)
+    assert ing.stats()["dropped"] == {"shed": 2, "full": 0}
+    assert ing.offer(_rows(session, KNOWN[:1])) == (0, 1)
+    assert ing.is_full()
+
+    with SessionLocal() as db:
+        before = db.scalar(select(func.count()).select_from(Event))
+    asyncio.run(ing._flush())
+    with SessionLocal() as db:
+        assert db.scalar(select(func.count()).select_from(Event)) == before + 4
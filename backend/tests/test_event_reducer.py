@@ -0,0 +1,156 @@
+import random
+import types
+import uuid
+
+import pytest
+
+from app.services import event_reducer
+from app.services.event_reducer import ANONYMOUS, EventReducer
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    c = Clock()
+    # only the reducer module's view of `time`
+    monkeypatch.setattr(event_reducer, "time", types.SimpleNamespace(monotonic=c.monotonic))
+    return c
+
+
+def _reducer(**kw) -> EventReducer:
+    args = {
+        "window_s": 60.0,
+        "dedup_types": frozenset({"view"}),
+        "max_keys": 1000,
+        "sample_rates": {},
+        "rng": random.Random(0),
+    }
+    args.update(kw)
+    return EventReducer(**args)
+
+
+def _row(event_type="view", product_id="0108775015", session_id="s1", user_id=ANONYMOUS) -> dict:
+    return {"event_type": event_type, "product_id": product_id, "session_id": session_id, "user_id": user_id}
+
+
+def test_repeats_within_the_window_are_dropped(clock):
+    r = _reducer()
+    kept = r.reduce([_row(), _row(), _row(product_id="0108775044"), _row(session_id="s2")])
+    assert len(kept) == 3
+    assert all(k["weight"] == 1.0 for k in kept)
+    # also across calls
+    assert r.reduce([_row()]) == []
+    assert r.stats()["deduped"] == 2
+    assert r.stats()["seen"] == 5
+
+
+def test_only_configured_types_are_deduped(clock):
+    r = _reducer()
+    rows = [_row("add_to_cart"), _row("add_to_cart"), _row("purchase"), _row("purchase")]
+    assert len(r.reduce(rows)) == 4
+
+
+def test_anonymous_events_are_never_deduped(clock):
+    r = _reducer()
+    rows = [_row(session_id=ANONYMOUS), _row(session_id=ANONYMOUS)]
+    assert len(r.reduce(rows)) == 2
+    # a signed-in user without a session id still has an identity
+    rows = [_row(session_id=ANONYMOUS, user_id="u1"), _row(session_id=ANONYMOUS, user_id="u1")]
+    assert len(r.reduce(rows)) == 1
+
+
+def test_keys_live_between_one_and_two_windows(clock):
+    r = _reducer(window_s=60.0)
+    assert len(r.reduce([_row()])) == 1
+
+    clock.now += 61  # rotation: the key moves to the previous generation
+    assert r.reduce([_row()]) == []
+
+    clock.now += 61  # second rotation: forgotten
+    assert len(r.reduce([_row()])) == 1
+    assert r.stats()["rotations"] == 2
+
+
+def test_max_keys_forces_rotation(clock):
+    r = _reducer(max_keys=3)
+    r.reduce([_row(product_id=f"p{i}") for i in range(3)])
+    r.reduce([_row(product_id="p3")])  # rotates first, so the 3 older keys are "previous"
+    assert r.stats()["rotations"] == 1
+    assert r.stats()["keys"] <= 2 * 3 + 1
+    r.reduce([_row(product_id="p4")])
+    r.reduce([_row(product_id="p5")])
+    r.reduce([_row(product_id="p6")])  # second rotation drops p0..p2
+    assert len(r.reduce([_row(product_id="p0")])) == 1
+
+
+def test_forget_lets_the_same_events_through_again(clock):
+    r = _reducer()
+    kept = r.reduce([_row(), _row("add_to_cart"), _row(session_id=ANONYMOUS)])
+    r.forget(kept)
+    assert len(r.reduce([_row()])) == 1
+    assert r.reduce([_row()]) == []
+
+
+def test_zero_window_disables_dedup(clock):
+    r = _reducer(window_s=0)
+    assert len(r.reduce([_row(), _row(), _row()])) == 3
+    assert r.stats()["keys"] == 0
+
+
+def test_sampling_keeps_rate_and_reweights(clock):
+    r = _reducer(window_s=0, sample_rates={"view": 0.25, "purchase": 1.0}, rng=random.Random(42))
+    n = 20_000
+    kept = r.reduce([_row(session_id=str(i)) for i in range(n)])
+    assert len(kept) / n == pytest.approx(0.25, abs=0.015)
+    assert all(k["weight"] == 4.0 for k in kept)
+    # weights scale the kept events back up to about the original count
+    assert sum(k["weight"] for k in kept) == pytest.approx(n, rel=0.06)
+    assert r.stats()["sampled_out"] == n - len(kept)
+
+    # rate 1.0 is the same as not sampling
+    kept = r.reduce([_row("purchase") for _ in range(100)])
+    assert len(kept) == 100 and all(k["weight"] == 1.0 for k in kept)
+    assert r.stats()["sample_rates"] == {"view": 0.25}
+
+
+def test_dedup_runs_before_sampling(clock):
+    r = _reducer(sample_rates={"view": 0.5}, rng=random.Random(1))
+    r.reduce([_row() for _ in range(50)])
+    stats = r.stats()
+    assert stats["deduped"] == 49
+    assert stats["sampled_out"] <= 1
+
+
+def test_events_endpoint_reports_reduced(client):
+    session = f"sess-{uuid.uuid4().hex[:8]}"
+    body = [{"type": "view", "productId": "0108775015"}] * 3 + [{"type": "add_to_cart", "productId": "0108775015"}]
+    r = client.post("/v1/events", json=body, headers={"x-session-id": session})
+    assert r.status_code in (200, 202)
+    out = r.json()
+    assert out["received"] == 4
+    assert out["reduced"] == 2
+    assert out["accepted"] == 2
+
+
+def test_shed_batch_is_not_deduped_on_retry(client, monkeypatch):
+    from app.services.event_ingest import EVENTS
+
+    session = f"sess-{uuid.uuid4().hex[:8]}"
+    body = [{"type": "view", "productId": "0108775044"}]
+    monkeypatch.setattr(EVENTS, "is_full", lambda: True)
+    r = client.post("/v1/events", json=body, headers={"x-session-id": session})
+    assert r.status_code == 503
+    assert r.headers["retry-after"]
+
+    monkeypatch.undo()
+    r = client.post("/v1/events", json=body, headers={"x-session-id": session})
+    assert r.status_code == 202
+    assert r.json()["accepted"] == 1
+    assert r.json()["reduced"] == 0
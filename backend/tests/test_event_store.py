@@ -0,0 +1,220 @@
+import gzip
+import json
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.services.event_store import COMPACT_NAME, PENDING_NAME, EventStore
+
+T0 = datetime(2026, 3, 1, 9, 30, 0)
+
+
+def _rows(n: int, start: int = 0) -> list[dict]:
+    # client timestamps deliberately out of order
+    return [
+        {
+            "ts": T0 + timedelta(seconds=(i * 7919) % 1000),
+            "event_type": ("view", "add_to_cart", "purchase")[i % 3],
+            "product_id": f"01087750{i % 5:02d}",
+            "user_id": "anonymous",
+            "session_id": f"s{i % 4}",
+            "weight": 1.0 if i % 2 else 4.0,
+        }
+        for i in range(start, start + n)
+    ]
+
+
+def _key(e: dict) -> tuple:
+    return (e["ts"], e["event_type"], e["product_id"], e["session_id"], e["weight"])
+
+
+def _later() -> datetime:
+    return datetime.utcnow() + timedelta(hours=2)
+
+
+@pytest.fixture
+def store(tmp_path) -> EventStore:
+    # tiny segments so appends roll over into several files
+    return EventStore(tmp_path, segment_max_bytes=300)
+
+
+def _fill(store: EventStore, batches: int = 6, size: int = 20) -> list[dict]:
+    rows = []
+    for b in range(batches):
+        batch = _rows(size, start=b * size)
+        store.append(batch)
+        rows.extend(batch)
+    return rows
+
+
+def test_append_and_read_back(store):
+    rows = _fill(store)
+    assert store.stats()["segments"] > 1
+    assert Counter(map(_key, store.iter_events())) == Counter(map(_key, rows))
+
+
+def test_iter_events_filters(store):
+    rows = _fill(store)
+    since, until = T0 + timedelta(seconds=100), T0 + timedelta(seconds=400)
+    got = list(store.iter_events(since=since, until=until, types=["view"]))
+    want = [r for r in rows if since <= r["ts"] < until and r["event_type"] == "view"]
+    assert Counter(map(_key, got)) == Counter(map(_key, want))
+    assert list(store.iter_events(since=T0 + timedelta(days=1))) == []
+
+
+def test_compaction_merges_sorts_and_exports(store, tmp_path):
+    rows = _fill(store)
+    before = store.stats()
+
+    report = store.compact(now=_later())
+    assert report["rows"] == len(rows)
+
+    after = store.stats()
+    assert after["rows"] == before["rows"] == len(rows)
+    assert after["segments"] == after["hours"]
+    for hour_dir in (tmp_path / "segments").iterdir():
+        assert sorted(p.name for p in hour_dir.glob("*.ndjson.gz")) == [COMPACT_NAME]
+
+    events = list(store.iter_events())
+    assert Counter(map(_key, events)) == Counter(map(_key, rows))
+    assert [e["ts"] for e in events] == sorted(e["ts"] for e in events)
+
+    exports = list((tmp_path / "export").glob("*.npz"))
+    assert len(exports) == after["hours"]
+    total = 0
+    for path in exports:
+        with np.load(path) as z:
+            types = z["event_type_values"][z["event_type"]]
+            total += len(z["ts"])
+            assert set(types.tolist()) <= {"view", "add_to_cart", "purchase"}
+            assert np.all(np.diff(z["ts"]) >= 0)
+    assert total == len(rows)
+
+    # nothing left to do
+    assert store.compact(now=_later()) == {"hours": 0, "rows": 0}
+
+
+def test_compaction_leaves_open_hours_alone(store):
+    _fill(store, batches=3)
+    segments = store.stats()["segments"]
+    assert store.compact(now=datetime.utcnow()) == {"hours": 0, "rows": 0}
+    assert store.stats()["segments"] == segments
+
+
+def test_compaction_folds_in_late_segments(store):
+    rows = _fill(store, batches=2)
+    hour = store._hours()[-1]
+    store.compact_hour(hour)
+    # another process (or a late flush) appends to the same hour afterwards
+    late = _rows(10, start=1000)
+    store.append(late)
+    store.compact(now=_later())
+    assert Counter(map(_key, store.iter_events())) == Counter(map(_key, rows + late))
+
+
+def test_compaction_recovers_from_a_crash_before_sources_are_deleted(tmp_path):
+    class CrashingStore(EventStore):
+        calls = 0
+
+        def _drop_merged_sources(self, target):
+            # 1st call: cleanup of a previous run; 2nd: right after the merged file is in place
+            self.calls += 1
+            if self.calls == 2:
+                raise RuntimeError("crash")
+            super()._drop_merged_sources(target)
+
+    crashing = CrashingStore(tmp_path, segment_max_bytes=300)
+    rows = _fill(crashing, batches=4)
+    hour = crashing._hours()[-1]
+    with pytest.raises(RuntimeError):
+        crashing.compact_hour(hour)
+
+    # merged file and its sources are both on disk; readers would see duplicates
+    store = EventStore(tmp_path)
+    assert store.compact(now=_later())["hours"] == 0
+    assert Counter(map(_key, store.iter_events())) == Counter(map(_key, rows))
+    assert not (tmp_path / "segments" / hour / ".compact.lock").exists()
+
+
+@pytest.mark.parametrize("crash_at", [COMPACT_NAME, "compact.meta.json"])
+@pytest.mark.parametrize("recompact", [False, True])
+def test_compaction_recovers_from_a_crash_around_the_swap(tmp_path, monkeypatch, crash_at, recompact):
+    store = EventStore(tmp_path, segment_max_bytes=300)
+    rows = _fill(store, batches=4)
+    hour = store._hours()[-1]
+    if recompact:
+        # the hour already has a compacted segment (and meta) that the crash must not lose
+        store.compact_hour(hour)
+        late = _rows(10, start=1000)
+        store.append(late)
+        rows += late
+
+    real_replace = os.replace
+
+    def replace(src, dst):
+        if os.fspath(dst).endswith(crash_at):
+            raise RuntimeError("crash")
+        real_replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", replace)
+    with pytest.raises(RuntimeError):
+        store.compact_hour(hour)
+    monkeypatch.setattr(os, "replace", real_replace)
+    assert (tmp_path / "segments" / hour / PENDING_NAME).exists()
+
+    restarted = EventStore(tmp_path)
+    restarted.compact(now=_later())
+    d = tmp_path / "segments" / hour
+    assert sorted(p.name for p in d.glob("*.ndjson.gz")) == [COMPACT_NAME]
+    assert not (d / PENDING_NAME).exists()
+    assert not (d / (COMPACT_NAME + ".tmp")).exists()
+    assert Counter(map(_key, restarted.iter_events())) == Counter(map(_key, rows))
+    assert restarted.stats()["rows"] == len(rows)
+
+
+def test_writers_sharing_a_pid_never_share_a_segment(tmp_path):
+    # a restarted worker in a container comes back with the same pid
+    first = _rows(5)
+    EventStore(tmp_path).append(first)
+    second = _rows(3, start=5)
+    EventStore(tmp_path).append(second)
+
+    store = EventStore(tmp_path)
+    assert store.stats()["segments"] == 2
+    assert store.stats()["rows"] == 8
+    since, until = min(r["ts"] for r in first), max(r["ts"] for r in first) + timedelta(seconds=1)
+    window = list(store.iter_events(since=since, until=until))
+    assert Counter(map(_key, window)) >= Counter(map(_key, first))
+
+
+def test_torn_tail_keeps_earlier_members(store, tmp_path):
+    rows = _fill(store, batches=1, size=5)
+    seg = next((tmp_path / "segments").glob("*/*.ndjson.gz"))
+    with open(seg, "ab") as f:
+        f.write(gzip.compress(b'{"ts": 1, "event_type": "view"}\n')[:12])
+    assert Counter(map(_key, store.iter_events())) == Counter(map(_key, rows))
+
+
+def test_held_lock_skips_the_hour(store):
+    _fill(store, batches=2)
+    hour = store._hours()[-1]
+    lock = store._acquire(hour)
+    try:
+        assert store.compact_hour(hour) == 0
+    finally:
+        lock.unlink()
+    assert store.compact_hour(hour) > 0
+
+
+def test_segment_sidecars_describe_their_rows(store, tmp_path):
+    _fill(store)
+    for meta_path in (tmp_path / "segments").glob("*/*.meta.json"):
+        meta = json.loads(meta_path.read_text())
+        seg = meta_path.with_name(meta_path.name.removesuffix(".meta.json") + ".ndjson.gz")
+        events = list(store._read_segment(seg))
+        assert meta["rows"] == len(events)
+        assert meta["min_ts"] == min(e["ts"] for e in events)
+        assert meta["max_ts"] == max(e["ts"] for e in events)
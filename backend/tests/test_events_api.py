@@ -0,0 +1,25 @@
+import uuid
+
+
+def _post(client, **kw):
+    return client.post("/v1/events", headers={"x-session-id": f"sess-{uuid.uuid4().hex[:8]}"}, **kw)
+
+
+def test_single_event_keeps_its_original_response(client):
+    r = _post(client, json={"type": "view", "productId": "0110065001"})
+    assert r.status_code == 200
+    assert r.json() == {"received": True, "type": "view", "productId": "0110065001", "ts": None}
+
+
+def test_single_event_errors(client):
+    assert _post(client, json={"type": "view"}).status_code == 422
+    assert _post(client, json={"type": "view", "productId": "0999999999"}).status_code == 422
+
+
+def test_array_gets_batch_counts(client):
+    body = [{"type": "purchase", "productId": "0110065001"}, {"type": "view", "productId": "0999999999"}]
+    r = _post(client, json=body)
+    assert r.status_code == 202
+    out = r.json()
+    assert (out["received"], out["accepted"], out["rejected"]) == (2, 1, 1)
+    assert out["errors"] == [{"index": 1, "error": "unknown product"}]
@@ -0,0 +1,98 @@
+import random
+from collections import Counter
+
+import pytest
+
+from app.sampling import AliasTable
+
+UPPER_BODY = {"0108775015", "0108775044", "0110065001", "0118458003"}
+HOT = "0118458003"
+
+
+def _implied_probabilities(table: AliasTable) -> list[float]:
+    """Exact draw probabilities encoded by the table: own column share plus aliased remainders."""
+    p = [0.0] * table.n
+    for i in range(table.n):
+        p[i] += table.prob[i] / table.n
+        if table.alias[i] != i:
+            p[table.alias[i]] += (1.0 - table.prob[i]) / table.n
+    return p
+
+
+@pytest.mark.parametrize("weights", [
+    [1.0],
+    [1, 1, 1, 1],
+    [1, 2, 3, 4],
+    [0, 5, 0, 5],
+    [1000, 1, 1, 1, 1, 1],
+    [random.Random(3).random() for _ in range(200)],
+])
+def test_alias_table_encodes_the_weights(weights):
+    table = AliasTable(weights)
+    total = sum(weights)
+    assert _implied_probabilities(table) == pytest.approx([w / total for w in weights], abs=1e-12)
+
+
+def test_draw_frequencies_follow_weights():
+    table = AliasTable([1, 2, 7])
+    rng = random.Random(11)
+    counts = Counter(table.draw(rng) for _ in range(50_000))
+    assert counts[0] / 50_000 == pytest.approx(0.1, abs=0.01)
+    assert counts[1] / 50_000 == pytest.approx(0.2, abs=0.01)
+    assert counts[2] / 50_000 == pytest.approx(0.7, abs=0.01)
+
+
+def test_sample_distinct():
+    table = AliasTable([1, 2, 3, 4, 5])
+    rng = random.Random(5)
+    for k in range(1, 7):
+        picked = table.sample_distinct(rng, k)
+        assert len(picked) == min(k, 5)
+        assert len(set(picked)) == len(picked)
+
+
+def test_sample_distinct_falls_back_when_weight_is_concentrated():
+    # the zero-weight items can only come from the uniform fill after max_draws
+    table = AliasTable([1, 0, 0, 0])
+    picked = table.sample_distinct(random.Random(1), 4, max_draws=10)
+    assert picked[0] == 0
+    assert sorted(picked) == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize("weights", [[], [0, 0], [0.0]])
+def test_alias_table_rejects_no_weight(weights):
+    with pytest.raises(ValueError):
+        AliasTable(weights)
+
+
+def test_weighted_homepage_favours_bought_products(client, app_module):
+    app_module.POPULARITY.record(HOT, "purchase", n=500)
+    app_module.rebuild_homepage_tables()
+
+    firsts = Counter()
+    for seed in range(40):
+        r = client.get("/products/homepage", params={
+            "group": "Garment Upper body", "limit": 1, "weighted": 1, "seed": seed,
+        })
+        assert r.status_code == 200
+        body = r.json()
+        assert body["total"] == len(UPPER_BODY)
+        firsts[body["items"][0]["id"]] += 1
+    assert firsts[HOT] >= 36
+
+
+def test_homepage_samples_are_distinct_and_seeded(client):
+    params = {"group": "Garment Upper body", "limit": 10, "seed": 7}
+    for weighted in (0, 1):
+        a = client.get("/products/homepage", params={**params, "weighted": weighted}).json()
+        b = client.get("/products/homepage", params={**params, "weighted": weighted}).json()
+        ids = [p["id"] for p in a["items"]]
+        assert sorted(ids) == sorted(UPPER_BODY)
+        assert ids == [p["id"] for p in b["items"]]
+
+
+def test_homepage_mode_and_unknown_group(client):
+    r = client.get("/products/homepage", params={"group": "Garment Upper body", "mode": "men", "weighted": 1})
+    assert [p["id"] for p in r.json()["items"]] == ["0110065001"]
+    r = client.get("/products/homepage", params={"group": "No such group", "weighted": 1})
+    assert r.json()["items"] == [] and r.json()["total"] == 0
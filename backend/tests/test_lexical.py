@@ -0,0 +1,107 @@
+import math
+from collections import Counter
+
+import numpy as np
+
+from app.lexical import B, FIELD_WEIGHTS, K1, BM25Index, rrf_fuse, tokenize
+
+PRODUCTS = [
+    {"name": "Slim jeans", "product_type_name": "Trousers", "colour_group_name": "Dark Blue"},
+    {"name": "Relaxed jeans", "product_type_name": "Trousers", "colour_group_name": "Black"},
+    {"name": "Strap top", "product_type_name": "Vest top", "colour_group_name": "Black"},
+    {"name": "Jersey dress", "product_type_name": "Dress", "colour_group_name": "Black",
+     "description": "Short dress in soft jersey."},
+    {"name": "Wool coat", "product_type_name": "Coat", "colour_group_name": "Beige"},
+]
+
+
+def _reference_scores(products: list[dict], q: str) -> dict[int, float]:
+    """Textbook BM25 over the same weighted fields, one document at a time."""
+    tfs = []
+    for p in products:
+        tf = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for tok in tokenize(str(p.get(field) or "")):
+                tf[tok] += weight
+        tfs.append(tf)
+    lens = [sum(tf.values()) for tf in tfs]
+    avgdl = sum(lens) / len(lens)
+    n = len(products)
+
+    scores: dict[int, float] = {}
+    for term in dict.fromkeys(tokenize(q)):
+        df = sum(1 for tf in tfs if term in tf)
+        if not df:
+            continue
+        idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+        for i, tf in enumerate(tfs):
+            if term in tf:
+                f = tf[term]
+                s = idf * f * (K1 + 1) / (f + K1 * (1 - B + B * lens[i] / avgdl))
+                scores[i] = scores.get(i, 0.0) + s
+    return scores
+
+
+def test_bm25_matches_reference_scores():
+    index = BM25Index.build(PRODUCTS)
+    for q in ["jeans", "black jeans", "black jersey dress", "top"]:
+        docs, scores = index.search(q, top_k=10)
+        ref = _reference_scores(PRODUCTS, q)
+        assert sorted(docs.tolist()) == sorted(ref)
+        for d, s in zip(docs.tolist(), scores.tolist()):
+            assert math.isclose(s, ref[d], rel_tol=1e-5)
+        assert list(scores) == sorted(scores, reverse=True)
+
+
+def test_bm25_only_returns_matching_documents():
+    index = BM25Index.build(PRODUCTS)
+    docs, _ = index.search("coat")
+    assert docs.tolist() == [4]
+    docs, scores = index.search("no such words")
+    assert len(docs) == 0 and len(scores) == 0
+    assert len(index.search("")[0]) == 0
+
+
+def test_bm25_top_k_keeps_the_best():
+    index = BM25Index.build(PRODUCTS)
+    all_docs, all_scores = index.search("black jeans", top_k=10)
+    docs, scores = index.search("black jeans", top_k=2)
+    assert docs.tolist() == all_docs[:2].tolist()
+    np.testing.assert_allclose(scores, all_scores[:2])
+    # the one document with both terms ranks first
+    assert docs[0] == 1
+
+
+def test_bm25_on_empty_catalog():
+    index = BM25Index.build([])
+    assert len(index.search("jeans")[0]) == 0
+
+
+def test_rrf_fuse_rewards_agreement():
+    # 7 is second in both lists, 3 and 9 top one list each but are missing from the other
+    fused = rrf_fuse([[3, 7, 5], [9, 7, 5]])
+    assert fused[0] == 7
+    assert fused[1] == 5
+    assert set(fused) == {3, 5, 7, 9}
+
+
+def test_rrf_fuse_scores():
+    k = 60
+    fused = rrf_fuse([[1, 2], [2]], k=k)
+    # 2: 1/(k+2) + 1/(k+1) beats 1: 1/(k+1)
+    assert fused == [2, 1]
+    assert rrf_fuse([]) == []
+    assert rrf_fuse([[4, 5, 6]]) == [4, 5, 6]
+
+
+def test_semantic_endpoint_lexical_retrieval(client):
+    r = client.get("/products/semantic", params={"q": "dress", "retrieval": "lexical"})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["retrieval"] == "lexical"
+    assert {p["name"] for p in body["items"]} == {"Banjo dress", "Zola dress"}
+
+    r = client.get("/products/semantic", params={
+        "q": "dress", "retrieval": "lexical", "index_group_name": "Divided",
+    })
+    assert [p["name"] for p in r.json()["items"]] == ["Zola dress"]
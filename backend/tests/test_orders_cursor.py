@@ -0,0 +1,69 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.db import SessionLocal
+from app.db.models import Order, User
+
+
+@pytest.fixture
+def user_with_orders(guest):
+    """Logged-in client plus its 7 order ids, newest first; three share one timestamp."""
+    email = f"orders-{uuid.uuid4().hex[:8]}@example.com"
+    user_id = guest.post("/auth/register", json={"email": email}).json()["id"]
+
+    base = datetime(2026, 1, 1, 12, 0, 0)
+    times = [base + timedelta(hours=h) for h in (0, 1, 2, 2, 2, 3, 4)]
+    ids = [uuid.uuid4().hex for _ in times]
+    with SessionLocal() as db:
+        for oid, at in zip(ids, times):
+            db.add(Order(id=oid, user_id=user_id, ordered_at=at, total_quantity=1, subtotal_cents=100))
+        # someone else's order never shows up
+        other = User(email=f"other-{uuid.uuid4().hex[:8]}@example.com", password_hash="x")
+        db.add(other)
+        db.flush()
+        db.add(Order(id=uuid.uuid4().hex, user_id=other.id, ordered_at=base, total_quantity=1, subtotal_cents=1))
+        db.commit()
+
+    newest_first = [oid for _, oid in sorted(zip(times, ids), reverse=True)]
+    return guest, newest_first
+
+
+def _all_pages(client, limit: int) -> list[list[str]]:
+    pages, cursor = [], None
+    while True:
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        r = client.get("/orders", params=params)
+        assert r.status_code == 200
+        body = r.json()
+        pages.append([o["order_id"] for o in body["orders"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 7, 50])
+def test_cursor_round_trip_visits_every_order_once(user_with_orders, limit):
+    client, expected = user_with_orders
+    pages = _all_pages(client, limit)
+    assert [oid for page in pages for oid in page] == expected
+    assert all(len(page) == limit for page in pages[:-1])
+    assert len(pages) == max(1, -(-len(expected) // limit))
+
+
+def test_last_full_page_has_no_cursor(user_with_orders):
+    client, expected = user_with_orders
+    body = client.get("/orders", params={"limit": len(expected)}).json()
+    assert body["next_cursor"] is None
+
+
+def test_invalid_cursor_is_rejected(user_with_orders):
+    client, _ = user_with_orders
+    assert client.get("/orders", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_orders_require_login(guest):
+    assert guest.get("/orders").status_code == 401
@@ -0,0 +1,53 @@
+import gzip
+import json
+
+import pytest
+
+from app.api.v1 import products
+from conftest import CATALOG_ROWS
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("gzip", True),
+        ("gzip, deflate, br", True),
+        ("br;q=1.0, gzip;q=0.5", True),
+        ("GZIP", True),
+        ("x-gzip", True),
+        ("*", True),
+        ("gzip;q=0", False),
+        ("gzip; q=0.0, deflate", False),
+        ("*;q=1, gzip;q=0", False),
+        ("identity", False),
+        ("deflate, br", False),
+        ("gzip;q=bogus", False),
+        ("", False),
+    ],
+)
+def test_accepts_gzip_honours_q_values(header, expected):
+    assert products._accepts_gzip(header) is expected
+
+
+def test_refused_gzip_is_not_sent(client):
+    r = client.get("/v1/products", headers={"Accept-Encoding": "gzip;q=0, identity"})
+    assert r.status_code == 200
+    assert "content-encoding" not in r.headers
+    assert len(r.text.splitlines()) == len(CATALOG_ROWS)
+
+
+def test_gzip_export_when_accepted(client):
+    r = client.get("/v1/products", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    # httpx decodes the body for us; check it is the full catalog
+    assert len(r.text.splitlines()) == len(CATALOG_ROWS)
+
+
+def test_db_export_pages_by_key(client, monkeypatch, count_queries):
+    monkeypatch.setattr(products, "DB_PAGE_ROWS", 3)
+    with count_queries() as statements:
+        r = client.get("/v1/products", params={"source": "db"}, headers={"Accept-Encoding": "identity"})
+    ids = [json.loads(line)["id"] for line in r.text.splitlines()]
+    assert ids == sorted(row[0] for row in CATALOG_ROWS)
+    # ceil(8 / 3) keyset pages, each its own short query
+    assert sum("FROM products" in s and "LIMIT" in s for s in statements) == 3
@@ -0,0 +1,169 @@
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.catalog import apply_changes, current_version
+from app.core.db import Base
+from app.db.models import CatalogVersion, Product
+from scripts.seed_products import CatalogDiff, diff_rows, parse_row, row_hash, seed_incremental
+
+
+def _csv_row(article_id: str, name: str, cents: int = 999, colour: str = "Black") -> dict:
+    return {
+        "article_id": article_id,
+        "prod_name": name,
+        "product_group_name": "Garment Upper body",
+        "colour_group_name": colour,
+        "price_cents": str(cents),
+        "currency": "USD",
+    }
+
+
+CSV = [
+    _csv_row("0100000001", "Alpha top"),
+    _csv_row("0100000002", "Beta top"),
+    _csv_row("0100000003", "Gamma top"),
+]
+
+
+def _rows(csv_rows=CSV) -> list[dict]:
+    return [parse_row(r) for r in csv_rows]
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'seed.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as s:
+        yield s
+    engine.dispose()
+
+
+def _products(db: Session) -> dict[str, Product]:
+    db.expire_all()
+    return {p.id: p for p in db.scalars(select(Product))}
+
+
+def test_row_hash_ignores_key_order_and_tracks_content():
+    row = _rows()[0]
+    assert row_hash(row) == row_hash(dict(reversed(list(row.items()))))
+    assert row_hash(row) != row_hash({**row, "price_cents": row["price_cents"] + 1})
+
+
+def test_diff_rows_classifies_and_consumes_existing():
+    rows = _rows()
+    existing = {
+        rows[0]["id"]: (row_hash(rows[0]), False),       # unchanged
+        rows[1]["id"]: ("stale", False),                  # changed
+        "0199999999": (None, False),                      # gone from the CSV
+        "0199999998": (None, True),                       # gone, already soft-deleted
+    }
+    diff = CatalogDiff()
+    out = list(diff_rows(rows, existing, 7, diff))
+
+    assert [r["id"] for r in out] == [rows[1]["id"], rows[2]["id"]]
+    assert all(r["version"] == 7 and r["deleted_at"] is None for r in out)
+    assert out[0]["content_hash"] == row_hash(rows[1])
+    assert (diff.inserted, diff.changed, diff.unchanged) == (1, 1, 1)
+    assert diff.missing == ["0199999999"]
+
+
+def test_diff_rows_restores_soft_deleted_rows():
+    row = _rows()[0]
+    diff = CatalogDiff()
+    out = list(diff_rows([row], {row["id"]: (row_hash(row), True)}, 3, diff))
+    assert len(out) == 1 and diff.changed == 1
+
+
+def test_first_run_inserts_everything_then_rerun_is_a_noop(db):
+    version, diff = seed_incremental(db, _rows(), source="test.csv")
+    assert version == 1
+    assert diff.inserted == 3
+    assert current_version(db) == 1
+
+    products = _products(db)
+    assert set(products) == {r["id"] for r in _rows()}
+    assert all(p.version == 1 and p.content_hash for p in products.values())
+    cv = db.get(CatalogVersion, 1)
+    assert (cv.source, cv.inserted, cv.changed, cv.deleted) == ("test.csv", 3, 0, 0)
+
+    version, diff = seed_incremental(db, _rows())
+    assert version is None
+    assert diff.unchanged == 3 and not diff.inserted and not diff.changed
+    assert current_version(db) == 1
+
+
+def test_changed_row_bumps_only_its_version(db):
+    seed_incremental(db, _rows())
+    edited = [CSV[0], _csv_row("0100000002", "Beta top", cents=1499), CSV[2]]
+
+    version, diff = seed_incremental(db, _rows(edited))
+    assert version == 2
+    assert (diff.inserted, diff.changed, diff.unchanged) == (0, 1, 2)
+
+    products = _products(db)
+    assert products["0100000002"].version == 2
+    assert products["0100000002"].price_cents == 1499
+    assert products["0100000001"].version == 1
+    assert products["0100000003"].version == 1
+
+
+def test_missing_rows_are_reported_unless_delete_missing(db):
+    seed_incremental(db, _rows())
+
+    version, diff = seed_incremental(db, _rows(CSV[:2]))
+    assert version is None
+    assert diff.missing == ["0100000003"]
+    assert _products(db)["0100000003"].deleted_at is None
+
+    version, diff = seed_incremental(db, _rows(CSV[:2]), delete_missing=True)
+    assert version == 2
+    gone = _products(db)["0100000003"]
+    assert gone.deleted_at is not None and gone.version == 2
+    assert db.get(CatalogVersion, 2).deleted == 1
+
+    # already soft-deleted rows are not "missing" again
+    version, diff = seed_incremental(db, _rows(CSV[:2]), delete_missing=True)
+    assert version is None and diff.missing == []
+
+    # coming back restores it under a new version
+    version, diff = seed_incremental(db, _rows())
+    assert version == 3 and diff.changed == 1
+    back = _products(db)["0100000003"]
+    assert back.deleted_at is None and back.version == 3
+
+
+def test_dry_run_writes_nothing(db):
+    version, diff = seed_incremental(db, _rows(), dry_run=True)
+    assert version is None
+    assert diff.inserted == 3
+    assert _products(db) == {}
+    assert current_version(db) == 0
+
+
+def test_duplicate_ids_later_row_wins(db):
+    rows = _rows([_csv_row("0100000001", "First"), _csv_row("0100000001", "Second")])
+    version, diff = seed_incremental(db, rows)
+    assert version == 1 and diff.inserted == 1
+
+    p = _products(db)["0100000001"]
+    assert p.prod_name == "Second"
+    assert p.content_hash == row_hash(rows[1])
+
+
+def test_apply_changes_picks_up_a_seeded_version(db):
+    seed_incremental(db, _rows())
+    before = apply_changes([], list(_products(db).values()))
+    assert [p["id"] for p in before] == [r["id"] for r in _rows()]
+
+    edited = [_csv_row("0100000001", "Alpha top v2"), CSV[1], _csv_row("0100000004", "Delta top")]
+    version, _ = seed_incremental(db, _rows(edited), delete_missing=True)
+    assert version == 2
+    changed = db.scalars(select(Product).where(Product.version > 1)).all()
+    assert {p.id for p in changed} == {"0100000001", "0100000003", "0100000004"}
+
+    after = apply_changes(before, changed)
+    # existing products keep their positions, deletes drop out, inserts go last
+    assert [p["id"] for p in after] == ["0100000001", "0100000002", "0100000004"]
+    assert after[0]["name"] == "Alpha top v2"
+    assert [p["id"] for p in before] == [r["id"] for r in _rows()]
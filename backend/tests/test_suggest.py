@@ -0,0 +1,74 @@
+from app.suggest import HEAD_PREFIX_LEN, MAX_LIMIT, SuggestIndex
+
+PRODUCTS = [
+    {"name": "Slim jeans", "product_type_name": "Trousers", "product_group_name": "Garment Lower body",
+     "colour_group_name": "Dark Blue"},
+    {"name": "Relaxed jeans", "product_type_name": "Trousers", "product_group_name": "Garment Lower body",
+     "colour_group_name": "Black"},
+    {"name": "Jersey dress", "product_type_name": "Dress", "product_group_name": "Garment Full body",
+     "colour_group_name": "Black"},
+    {"name": "Jersey top", "product_type_name": "T-shirt", "product_group_name": "Garment Upper body",
+     "colour_group_name": "White"},
+]
+
+
+def _texts(items: list[dict]) -> list[str]:
+    return [it["text"] for it in items]
+
+
+def _brute_force(index: SuggestIndex, q: str, limit: int) -> list[str]:
+    """Every entry with a word-boundary suffix starting with q, ranked like the index."""
+    prefix = " ".join(q.lower().split())
+    matches = []
+    for text, kind, weight in index._entries:
+        words = text.lower().replace("-", " ").split()
+        if any(" ".join(words[i:]).startswith(prefix) for i in range(len(words))):
+            matches.append((-weight, len(text), text))
+    return [t for _, _, t in sorted(matches)[:limit]]
+
+
+def test_prefix_matches_any_word():
+    index = SuggestIndex.build(PRODUCTS)
+    assert set(_texts(index.lookup("jea"))) == {"Slim jeans", "Relaxed jeans"}
+    assert "Jersey dress" in _texts(index.lookup("dre"))
+    assert _texts(index.lookup("dark b")) == ["Dark Blue"]
+
+
+def test_ranked_by_catalog_weight():
+    index = SuggestIndex.build(PRODUCTS)
+    items = index.lookup("black")
+    assert items[0] == {"text": "Black", "kind": "color", "weight": 2}
+    # "Trousers" is carried by two products, each jeans name by one
+    assert _texts(index.lookup("tr"))[0] == "Trousers"
+
+
+def test_head_prefixes_match_the_slow_path():
+    index = SuggestIndex.build(PRODUCTS)
+    for q in ["j", "je", "jer", "jersey", "g", "ga", "garment l", "bl", "t"]:
+        for limit in (1, 3, 8):
+            assert _texts(index.lookup(q, limit)) == _brute_force(index, q, limit), (q, limit)
+    assert all(len(p) <= HEAD_PREFIX_LEN for p in index._head)
+
+
+def test_vocab_terms_are_suggested():
+    index = SuggestIndex.build(PRODUCTS, {"colour_group_name": ["Light Pink", "Black"]})
+    assert index.lookup("light") == [{"text": "Light Pink", "kind": "color", "weight": 1}]
+    # a vocab term the catalog already has keeps its catalog weight
+    assert index.lookup("black")[0]["weight"] == 2
+
+
+def test_limits_and_empty_queries():
+    index = SuggestIndex.build(PRODUCTS)
+    assert index.lookup("") == []
+    assert index.lookup("  ?! ") == []
+    assert index.lookup("zzz") == []
+    assert len(index.lookup("g", limit=100)) <= MAX_LIMIT
+    assert len(index.lookup("j", limit=1)) == 1
+
+
+def test_suggest_endpoint(client):
+    r = client.get("/suggest", params={"q": "dre", "limit": 5})
+    assert r.status_code == 200
+    assert r.headers["cache-control"] == "public, max-age=60"
+    texts = _texts(r.json()["items"])
+    assert {"Banjo dress", "Zola dress"} <= set(texts)
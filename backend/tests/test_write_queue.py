@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.write_queue import GroupCommitQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'wq.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE t (v TEXT)")
+    # a long window so jobs submitted together land in one batch
+    q = GroupCommitQueue(sessionmaker(engine), window_ms=100)
+    yield q, engine
+    q.stop()
+    engine.dispose()
+
+
+def _rows(engine) -> list[str]:
+    with engine.connect() as conn:
+        return [v for (v,) in conn.execute(text("SELECT v FROM t ORDER BY rowid"))]
+
+
+def _insert(v: str, delay: float = 0.0):
+    def job(db):
+        time.sleep(delay)
+        db.execute(text("INSERT INTO t (v) VALUES (:v)"), {"v": v})
+        return v
+
+    return job
+
+
+def _submit_in_thread(q, fn, timeout=None) -> dict:
+    out: dict = {}
+
+    def run():
+        try:
+            out["result"] = q.submit(fn, timeout=timeout)
+        except BaseException as e:
+            out["error"] = e
+
+    t = threading.Thread(target=run)
+    t.start()
+    out["thread"] = t
+    return out
+
+
+def test_batch_commits_together(queue):
+    q, engine = queue
+    calls = [_submit_in_thread(q, _insert(str(i))) for i in range(5)]
+    for c in calls:
+        c["thread"].join(5)
+    assert sorted(c["result"] for c in calls) == [str(i) for i in range(5)]
+    assert sorted(_rows(engine)) == [str(i) for i in range(5)]
+    assert q.stats()["jobs"] == 5
+    assert q.stats()["batches"] < 5
+
+
+def test_failing_job_only_fails_its_caller(queue):
+    q, engine = queue
+
+    def boom(db):
+        db.execute(text("INSERT INTO t (v) VALUES ('boom')"))
+        raise ValueError("nope")
+
+    ok = _submit_in_thread(q, _insert("a"))
+    bad = _submit_in_thread(q, boom)
+    ok["thread"].join(5)
+    bad["thread"].join(5)
+    assert ok["result"] == "a"
+    assert isinstance(bad["error"], ValueError)
+    assert _rows(engine) == ["a"]
+
+
+def test_timeout_behind_a_slow_job_cancels_and_never_runs(queue):
+    q, engine = queue
+    slow = _submit_in_thread(q, _insert("slow", delay=0.5))
+    time.sleep(0.02)
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        # same batch as the slow job, still waiting for its turn when the timeout passes
+        q.submit(_insert("late"), timeout=0.2)
+    assert time.monotonic() - started < 0.4
+
+    slow["thread"].join(5)
+    assert slow["result"] == "slow"
+    assert _rows(engine) == ["slow"]
+    assert q.stats()["timed_out"] == 1
+    assert q.stats()["jobs"] == 1
+
+
+def test_timeout_of_a_running_job_waits_for_its_outcome(queue):
+    q, engine = queue
+    # the job itself outlives the timeout: it can't be cancelled, so the caller gets its result
+    assert q.submit(_insert("x", delay=0.3), timeout=0.15) == "x"
+    assert _rows(engine) == ["x"]
+    assert q.stats()["timed_out"] == 0
@@ -42,6 +42,8 @@ export default function AccountPage() {
   const [orders, setOrders] = useState<OrderRow[]>([]);
   const [ordersLoading, setOrdersLoading] = useState(false);
   const [ordersErr, setOrdersErr] = useState<string | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     if (!loading && !user) router.replace("/login");
@@ -58,6 +60,7 @@ export default function AccountPage() {
         const data = await getOrders();
         if (!alive) return;
         setOrders(data.orders ?? []);
+        setNextCursor(data.next_cursor ?? null);
       } catch (e: any) {
         if (!alive) return;
         setOrdersErr(e?.message ?? "Failed to load orders");
@@ -95,6 +98,21 @@ export default function AccountPage() {
     });
   }, [orders]);
 
+  async function loadMoreOrders() {
+    if (!nextCursor) return;
+    setOrdersErr(null);
+    setLoadingMore(true);
+    try {
+      const data = await getOrders(nextCursor);
+      setOrders((prev) => [...prev, ...(data.orders ?? [])]);
+      setNextCursor(data.next_cursor ?? null);
+    } catch (e: any) {
+      setOrdersErr(e?.message ?? "Failed to load orders");
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
   if (loading) {
     return (
       <div className="mx-auto max-w-2xl px-4 py-10">
@@ -148,6 +166,7 @@ export default function AccountPage() {
                 try {
                   const data = await getOrders();
                   setOrders(data.orders ?? []);
+                  setNextCursor(data.next_cursor ?? null);
                 } catch (e: any) {
                   setOrdersErr(e?.message ?? "Failed to load orders");
                 } finally {
@@ -209,6 +228,18 @@ export default function AccountPage() {
               </table>
             </div>
           )}
+
+          {!ordersLoading && nextCursor && (
+            <div className="mt-4 text-center">
+              <button
+                onClick={loadMoreOrders}
+                className="rounded-xl border border-neutral-200 bg-white px-4 py-2 text-sm font-medium hover:bg-neutral-50 disabled:opacity-60"
+                disabled={loadingMore}
+              >
+                {loadingMore ? "Loading…" : "Load more"}
+              </button>
+            </div>
+          )}
         </div>
       </div>
     </div>
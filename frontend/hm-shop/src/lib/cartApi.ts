@@ -15,7 +15,7 @@ export type CartItem = {
   };
   
   export type Cart = {
-    id: string;
+    id: string | null; // null until the first add creates the cart
     user_id: string | null;
     status: string;
     items: CartItem[];
@@ -7,8 +7,10 @@ export type OrderSummary = {
   subtotal_cents: number;
 };
 
-export async function getOrders() {
-  const resp = await fetch(`${API_BASE}/orders`, {
+// One page of orders, newest first; pass the previous page's next_cursor for the next one.
+export async function getOrders(cursor?: string | null) {
+  const qs = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+  const resp = await fetch(`${API_BASE}/orders${qs}`, {
     credentials: "include",
     cache: "no-store",
   });
@@ -18,5 +20,5 @@ export async function getOrders() {
     throw new Error(`Orders failed: ${resp.status} ${text}`);
   }
 
-  return (await resp.json()) as { orders: OrderSummary[] };
+  return (await resp.json()) as { orders: OrderSummary[]; next_cursor: string | null };
 }